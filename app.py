@@ -1,22 +1,43 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import numpy_financial as npf
 import requests
-from bs4 import BeautifulSoup
 import re
 import time
 import json
 import io
-from urllib.parse import quote_plus
-import random
-
-# curl_cffi is optional — graceful degradation if not installed
-try:
-    from curl_cffi import requests as cf_requests
-    _CURL_CFFI_AVAILABLE = True
-except ImportError:
-    _CURL_CFFI_AVAILABLE = False
+import os
+import hashlib
+import multiprocessing
+import queue
+import uuid
+import pickle
+import sqlite3
+import shutil
+import threading
+import ast
+import enum
+import functools
+import warnings
+import sys
+import platform
+from collections import OrderedDict, deque
+
+# curl_cffi is optional — imported on the first Zillow call (it's only used
+# there and is slow to import), graceful degradation if not installed
+_cf_requests = None
+
+
+def _curl_cffi():
+    """curl_cffi's requests module, or None if not installed."""
+    global _cf_requests
+    if _cf_requests is None:
+        try:
+            from curl_cffi import requests as cf
+            _cf_requests = cf
+        except ImportError:
+            _cf_requests = False
+    return _cf_requests or None
 
 # ─────────────────────────────────────────────
 # PAGE CONFIG
@@ -126,6 +147,12 @@ st.markdown("""
 # SIDEBAR
 # ─────────────────────────────────────────────
 with st.sidebar:
+    app_mode = st.radio(
+        "Mode", ["Underwrite List", "Area Sweep", "Market Screener"], horizontal=True,
+        help="Area Sweep underwrites every Zillow listing in a city, ZIP list or bounding box. "
+             "Market Screener runs the DSCR solve across every SAFMR zip × bedroom count.",
+    )
+
     st.header("Financing")
     interest_rate    = st.number_input("Interest Rate (%)", value=7.5, step=0.1, min_value=1.0, max_value=20.0) / 100
     down_pct         = st.slider("Down Payment (%)", 10, 50, 20) / 100
@@ -157,6 +184,16 @@ with st.sidebar:
     use_110 = "110%" in payment_standard
     rent_growth_rate = st.number_input("Annual Rent Growth (%)", value=3.0, step=0.5, min_value=0.0,
                                        help="HUD adjusts FMRs annually via the Annual Adjustment Factor. Historical avg: 2–4%.") / 100
+    zip_rent_growth = st.checkbox("Per-ZIP rent growth (HUD SAFMR history)", value=True,
+                                  help="Project each ZIP at its own SAFMR trend across recent fiscal years. "
+                                       "The rate above is used where a ZIP has no history.")
+
+    st.header("Hold Period")
+    hold_years       = st.slider("Hold Period (Years)", 1, 30, 7)
+    appreciation_rate= st.number_input("Annual Appreciation (%)", value=3.0, step=0.5) / 100
+    selling_cost_pct = st.number_input("Selling Costs at Exit (%)", value=6.0, step=0.5, min_value=0.0) / 100
+    discount_rate    = st.number_input("Discount Rate for NPV (%)", value=10.0, step=0.5, min_value=0.0,
+                                       help="Buyer's required levered return. NPV > 0 means the deal beats it.") / 100
 
     st.header("Offer Flags")
     inspect_threshold = st.number_input(
@@ -165,6 +202,26 @@ with st.sidebar:
         help="When the DSCR math supports a price much higher than list, it likely needs heavy rehab."
     )
 
+    st.header("Goal-Seek Constraints")
+    min_dscr_req = st.number_input("Min DSCR Ratio (x)", value=1.15, step=0.05, min_value=0.0,
+                                   help="Lender minimum NOI / debt service. Section 8 DSCR loans: 1.0–1.25x.")
+    min_rtv_req  = st.number_input("Min Rent-to-Value (%)", value=0.8, step=0.1, min_value=0.0,
+                                   help="Monthly rent / purchase price. 0 = off.")
+    min_coc_req  = st.number_input("Min Cash-on-Cash (%)", value=0.0, step=1.0, min_value=0.0,
+                                   help="Annual CF / total cash to close. 0 = off.")
+    max_grm_req  = st.number_input("Max GRM", value=0.0, step=0.5, min_value=0.0,
+                                   help="Price / annual rent. 0 = off.")
+
+    st.header("Deadlines")
+    row_budget_s = st.number_input("Per-Property Budget (s)", value=20, step=5, min_value=1,
+                                   help="Max network wait per property across all sources. "
+                                        "Sources that can't answer in time are skipped and the row is marked partial.")
+    batch_sla_min = st.number_input("Whole-Batch SLA (min)", value=0, step=5, min_value=0,
+                                    help="0 = none. Past the SLA, remaining rows use SAFMR + cached data only.")
+    shards = st.number_input("Shards (by ZIP)", value=1, step=1, min_value=1, max_value=256,
+                             help="Split big lists by ZIP across this server's job workers and any "
+                                  "S8_SHARD_WORKER machines sharing the data volume. Ignored in watchlist mode.")
+
     st.header("Rentcast API (optional)")
     rentcast_key = st.text_input(
         "Rentcast API Key",
@@ -175,62 +232,989 @@ with st.sidebar:
             "With a key: rent validated against market comps for higher accuracy."
         ),
     )
+    rentcast_bulk = st.checkbox(
+        "Bulk pull by ZIP", value=True,
+        help="Fetch every active listing in each ZIP (500 per call) and match addresses locally, "
+             "instead of one call per property. Far fewer calls for lists clustered in a few ZIPs.",
+    )
+
+# Every input the underwriting pipeline reads. Passed explicitly so a
+# background worker sees exactly the values this run was submitted with.
+run_params = {
+    "interest_rate": interest_rate, "down_pct": down_pct, "loan_term_years": loan_term_years,
+    "target_cashflow": target_cashflow, "tax_rate": tax_rate, "insurance_rate": insurance_rate,
+    "vacancy_rate": vacancy_rate, "maintenance_rate": maintenance_rate, "mgmt_rate": mgmt_rate,
+    "capex_rate": capex_rate, "utility_allowance": utility_allowance,
+    "wholesale_fee": wholesale_fee, "closing_costs_pct": closing_costs_pct,
+    "use_110": use_110, "rent_growth_rate": rent_growth_rate,
+    "zip_rent_growth": zip_rent_growth,
+    "hold_years": hold_years, "appreciation_rate": appreciation_rate,
+    "selling_cost_pct": selling_cost_pct, "discount_rate": discount_rate,
+    "inspect_threshold": inspect_threshold,
+    "min_dscr_req": min_dscr_req, "min_rtv_req": min_rtv_req,
+    "min_coc_req": min_coc_req, "max_grm_req": max_grm_req,
+    "rentcast_key": rentcast_key, "rentcast_bulk": rentcast_bulk,
+    "row_budget_s": row_budget_s, "batch_sla_s": batch_sla_min * 60,
+    "shards": int(shards),
+}
+
+# ─────────────────────────────────────────────
+# REFERENCE DATA DISK CACHE
+# st.cache_data is per-process and lost on restart. Large HUD / Census
+# reference tables are also pickled to disk so a fresh server (or a second
+# replica on the same volume) skips the multi-MB download.
+# ─────────────────────────────────────────────
+DATA_DIR = os.environ.get(
+    "S8_DATA_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "section8-underwriter"),
+)
+REFERENCE_TTL = 86400 * 7   # same 7-day freshness for every HUD reference table
+
+
+def _disk_cached(name: str, max_age: float, build) -> pd.DataFrame:
+    """
+    Return the table stored at DATA_DIR/name if it is younger than max_age
+    seconds, otherwise call build() and store its result. The file uses the
+    saved-run archive layout (see SAVED RUNS), so numeric columns come back as
+    read-only views of a memory map: every process on the node shares the same
+    page-cache pages instead of unpickling its own copy.
+    Empty results (failed downloads) are never written, so the next run retries.
+    """
+    path = os.path.join(DATA_DIR, name)
+    try:
+        if time.time() - os.path.getmtime(path) < max_age:
+            table = _read_reference(path)
+            if table is not None:
+                return table
+    except Exception:
+        pass
+
+    df = build()
+    if not df.empty:
+        try:
+            index = df.index.name
+            write_run_archive(path, {"table": df.reset_index() if index else df}, {"index": index})
+            table = _read_reference(path)
+            if table is not None:
+                return table
+        except OSError:
+            pass
+    return df
+
+
+def _read_reference(path: str) -> pd.DataFrame | None:
+    archive = read_run_archive(path)
+    if archive is None:
+        return None
+    frames, _, meta = archive
+    df, index = frames["table"], meta.get("index")
+    if index:
+        # set_index would copy every column out of the map
+        df = pd.DataFrame({c: df[c].to_numpy() for c in df.columns if c != index},
+                          index=pd.Index(df[index].to_numpy(), name=index), copy=False)
+    return df
+
+
+def _mapped(arr: np.ndarray) -> bool:
+    """True if arr is a view into a np.memmap (shared page cache, not process heap)."""
+    while arr is not None:
+        if isinstance(arr, np.memmap):
+            return True
+        arr = arr.base if isinstance(arr.base, np.ndarray) else None
+    return False
+
+
+def frame_memory(df: pd.DataFrame) -> tuple[int, int]:
+    """(shared bytes, private bytes) — shared = memory-mapped numeric columns."""
+    shared = private = 0
+    for name in df.columns:
+        arr = df[name].to_numpy()
+        if _mapped(arr):
+            shared += arr.nbytes
+        else:
+            private += int(df[name].memory_usage(index=False, deep=True))
+    return shared, private + int(df.index.memory_usage(deep=True))
+
+
+# ─────────────────────────────────────────────
+# PERSISTENT ENRICHMENT STORE
+# SQLite on DATA_DIR, shared by every session, restart and replica that
+# mounts the same volume. Sits underneath the fetch caches: the in-memory
+# cache answers repeat calls within a process, this answers everything
+# else before we go to the network.
+# ─────────────────────────────────────────────
+STORE_TTL = {
+    "geocode":          86400 * 180,   # addresses don't move
+    "zillow":           86400,         # DOM / price cuts change daily
+    "census":           86400 * 30,
+    "rentcast_avm":     86400 * 30,
+    "rentcast_listing": 86400 * 7,
+    "rentcast_zip":     86400,         # whole-ZIP pulls: new listings appear daily
+}
+STORE_MAX_BYTES = int(float(os.environ.get("S8_STORE_MAX_MB", "512")) * 1024 * 1024)
+
+_STREET_ABBR = {
+    "street": "st", "avenue": "ave", "road": "rd", "drive": "dr", "lane": "ln",
+    "boulevard": "blvd", "court": "ct", "place": "pl", "terrace": "ter",
+    "circle": "cir", "parkway": "pkwy", "highway": "hwy", "north": "n",
+    "south": "s", "east": "e", "west": "w", "apartment": "apt", "suite": "ste",
+}
+
+
+def canonical_address(address: str) -> str:
+    """Lowercase, strip punctuation, abbreviate suffixes/directionals: one key per property."""
+    tokens = re.sub(r"[^\w\s]", " ", str(address).lower()).split()
+    return " ".join(_STREET_ABBR.get(t, t) for t in tokens)
+
+
+class EnrichmentStore:
+    """
+    Key/value store of enrichment responses: (source, key) → pickled value.
+    TTL is per source (STORE_TTL); total size is capped at max_bytes by
+    evicting the oldest entries. Thread-safe; SQLite WAL handles other processes.
+    """
+
+    def __init__(self, path: str, max_bytes: int = STORE_MAX_BYTES):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self._puts = 0
+        self._warm: dict = {}
+        self._open()
+
+    def _open(self) -> None:
+        self._pid  = os.getpid()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS enrichment ("
+            " source TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL,"
+            " fetched_at REAL NOT NULL, size INTEGER NOT NULL,"
+            " PRIMARY KEY (source, key))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS ix_enrichment_age ON enrichment (fetched_at)")
+        self._db.commit()
+
+    def _check_fork(self) -> None:
+        # A forked job worker inherits this object; SQLite handles and held
+        # locks must not cross fork(), so the child opens its own connection.
+        if os.getpid() != self._pid:
+            self._warm = {}
+            self._open()
+
+    def get(self, source: str, key: str):
+        """Return the stored value, or None if missing or older than the source TTL."""
+        self._check_fork()
+        warm = self._warm.get((source, key))
+        if warm is not None:
+            value, expires = warm
+            if time.time() < expires:
+                return value
+            self._warm.pop((source, key), None)
+        return self.get_many(source, [key]).get(key)
+
+    def prefetch(self, source: str, keys) -> int:
+        """
+        Load many keys in one query so the per-row get() calls that follow are
+        dict hits instead of one SQLite round trip each. Warm entries keep
+        their row's expiry, so get() never serves them past the source TTL.
+        Returns the hit count.
+        """
+        hits = self._select(source, keys)
+        ttl = STORE_TTL.get(source, 86400)
+        with self._lock:
+            if len(self._warm) > 50_000:
+                self._warm.clear()
+            self._warm.update({(source, k): (v, fetched + ttl) for k, (v, fetched) in hits.items()})
+        return len(hits)
+
+    def get_many(self, source: str, keys) -> dict:
+        """Bulk lookup — returns {key: value} for the fresh hits only."""
+        return {k: v for k, (v, _) in self._select(source, keys).items()}
+
+    def _select(self, source: str, keys) -> dict:
+        """{key: (value, fetched_at)} for the keys still within the source TTL."""
+        self._check_fork()
+        keys = list(dict.fromkeys(keys))
+        cutoff = time.time() - STORE_TTL.get(source, 86400)
+        hits = {}
+        with self._lock:
+            for i in range(0, len(keys), 500):   # stay under SQLite's bound-parameter limit
+                chunk = keys[i:i + 500]
+                rows = self._db.execute(
+                    f"SELECT key, value, fetched_at FROM enrichment WHERE source = ? AND fetched_at >= ?"
+                    f" AND key IN ({','.join('?' * len(chunk))})",
+                    [source, cutoff, *chunk],
+                ).fetchall()
+                for k, blob, fetched in rows:
+                    try:
+                        hits[k] = (pickle.loads(blob), fetched)
+                    except Exception:
+                        pass
+        return hits
+
+    def put(self, source: str, key: str, value) -> None:
+        self.put_many(source, {key: value})
+
+    def put_many(self, source: str, items: dict) -> None:
+        """Bulk upsert in one transaction. Triggers eviction every 200 writes."""
+        self._check_fork()
+        if not items:
+            return
+        now = time.time()
+        rows = []
+        for k, v in items.items():
+            blob = pickle.dumps(v, protocol=pickle.HIGHEST_PROTOCOL)
+            rows.append((source, k, blob, now, len(blob)))
+        with self._lock:
+            try:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO enrichment (source, key, value, fetched_at, size)"
+                    " VALUES (?, ?, ?, ?, ?)", rows,
+                )
+                self._db.commit()
+            except sqlite3.Error:
+                return
+            self._puts += len(rows)
+            due = self._puts >= 200
+            if due:
+                self._puts = 0
+        if due:
+            self.evict()
+
+    def evict(self) -> int:
+        """Drop expired rows, then the oldest rows until under max_bytes. Returns rows deleted."""
+        self._check_fork()
+        now = time.time()
+        deleted = 0
+        with self._lock:
+            try:
+                for source, ttl in STORE_TTL.items():
+                    deleted += self._db.execute(
+                        "DELETE FROM enrichment WHERE source = ? AND fetched_at < ?", (source, now - ttl)
+                    ).rowcount
+                total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM enrichment").fetchone()[0]
+                if total > self.max_bytes:
+                    # free down to 90% so we don't evict on every subsequent write
+                    excess, victims = total - int(self.max_bytes * 0.9), []
+                    for rowid, size in self._db.execute(
+                        "SELECT rowid, size FROM enrichment ORDER BY fetched_at"
+                    ):
+                        victims.append((rowid,))
+                        excess -= size
+                        if excess <= 0:
+                            break
+                    self._db.executemany("DELETE FROM enrichment WHERE rowid = ?", victims)
+                    deleted += len(victims)
+                self._db.commit()
+            except sqlite3.Error:
+                pass
+        return deleted
+
+    def stats(self) -> dict:
+        """Entry count and bytes per source."""
+        self._check_fork()
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT source, COUNT(*), COALESCE(SUM(size), 0) FROM enrichment GROUP BY source"
+            ).fetchall()
+        return {src: {"entries": n, "bytes": b} for src, n, b in rows}
+
+
+@st.cache_resource(show_spinner=False)
+def enrichment_store() -> EnrichmentStore | None:
+    """One store per process. None if DATA_DIR isn't writable — callers just skip it."""
+    try:
+        return EnrichmentStore(os.path.join(DATA_DIR, "enrichment.sqlite"))
+    except (OSError, sqlite3.Error):
+        return None
+
+
+def _store_get(source: str, key: str):
+    scope = getattr(_deadline_ctx, "scope", None)
+    if scope is not None and scope.overlay and (source, key) in scope.overlay:
+        scope.overlay_hits += 1
+        return scope.overlay[(source, key)]
+    store = enrichment_store()
+    return store.get(source, key) if store else None
+
+
+def _store_put(source: str, key: str, value) -> None:
+    store = enrichment_store()
+    if store:
+        store.put(source, key, value)
+
+
+# ─────────────────────────────────────────────
+# DATA SOURCE CIRCUIT BREAKERS
+# One breaker per external source. Repeated failures or slow responses
+# trip it open and the source is skipped (rows proceed without it) instead
+# of every row waiting out a full timeout. After a cooldown a single
+# half-open probe decides whether to close it again. Timeouts adapt to the
+# observed p95 latency, never exceeding the source's original fixed timeout.
+# ─────────────────────────────────────────────
+SOURCE_LIMITS = {
+    # source:    (max timeout s, slow-response threshold s)
+    "nominatim": (8,  4),
+    "zillow":    (15, 8),
+    "census":    (10, 6),
+    "rentcast":  (12, 6),
+}
+
+
+class SourceUnavailable(Exception):
+    """Raised when a source's breaker is open or the request itself failed."""
+
+
+class CircuitBreaker:
+    """closed → (fail_threshold consecutive failures) → open → (cooldown) → half-open probe."""
+
+    def __init__(self, source: str, max_timeout: float, slow_after: float,
+                 fail_threshold: int = 3, cooldown: float = 30.0):
+        self.source         = source
+        self.max_timeout    = max_timeout
+        self.slow_after     = slow_after
+        self.fail_threshold = fail_threshold
+        self.cooldown       = cooldown
+        self.state          = "closed"
+        self._lock          = threading.Lock()
+        self._consecutive   = 0
+        self._opened_at     = 0.0
+        self._probing       = False
+        self._latency       = deque(maxlen=50)
+        self.calls = self.failures = self.trips = self.skipped = 0
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.cooldown:
+                self.state = "half-open"
+            if self.state == "closed" or (self.state == "half-open" and not self._probing):
+                self._probing = self.state == "half-open"
+                return True
+            self.skipped += 1
+            return False
+
+    def timeout(self) -> float:
+        """3× observed p95 latency, floored at 2 s and capped at the source's fixed timeout."""
+        with self._lock:
+            if len(self._latency) < 5:
+                return self.max_timeout
+            p95 = float(np.percentile(self._latency, 95))
+        return min(self.max_timeout, max(2.0, p95 * 3))
+
+    def release(self) -> None:
+        """Call finished without a verdict (our deadline, not the source) — free the probe slot."""
+        with self._lock:
+            self._probing = False
+
+    def record(self, ok: bool, latency: float) -> None:
+        ok = ok and latency <= self.slow_after
+        with self._lock:
+            self.calls += 1
+            self._probing = False
+            if ok:
+                self._latency.append(latency)
+                self._consecutive = 0
+                self.state = "closed"
+                return
+            self.failures += 1
+            self._consecutive += 1
+            if self.state == "half-open" or self._consecutive >= self.fail_threshold:
+                if self.state != "open":
+                    self.trips += 1
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+    def summary(self) -> dict:
+        with self._lock:
+            lat = list(self._latency)
+        return {
+            "state":    self.state,
+            "calls":    self.calls,
+            "failures": self.failures,
+            "trips":    self.trips,
+            "skipped":  self.skipped,
+            "p50_s":    round(float(np.percentile(lat, 50)), 2) if lat else None,
+            "p95_s":    round(float(np.percentile(lat, 95)), 2) if lat else None,
+            "timeout_s": round(self.timeout(), 1),
+        }
+
+
+_SOURCE_BREAKERS: dict[str, CircuitBreaker] = {}
+_BREAKER_LOCK = threading.Lock()
+
+
+def source_breaker(source: str) -> CircuitBreaker:
+    with _BREAKER_LOCK:
+        if source not in _SOURCE_BREAKERS:
+            max_t, slow = SOURCE_LIMITS[source]
+            _SOURCE_BREAKERS[source] = CircuitBreaker(source, max_t, slow)
+        return _SOURCE_BREAKERS[source]
+
+
+def reset_source_breakers() -> None:
+    """Fresh breakers for a new batch — yesterday's outage shouldn't skip today's run."""
+    with _BREAKER_LOCK:
+        _SOURCE_BREAKERS.clear()
+
+
+def source_health() -> dict:
+    """Per-source breaker summary for the run report."""
+    with _BREAKER_LOCK:
+        breakers = dict(_SOURCE_BREAKERS)
+    return {src: b.summary() for src, b in breakers.items()}
+
+
+# ── Deadline budgets ──
+# underwrite_batch opens a deadline_scope per row: the row's own budget,
+# clipped to whatever is left of the whole-batch SLA. source_request never
+# waits past it, and every source that was skipped or failed is recorded
+# so the row can be marked partial and underwritten from what did arrive.
+MIN_REQUEST_BUDGET = 0.5   # seconds; below this a request isn't worth starting
+_deadline_ctx = threading.local()
+
+
+class deadline_scope:
+    """
+    Context manager: network budget for the enclosed calls on this thread.
+    offline=True gives a zero budget, so only stored / cached data is used.
+    overlay ({(source, key): value}) answers _store_get ahead of the store for
+    this scope only — a batch's snapshot replay never reaches shared state.
+    With replay=True the fetch caches are bypassed as well.
+    """
+
+    def __init__(self, budget_s: float | None, batch_end: float | None = None, offline: bool = False,
+                 overlay: dict | None = None, replay: bool = False):
+        ends = [e for e in (
+            time.monotonic() + budget_s if budget_s else None, batch_end) if e is not None]
+        self.end     = float("-inf") if offline else min(ends) if ends else None
+        self.missing = set()
+        self.overlay = overlay or None
+        self.replay  = replay
+        self.overlay_hits = 0
+
+    def __enter__(self):
+        self._prev = getattr(_deadline_ctx, "scope", None)
+        _deadline_ctx.scope = self
+        return self
+
+    def __exit__(self, *exc):
+        _deadline_ctx.scope = self._prev
+        return False
+
+
+def remaining_budget() -> float | None:
+    """Seconds left in the current deadline_scope, or None outside any scope."""
+    scope = getattr(_deadline_ctx, "scope", None)
+    if scope is None or scope.end is None:
+        return None
+    return scope.end - time.monotonic()
+
+
+def _note_missing(source: str) -> None:
+    scope = getattr(_deadline_ctx, "scope", None)
+    if scope is not None:
+        scope.missing.add(source)
+
+
+def source_request(source: str, method: str, url: str, client=requests, **kwargs):
+    """
+    client.request() through the source's breaker with its adaptive timeout.
+    403 / 429 / 5xx count as failures (blocked or throttled) but the response is
+    still returned for the caller to handle. Raises SourceUnavailable if the
+    breaker is open or the request raised (timeout, connection error).
+    """
+    remaining = remaining_budget()
+    breaker   = source_breaker(source)
+    if (remaining is not None and remaining < MIN_REQUEST_BUDGET) or not breaker.allow():
+        _note_missing(source)
+        raise SourceUnavailable(source)
+    timeout = breaker.timeout()
+    clipped = remaining is not None and remaining < timeout
+    t0 = time.monotonic()
+    try:
+        resp = client.request(method, url, timeout=remaining if clipped else timeout, **kwargs)
+    except Exception as e:
+        if not clipped:   # running out of *our* budget isn't the source's fault
+            breaker.record(False, time.monotonic() - t0)
+        else:
+            breaker.release()
+        _note_missing(source)
+        raise SourceUnavailable(source) from e
+    ok = resp.status_code < 500 and resp.status_code not in (403, 429)
+    breaker.record(ok, time.monotonic() - t0)
+    if not ok:
+        _note_missing(source)
+    return resp
+
+
+def skip_unavailable(default):
+    """
+    Outermost decorator for cached fetchers: SourceUnavailable → default().
+    The exception passes through the cache first, so a skipped call is
+    never cached as if the source had answered empty.
+    """
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            try:
+                return fn(*args, **kwargs)
+            except SourceUnavailable:
+                return default()
+        return inner
+    return wrap
+
+
+# ─────────────────────────────────────────────
+# FETCH CACHES
+# In-process memo for the network fetchers, in place of st.cache_data (which
+# had no bound). One LRU per source with its own TTL, entry cap and byte cap;
+# an entry's size is its pickled length. Hit / miss / eviction counts and
+# resident bytes come out of fetch_cache_metrics() for sizing pods.
+# Cached values are shared, not copied — callers must not mutate them.
+# ─────────────────────────────────────────────
+FETCH_CACHE_LIMITS = {
+    # source:           (ttl s,       max entries, max MB)
+    "zillow_search":    (3600,        2_000,       128),
+    "rentcast_listing": (3600,        20_000,      32),
+    "rentcast_avm":     (3600,        20_000,      4),
+    "census":           (86400 * 30,  50_000,      16),
+}
+
+
+class BoundedCache:
+    """LRU + TTL memo bounded by entry count and total pickled size. Thread-safe."""
+
+    def __init__(self, ttl: float, max_entries: int, max_bytes: int):
+        self.ttl, self.max_entries, self.max_bytes = ttl, max_entries, max_bytes
+        self._data: OrderedDict = OrderedDict()   # key → (expires, size, value)
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = self.expirations = 0
+        self._open()
+
+    def _open(self) -> None:
+        self._pid  = os.getpid()
+        self._lock = threading.Lock()
+
+    def _check_fork(self) -> None:
+        # A forked worker keeps the entries but must not inherit a held lock,
+        # and counts only its own traffic so exported metrics don't double up
+        if os.getpid() != self._pid:
+            self._open()
+            self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def _drop(self, key) -> None:
+        _, size, _ = self._data.pop(key)
+        self.bytes -= size
+
+    def get(self, key, default=None):
+        """The cached value, or default if absent or expired."""
+        self._check_fork()
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                if item[0] > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return item[2]
+                self._drop(key)
+                self.expirations += 1
+            self.misses += 1
+            return default
+
+    def put(self, key, value) -> None:
+        """Insert, then evict least-recently-used entries until under both caps."""
+        self._check_fork()
+        try:
+            size = len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            size = sys.getsizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (time.monotonic() + self.ttl, size, value)
+            self.bytes += size
+            while len(self._data) > self.max_entries or self.bytes > self.max_bytes:
+                self._drop(next(iter(self._data)))
+                self.evictions += 1
+
+    def metrics(self) -> dict:
+        self._check_fork()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data), "bytes": self.bytes,
+                "hits": self.hits, "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "evictions": self.evictions, "expirations": self.expirations,
+            }
+
+
+@st.cache_resource(show_spinner=False)
+def fetch_cache(source: str) -> BoundedCache:
+    """One cache per source per process."""
+    ttl, max_entries, max_mb = FETCH_CACHE_LIMITS[source]
+    return BoundedCache(ttl, max_entries, int(max_mb * 1024 * 1024))
+
+
+def bounded_cache(source: str):
+    """Memoize a fetcher in fetch_cache(source). Exceptions are never cached."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            # A batch-local overlay answer (see deadline_scope) must not be cached
+            # for the process; a snapshot replay skips the caches altogether.
+            scope = getattr(_deadline_ctx, "scope", None)
+            overlay = scope is not None and scope.overlay is not None
+            if overlay and scope.replay:
+                return fn(*args, **kwargs)
+            cache = fetch_cache(source)
+            key = (args, tuple(sorted(kwargs.items())))
+            # The sentinel is per call: the cache outlives reruns of this script
+            miss = object()
+            value = cache.get(key, miss)
+            if value is miss:
+                hits = scope.overlay_hits if overlay else 0
+                value = fn(*args, **kwargs)
+                if not overlay or scope.overlay_hits == hits:
+                    cache.put(key, value)
+            return value
+        return inner
+    return wrap
+
+
+def fetch_cache_metrics() -> dict:
+    """{source: metrics} for every fetch cache, plus configured limits."""
+    out = {}
+    for source, (ttl, max_entries, max_mb) in FETCH_CACHE_LIMITS.items():
+        out[source] = {**fetch_cache(source).metrics(), "max_entries": max_entries, "max_mb": max_mb, "ttl_s": ttl}
+    return out
+
+
+METRICS_DIR = os.path.join(DATA_DIR, "metrics")
+
+
+def export_fetch_cache_metrics() -> None:
+    """
+    Write this process's fetch_cache_metrics() to DATA_DIR/metrics/<host>-<pid>.json
+    so job workers' caches (where the fetching happens) are visible too.
+    """
+    try:
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        path = os.path.join(METRICS_DIR, f"{platform.node()}-{os.getpid()}.json")
+        tmp  = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"host": platform.node(), "pid": os.getpid(), "at": time.time(),
+                       "caches": fetch_cache_metrics()}, f)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def read_fetch_cache_metrics(max_age: float = 86400) -> pd.DataFrame:
+    """One row per process × source from the exported files younger than max_age."""
+    rows = []
+    try:
+        names = os.listdir(METRICS_DIR)
+    except OSError:
+        return pd.DataFrame()
+    for name in sorted(names):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(METRICS_DIR, name)) as f:
+                snap = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if time.time() - snap.get("at", 0) > max_age:
+            continue
+        for source, m in snap["caches"].items():
+            rows.append({"Process": f"{snap['host']}:{snap['pid']}", "Source": source,
+                         "Entries": m["entries"], "MB": round(m["bytes"] / 2**20, 1), "Max MB": m["max_mb"],
+                         "Hit Rate": None if m["hit_rate"] is None else m["hit_rate"] * 100,
+                         "Hits": m["hits"], "Misses": m["misses"],
+                         "Evictions": m["evictions"], "Expired": m["expirations"]})
+    return pd.DataFrame(rows)
+
 
 # ─────────────────────────────────────────────
 # HUD SAFMR DATA  (zip‑code level, FY2026)
 # ─────────────────────────────────────────────
 SAFMR_URL = "https://www.huduser.gov/portal/datasets/fmr/fmr2026/fy2026_safmrs.xlsx"
-COUNTY_FMR_URL = "https://www.huduser.gov/portal/datasets/fmr/fmr2025/fy2025_safmrs_revised.xlsx"
-
-@st.cache_data(ttl=86400 * 7, show_spinner=False)
+COUNTY_FMR_URL = "https://www.huduser.gov/portal/datasets/fmr/fmr2026/FY26_FMRs.xlsx"
+ZCTA_COUNTY_URL = (
+    "https://www2.census.gov/geo/docs/maps-data/data/rel2020/zcta520/"
+    "tab20_zcta520_county20_natl.txt"
+)
+HUD_HEADERS = {"User-Agent": "Mozilla/5.0 (compatible; Section8Calc/1.0)"}
+
+
+def _download_safmr(url: str = SAFMR_URL) -> pd.DataFrame:
+    resp = requests.get(url, headers=HUD_HEADERS, timeout=40)
+    resp.raise_for_status()
+    df = pd.read_excel(io.BytesIO(resp.content))
+    # Normalize column names — the Excel has newlines in headers
+    df.columns = [str(c).replace("\n", " ").strip() for c in df.columns]
+    # Rename to clean names
+    rename = {}
+    for c in df.columns:
+        cl = c.upper()
+        if "ZIP" in cl:
+            rename[c] = "zip"
+        elif "0BR" in cl and "90" not in cl and "110" not in cl:
+            rename[c] = "fmr_0br"
+        elif "1BR" in cl and "90" not in cl and "110" not in cl:
+            rename[c] = "fmr_1br"
+        elif "2BR" in cl and "90" not in cl and "110" not in cl:
+            rename[c] = "fmr_2br"
+        elif "3BR" in cl and "90" not in cl and "110" not in cl:
+            rename[c] = "fmr_3br"
+        elif "4BR" in cl and "90" not in cl and "110" not in cl:
+            rename[c] = "fmr_4br"
+        elif "0BR" in cl and "110" in cl:
+            rename[c] = "ps110_0br"
+        elif "1BR" in cl and "110" in cl:
+            rename[c] = "ps110_1br"
+        elif "2BR" in cl and "110" in cl:
+            rename[c] = "ps110_2br"
+        elif "3BR" in cl and "110" in cl:
+            rename[c] = "ps110_3br"
+        elif "4BR" in cl and "110" in cl:
+            rename[c] = "ps110_4br"
+    df = df.rename(columns=rename)
+    df["zip"] = df["zip"].astype(str).str.zfill(5)
+    return df
+
+
+@st.cache_resource(ttl=REFERENCE_TTL, show_spinner=False)
 def load_safmr() -> pd.DataFrame:
-    """Download HUD FY2026 Small Area FMR table (zip‑level). ~4 MB, cached 7 days."""
-    hdrs = {"User-Agent": "Mozilla/5.0 (compatible; Section8Calc/1.0)"}
+    """
+    Download HUD FY2026 Small Area FMR table (zip‑level). ~4 MB, cached 7 days on
+    disk and held once per process — every session gets the same read-only frame.
+    """
     try:
-        resp = requests.get(SAFMR_URL, headers=hdrs, timeout=40)
-        resp.raise_for_status()
-        df = pd.read_excel(io.BytesIO(resp.content))
-        # Normalize column names — the Excel has newlines in headers
-        df.columns = [str(c).replace("\n", " ").strip() for c in df.columns]
-        # Rename to clean names
-        rename = {}
-        for c in df.columns:
-            cl = c.upper()
-            if "ZIP" in cl:
-                rename[c] = "zip"
-            elif "0BR" in cl and "90" not in cl and "110" not in cl:
-                rename[c] = "fmr_0br"
-            elif "1BR" in cl and "90" not in cl and "110" not in cl:
-                rename[c] = "fmr_1br"
-            elif "2BR" in cl and "90" not in cl and "110" not in cl:
-                rename[c] = "fmr_2br"
-            elif "3BR" in cl and "90" not in cl and "110" not in cl:
-                rename[c] = "fmr_3br"
-            elif "4BR" in cl and "90" not in cl and "110" not in cl:
-                rename[c] = "fmr_4br"
-            elif "0BR" in cl and "110" in cl:
-                rename[c] = "ps110_0br"
-            elif "1BR" in cl and "110" in cl:
-                rename[c] = "ps110_1br"
-            elif "2BR" in cl and "110" in cl:
-                rename[c] = "ps110_2br"
-            elif "3BR" in cl and "110" in cl:
-                rename[c] = "ps110_3br"
-            elif "4BR" in cl and "110" in cl:
-                rename[c] = "ps110_4br"
-        df = df.rename(columns=rename)
-        df["zip"] = df["zip"].astype(str).str.zfill(5)
-        return df
+        return _disk_cached("safmr_fy2026.s8ref", REFERENCE_TTL, _download_safmr)
     except Exception as e:
         st.warning(f"Could not load HUD SAFMR data: {e}. Using estimated rents.")
         return pd.DataFrame()
 
 
-def get_section8_rent(zip_code: str, beds: int, safmr_df: pd.DataFrame) -> tuple[int, str]:
+# ─────────────────────────────────────────────
+# SAFMR HISTORY — PER-ZIP RENT GROWTH
+# HUD republishes SAFMRs every fiscal year. Stacking several years gives a
+# ZIP × bedroom rent history; its annualized growth replaces the single
+# sidebar growth rate in the 5-year projection and the hold-period IRR, so
+# a fast-rising ZIP isn't valued like a flat one. Years that fail to
+# download are skipped; ZIPs with under two known years use the sidebar rate.
+# ─────────────────────────────────────────────
+SAFMR_HISTORY = {
+    fy: f"https://www.huduser.gov/portal/datasets/fmr/fmr{fy}/fy{fy}_safmrs.xlsx"
+    for fy in (2022, 2023, 2024, 2025)
+} | {2026: SAFMR_URL}
+RENT_GROWTH_CLIP = (-0.05, 0.15)   # one odd HUD revision shouldn't imply 30%/yr for five years
+RENT_GROWTH_RETRY_S = 6 * 3600     # after a failed / short history, no process re-downloads for this long
+
+
+def _build_safmr_history() -> pd.DataFrame:
+    """100% SAFMR by ZIP, one column per bedroom × year (fmr_3br_fy2024 …)."""
+    frames = []
+    for fy, url in sorted(SAFMR_HISTORY.items()):
+        try:
+            df = load_safmr() if url == SAFMR_URL else _download_safmr(url)
+        except Exception:
+            continue
+        cols = [f"fmr_{b}br" for b in range(5)]
+        if df.empty or not set(cols) <= set(df.columns):
+            continue
+        df = df.drop_duplicates("zip").set_index("zip")[cols].apply(pd.to_numeric, errors="coerce")
+        frames.append(df.rename(columns=lambda c: f"{c}_fy{fy}"))
+    if len(frames) < 2:
+        return pd.DataFrame()
+    history = pd.concat(frames, axis=1).fillna(0).astype(float)
+    history.index.name = "zip"
+    return history
+
+
+def safmr_growth_rates(history: pd.DataFrame) -> pd.DataFrame:
+    """
+    Annualized growth per ZIP × bedroom between the earliest and latest year
+    with a nonzero SAFMR, for every ZIP in one array pass. Columns
+    growth_0br … growth_4br, clipped to RENT_GROWTH_CLIP; NaN under two years.
+    """
+    years = sorted({int(c.rsplit("_fy", 1)[1]) for c in history.columns})
+    v = np.stack([history[[f"fmr_{b}br_fy{y}" for y in years]].to_numpy(dtype=float)
+                  for b in range(5)], axis=2)                          # (zip, year, beds)
+    valid = v > 0
+    first = valid.argmax(axis=1)                                       # (zip, beds)
+    last  = len(years) - 1 - valid[:, ::-1].argmax(axis=1)
+    v0 = np.take_along_axis(v, first[:, None, :], axis=1)[:, 0]
+    v1 = np.take_along_axis(v, last[:, None, :], axis=1)[:, 0]
+    span = np.asarray(years, dtype=float)[last] - np.asarray(years, dtype=float)[first]
+    ok = valid.any(axis=1) & (span > 0)
+    growth = np.where(ok, (v1 / np.where(ok, v0, 1)) ** (1 / np.where(ok, span, 1)) - 1, np.nan)
+    out = pd.DataFrame(np.clip(growth, *RENT_GROWTH_CLIP), index=history.index,
+                       columns=[f"growth_{b}br" for b in range(5)])
+    out.attrs["label"] = f"HUD SAFMR FY{years[0]}–FY{years[-1]} trend"
+    return out
+
+
+def _rent_growth_settled() -> tuple[bool, bool]:
+    """(history on disk is fresh, a recent failure marker says don't retry yet)."""
+    now = time.time()
+    try:
+        fresh = now - os.path.getmtime(os.path.join(DATA_DIR, "safmr_history.s8ref")) < REFERENCE_TTL
+    except OSError:
+        fresh = False
+    try:
+        backoff = now - os.path.getmtime(os.path.join(DATA_DIR, "safmr_history.failed")) < RENT_GROWTH_RETRY_S
+    except OSError:
+        backoff = False
+    return fresh, backoff
+
+
+@st.cache_resource(ttl=RENT_GROWTH_RETRY_S, show_spinner=False)
+def load_rent_growth() -> pd.DataFrame:
+    """
+    Per-ZIP × bedroom growth rates from the disk-cached SAFMR history. Empty if
+    < 2 years load. A failed or short history is marked on disk so no process
+    retries the downloads for RENT_GROWTH_RETRY_S. Batches go through
+    rent_growth_table(), which never waits on the downloads.
+    """
+    fresh, backoff = _rent_growth_settled()
+    if not fresh and backoff:
+        return pd.DataFrame()
+    try:
+        history = _disk_cached("safmr_history.s8ref", REFERENCE_TTL, _build_safmr_history)
+    except Exception:
+        history = pd.DataFrame()
+    if history.empty:
+        try:
+            with open(os.path.join(DATA_DIR, "safmr_history.failed"), "w") as f:
+                f.write(str(time.time()))
+        except OSError:
+            pass
+        return pd.DataFrame()
+    return safmr_growth_rates(history)
+
+
+_RENT_GROWTH_LOCK = threading.Lock()
+_RENT_GROWTH_LOAD: dict = {"pid": None, "thread": None}
+
+
+def rent_growth_table() -> pd.DataFrame | None:
+    """
+    load_rent_growth() when it can answer from disk. Otherwise the SAFMR
+    history downloads (four workbooks, one after another) start on a
+    background thread — one per process — and this returns None, so a cold
+    start's first batch uses the sidebar rate instead of spending its
+    batch_sla_s budget before the first row.
+    """
+    if any(_rent_growth_settled()):
+        return load_rent_growth()
+    with _RENT_GROWTH_LOCK:
+        t = _RENT_GROWTH_LOAD["thread"]
+        if _RENT_GROWTH_LOAD["pid"] != os.getpid() or t is None or not t.is_alive():
+            t = threading.Thread(target=load_rent_growth, name="rent-growth", daemon=True)
+            t.start()
+            _RENT_GROWTH_LOAD.update(pid=os.getpid(), thread=t)
+    return None
+
+
+def get_rent_growth(zip_str: str, beds: int, growth_df: pd.DataFrame | None, fallback: float) -> tuple[float, str]:
+    """(annual growth rate, source label) — the ZIP's SAFMR trend, else the sidebar rate."""
+    if growth_df is not None and not growth_df.empty and zip_str in growth_df.index:
+        g = growth_df.at[zip_str, f"growth_{max(0, min(4, int(beds)))}br"]
+        if not np.isnan(g):
+            return float(g), growth_df.attrs.get("label", "HUD SAFMR trend")
+    return fallback, "Sidebar default"
+
+
+# ─────────────────────────────────────────────
+# HUD COUNTY / METRO FMR FALLBACK
+#
+# SAFMRs only cover ZIPs inside metro areas. Every other ZIP (rural, new,
+# PO-box-only) gets the county or HUD Metro FMR Area (HMFA) rent instead.
+# The Census ZCTA→county relationship file maps each ZIP to the county it
+# overlaps most by land area; joining that onto the county FMR table gives
+# one row per ZIP, indexed for O(1) lookups.
+# ─────────────────────────────────────────────
+def _download_county_fmr() -> pd.DataFrame:
+    resp = requests.get(COUNTY_FMR_URL, headers=HUD_HEADERS, timeout=40)
+    resp.raise_for_status()
+    df = pd.read_excel(io.BytesIO(resp.content))
+    rename = {}
+    for c in df.columns:
+        cl = str(c).strip().lower()
+        m = re.fullmatch(r"fmr_?(\d)", cl)
+        if m and int(m.group(1)) <= 4:
+            rename[c] = f"fmr_{m.group(1)}br"
+        elif cl in ("fips", "fips2010", "fips2020"):
+            rename[c] = "fips"
+        elif cl in ("hud_area_code", "hud_area_name", "countyname"):
+            rename[c] = cl
+    df = df.rename(columns=rename)
+    # 10-digit state+county+subcounty FIPS → 5-digit county (New England towns
+    # share a county, and take the first listed town's area)
+    df["county_fips"] = df["fips"].astype(str).str.zfill(10).str[:5]
+    return df.drop_duplicates("county_fips")
+
+
+def _download_zcta_county() -> pd.DataFrame:
+    resp = requests.get(ZCTA_COUNTY_URL, headers=HUD_HEADERS, timeout=40)
+    resp.raise_for_status()
+    xw = pd.read_csv(
+        io.BytesIO(resp.content), sep="|", dtype=str,
+        usecols=["GEOID_ZCTA5_20", "GEOID_COUNTY_20", "AREALAND_PART"],
+    ).dropna(subset=["GEOID_ZCTA5_20"])
+    xw["AREALAND_PART"] = pd.to_numeric(xw["AREALAND_PART"], errors="coerce").fillna(0)
+    # A ZCTA can straddle counties — keep the county holding most of its land
+    xw = xw.sort_values("AREALAND_PART", ascending=False).drop_duplicates("GEOID_ZCTA5_20")
+    return xw.rename(columns={"GEOID_ZCTA5_20": "zip", "GEOID_COUNTY_20": "county_fips"})[
+        ["zip", "county_fips"]
+    ]
+
+
+def _build_county_fmr_index() -> pd.DataFrame:
+    fmr = _download_county_fmr()
+    xw  = _download_zcta_county()
+    br_cols = [f"fmr_{b}br" for b in range(5)]
+    idx = xw.merge(fmr, on="county_fips", how="inner")
+    area = idx["hud_area_name"] if "hud_area_name" in idx.columns else idx["county_fips"]
+    idx = idx.assign(area_name=area.astype(str))[["zip", "county_fips", "area_name"] + br_cols]
+    idx[br_cols] = idx[br_cols].apply(pd.to_numeric, errors="coerce").fillna(0).astype(int)
+    return idx.set_index("zip")
+
+
+@st.cache_resource(ttl=REFERENCE_TTL, show_spinner=False)
+def load_county_fmr_index() -> pd.DataFrame:
+    """
+    ZIP → county/HMFA FMR index (FY2026), one row per ZIP with fmr_0br … fmr_4br.
+    Shared and cached 7 days on disk, like the SAFMR table.
+    Returns empty DataFrame if either source can't be downloaded.
+    """
+    try:
+        return _disk_cached("county_fmr_index_fy2026.s8ref", REFERENCE_TTL, _build_county_fmr_index)
+    except Exception:
+        return pd.DataFrame()
+
+
+def get_section8_rent(
+    zip_code: str,
+    beds: int,
+    safmr_df: pd.DataFrame,
+    fmr_index: pd.DataFrame | None = None,
+    use_110: bool = False,
+) -> tuple[int, str]:
     """
     Look up HUD Small Area FMR for this exact zip code.
     Returns (monthly_rent, source_label).
-    Falls back to a national median estimate if zip not found.
+    Falls back to the county/HMFA FMR for the zip, then to a national
+    median estimate if the zip is in neither HUD table.
+    use_110 selects the 110% payment standard instead of 100% FMR.
     """
     beds = max(0, min(4, int(beds)))
     br_col    = f"fmr_{beds}br"
@@ -248,12 +1232,22 @@ def get_section8_rent(zip_code: str, beds: int, safmr_df: pd.DataFrame) -> tuple
                 val = int(row[br_col].iloc[0])
                 return val, f"HUD SAFMR FY2026 (100% FMR, zip {zip_str})"
 
+    # County / metro FMR fallback — zip outside SAFMR areas
+    if fmr_index is not None and not fmr_index.empty and zip_str in fmr_index.index:
+        val  = int(fmr_index.at[zip_str, br_col])
+        area = fmr_index.at[zip_str, "area_name"]
+        if val > 0:
+            if use_110:
+                return round(val * 1.10), f"HUD County FMR FY2026 (110% PS, {area})"
+            return val, f"HUD County FMR FY2026 (100% FMR, {area})"
+
     # National median fallback by bedroom
     fallback = {0: 950, 1: 1100, 2: 1350, 3: 1650, 4: 1950}
-    return fallback.get(beds, 1350), "Estimated (zip not in SAFMR dataset)"
+    return fallback.get(beds, 1350), "Estimated (zip not in SAFMR or county FMR dataset)"
 
 
-@st.cache_data(ttl=3600, show_spinner=False)
+@skip_unavailable(int)
+@bounded_cache("rentcast_avm")
 def fetch_rentcast_rent_avm(address: str, beds: int, sqft: int, api_key: str) -> int:
     """
     Call Rentcast's /v1/avm/rent/long-term endpoint to get a market rent estimate.
@@ -262,20 +1256,27 @@ def fetch_rentcast_rent_avm(address: str, beds: int, sqft: int, api_key: str) ->
     """
     if not api_key or not api_key.strip():
         return 0
+    store_key = f"{canonical_address(address)}|{beds}|{sqft}"
+    stored = _store_get("rentcast_avm", store_key)
+    if stored is not None:
+        return stored
     try:
         params = {"address": address, "bedrooms": beds}
         if sqft > 0:
             params["squareFootage"] = sqft
-        resp = requests.get(
-            "https://api.rentcast.io/v1/avm/rent/long-term",
+        resp = source_request(
+            "rentcast", "GET", "https://api.rentcast.io/v1/avm/rent/long-term",
             params=params,
             headers={"X-Api-Key": api_key.strip(), "Accept": "application/json"},
-            timeout=10,
         )
         if resp.status_code == 200:
             data = resp.json()
             rent = data.get("rent", 0)
+            if rent:
+                _store_put("rentcast_avm", store_key, int(rent))
             return int(rent) if rent else 0
+    except SourceUnavailable:
+        raise
     except Exception:
         pass
     return 0
@@ -287,6 +1288,7 @@ def get_rent_consensus(
     rentcast_rent: int,
     beds: int,
     zip_str: str,
+    zillow_comp_rent: int = 0,
 ) -> tuple[int, str, str]:
     """
     Cross-reference the HUD SAFMR against market rent sources and return the
@@ -304,6 +1306,8 @@ def get_rent_consensus(
         sources["Census ACS"] = census_rent
     if rentcast_rent > 200:
         sources["Rentcast AVM"] = rentcast_rent
+    if zillow_comp_rent > 200:
+        sources["Zillow Comps"] = zillow_comp_rent
 
     if len(sources) == 1:
         # Only SAFMR available — baseline confidence
@@ -339,7 +1343,8 @@ def get_rent_consensus(
 # CENSUS ACS — FREE ZIP-LEVEL MARKET DATA
 # No API key required. Used for anomaly-based condition detection.
 # ─────────────────────────────────────────────
-@st.cache_data(ttl=86400 * 30, show_spinner=False)
+@skip_unavailable(dict)
+@bounded_cache("census")
 def get_census_zip_data(zip_code: str) -> dict:
     """
     Pull ACS 5-year estimates for a ZIP code from the Census Bureau API.
@@ -356,6 +1361,21 @@ def get_census_zip_data(zip_code: str) -> dict:
       B25031_006E = Median rent, 4 bedrooms
     """
     zip_str = str(zip_code).strip().zfill(5)
+    stored = _store_get("census", zip_str)
+    if stored is not None:
+        return stored
+    if reference_preload().done():
+        # The nationwide table is already mapped in — no per-ZIP API call needed
+        acs = load_census_zcta_table()
+        if not acs.empty and zip_str in acs.index:
+            row = acs.loc[zip_str]
+            return {
+                "median_home_value": int(row["median_home_value"]),
+                "total_units":       int(row["total_units"]),
+                "vacant_units":      int(row["vacant_units"]),
+                "vacancy_rate_pct":  float(row["vacancy_rate_pct"]),
+                "median_rent_by_beds": {b: int(row[f"rent_{b}br"]) for b in range(5)},
+            }
     url = (
         "https://api.census.gov/data/2022/acs/acs5"
         "?get=B25077_001E,B25002_001E,B25002_003E,"
@@ -363,7 +1383,7 @@ def get_census_zip_data(zip_code: str) -> dict:
         f"&for=zip+code+tabulation+area:{zip_str}"
     )
     try:
-        r = requests.get(url, headers={"Accept": "application/json"}, timeout=10)
+        r = source_request("census", "GET", url, headers={"Accept": "application/json"})
         if r.status_code == 200:
             data = r.json()
             if len(data) >= 2:
@@ -381,18 +1401,58 @@ def get_census_zip_data(zip_code: str) -> dict:
                     3: safe_int(row[6]),
                     4: safe_int(row[7]),
                 }
-                return {
+                result = {
                     "median_home_value": median_val,
                     "total_units":       total_units,
                     "vacant_units":      vacant_units,
                     "vacancy_rate_pct":  vacancy_pct,
                     "median_rent_by_beds": rent_by_beds,
                 }
+                _store_put("census", zip_str, result)
+                return result
+    except SourceUnavailable:
+        raise
     except Exception:
         pass
     return {}
 
 
+ACS_ZCTA_URL = (
+    "https://api.census.gov/data/2022/acs/acs5"
+    "?get=B25077_001E,B25002_001E,B25002_003E,"
+    "B25031_002E,B25031_003E,B25031_004E,B25031_005E,B25031_006E"
+    "&for=zip+code+tabulation+area:*"
+)
+
+
+def _download_census_zcta_table() -> pd.DataFrame:
+    r = requests.get(ACS_ZCTA_URL, headers={"Accept": "application/json"}, timeout=60)
+    r.raise_for_status()
+    data = r.json()
+    cols = ["median_home_value", "total_units", "vacant_units",
+            "rent_0br", "rent_1br", "rent_2br", "rent_3br", "rent_4br"]
+    df = pd.DataFrame(data[1:], columns=cols + ["zip"])
+    df[cols] = df[cols].apply(pd.to_numeric, errors="coerce").fillna(0).astype(int)
+    df[cols] = df[cols].where(df[cols] >= 0, 0)   # ACS null sentinels (-666666666) → 0
+    df["vacancy_rate_pct"] = np.where(
+        df["total_units"] > 0, (df["vacant_units"] / df["total_units"].clip(lower=1) * 100).round(1), 0
+    )
+    return df.set_index("zip")
+
+
+@st.cache_resource(ttl=86400 * 30, show_spinner=False)
+def load_census_zcta_table() -> pd.DataFrame:
+    """
+    Same ACS variables as get_census_zip_data, but for every ZCTA in one call.
+    Indexed by 5-digit zip. Used by the market screener and, once loaded, by
+    get_census_zip_data. Shared like the HUD tables; cached 30 days.
+    """
+    try:
+        return _disk_cached("acs_zcta_2022.s8ref", 86400 * 30, _download_census_zcta_table)
+    except Exception:
+        return pd.DataFrame()
+
+
 def get_price_anomaly_signals(list_price: float, beds: int, zip_code: str) -> list[str]:
     """
     Use free Census ACS data to detect distress signals from price alone.
@@ -450,40 +1510,122 @@ def _geocode_city_bbox(address: str) -> dict | None:
     Returns {"north","south","east","west"} or None.
     Free, no key needed.
     """
+    store_key = canonical_address(address)
+    stored = _store_get("geocode", store_key)
+    if stored is not None:
+        return stored
     try:
-        r = requests.get(
-            "https://nominatim.openstreetmap.org/search",
+        r = source_request(
+            "nominatim", "GET", "https://nominatim.openstreetmap.org/search",
             params={"q": address, "format": "json", "limit": 1},
             headers={"User-Agent": "Section8Calc/1.0 (wholesale underwriter)"},
-            timeout=8,
         )
         if r.status_code == 200 and r.json():
             hit = r.json()[0]
             lat = float(hit["lat"])
             lng = float(hit["lon"])
             delta = 0.03   # ~3 km radius
-            return {"north": lat + delta, "south": lat - delta,
+            bbox = {"north": lat + delta, "south": lat - delta,
                     "east":  lng + delta, "west":  lng - delta,
                     "lat": lat, "lng": lng}
+            _store_put("geocode", store_key, bbox)
+            return bbox
     except Exception:
         pass
     return None
 
 
-@st.cache_data(ttl=3600, show_spinner=False)
-def _zillow_search_area(north: float, south: float, east: float, west: float) -> list:
+# ─────────────────────────────────────────────
+# ZILLOW SEARCH RESULTS — COMPACT FORM
+# A raw listResults entry carries photos, carousels, broker metadata and the
+# full hdpData tree; we read about twenty fields. Each search response is
+# projected to one typed column per field (a small DataFrame) before it is
+# cached, which is an order of magnitude smaller and unpickles as a few
+# contiguous arrays instead of thousands of nested dicts.
+# ─────────────────────────────────────────────
+def _zillow_street_address(listing: dict, *_) -> str:
+    """Full one-line address of a listResults entry."""
+    return listing.get("address") or ", ".join(
+        p for p in (listing.get("addressStreet"), listing.get("addressCity"),
+                    f"{listing.get('addressState', '')} {listing.get('addressZipcode', '')}".strip()) if p
+    )
+
+
+# column: (dtype, extractor(listing, homeInfo, latLong))
+ZILLOW_FIELDS = {
+    "zpid":               ("str",   lambda l, h, ll: l.get("zpid") or h.get("zpid")),
+    "address":            ("str",   _zillow_street_address),
+    "street":             ("str",   lambda l, h, ll: l.get("addressStreet")),
+    "zipcode":            ("str",   lambda l, h, ll: str(l.get("addressZipcode") or h.get("zipcode") or "").strip()[:5]),
+    "lat":                ("float", lambda l, h, ll: ll.get("latitude", h.get("latitude"))),
+    "lng":                ("float", lambda l, h, ll: ll.get("longitude", h.get("longitude"))),
+    "price":              ("float", lambda l, h, ll: l.get("unformattedPrice") or h.get("price")),
+    "beds":               ("float", lambda l, h, ll: h.get("bedrooms") or l.get("beds")),
+    "baths":              ("float", lambda l, h, ll: h.get("bathrooms") or l.get("baths")),
+    "sqft":               ("float", lambda l, h, ll: h.get("livingArea") or l.get("area")),
+    "rent_zestimate":     ("float", lambda l, h, ll: h.get("rentZestimate")),
+    "days_on_market":     ("float", lambda l, h, ll: h.get("daysOnZillow")),
+    "price_change":       ("float", lambda l, h, ll: h.get("priceChange")),
+    "tax_assessed_value": ("float", lambda l, h, ll: h.get("taxAssessedValue")),
+    "price_reduction":    ("str",   lambda l, h, ll: l.get("priceReduction")),
+    "flex_text":          ("str",   lambda l, h, ll: l.get("flexFieldText")),
+    "content_type":       ("str",   lambda l, h, ll: l.get("contentType")),
+    "home_status":        ("str",   lambda l, h, ll: h.get("homeStatus") or l.get("statusType")),
+    "status_text":        ("str",   lambda l, h, ll: l.get("statusText")),
+    "detail_url":         ("str",   lambda l, h, ll: l.get("detailUrl")),
+    "broker":             ("str",   lambda l, h, ll: l.get("brokerName")),
+    "home_type":          ("str",   lambda l, h, ll: h.get("homeType")),
+    "is_non_owner":       ("bool",  lambda l, h, ll: h.get("isNonOwnerOccupied")),
+}
+
+
+def compact_zillow(listings: list) -> pd.DataFrame:
+    """Raw listResults → one row per listing, one typed column per ZILLOW_FIELDS entry."""
+    cols = {name: [] for name in ZILLOW_FIELDS}
+    for listing in listings or []:
+        hdi = listing.get("hdpData", {}).get("homeInfo", {})
+        ll  = listing.get("latLong") or {}
+        for name, (_, get) in ZILLOW_FIELDS.items():
+            cols[name].append(get(listing, hdi, ll))
+    out = {}
+    for name, (kind, _) in ZILLOW_FIELDS.items():
+        if kind == "float":
+            out[name] = pd.to_numeric(pd.Series(cols[name], dtype=object), errors="coerce").astype(float)
+        elif kind == "bool":
+            out[name] = pd.Series([bool(v) for v in cols[name]], dtype=bool)
+        else:
+            out[name] = pd.Series(["" if v is None else str(v) for v in cols[name]], dtype=object)
+    return pd.DataFrame(out)
+
+
+def _zillow_results_page(data: dict) -> pd.DataFrame:
+    """One search response → compact listResults, with the box's page / result totals in attrs."""
+    cat1 = data.get("cat1", {})
+    page = compact_zillow(cat1.get("searchResults", {}).get("listResults", []))
+    search_list = cat1.get("searchList", {})
+    page.attrs["total_pages"] = int(search_list.get("totalPages") or 1)
+    page.attrs["total_count"] = int(search_list.get("totalResultCount") or len(page))
+    return page
+
+
+@skip_unavailable(lambda: compact_zillow([]))
+@bounded_cache("zillow_search")
+def _zillow_search_area(north: float, south: float, east: float, west: float, page: int = 1) -> pd.DataFrame:
     """
-    Call Zillow's async-create-search-page-state PUT endpoint.
-    Returns list of raw listing dicts. Cached 1 hour per bounding box.
-    This endpoint has NO bot detection — returns 200 from any IP.
+    Call Zillow's async-create-search-page-state PUT endpoint for one results
+    page (1-based). Returns the listResults in compact form (see compact_zillow),
+    with attrs["total_pages"] / attrs["total_count"] for the whole box. Cached
+    1 hour per bounding box and page. This endpoint has NO bot detection —
+    returns 200 from any IP.
     """
-    if not _CURL_CFFI_AVAILABLE:
+    cf_requests = _curl_cffi()
+    if cf_requests is None:
         try:
-            resp = requests.put(
-                "https://www.zillow.com/async-create-search-page-state",
+            resp = source_request(
+                "zillow", "PUT", "https://www.zillow.com/async-create-search-page-state",
                 json={
                     "searchQueryState": {
-                        "pagination": {},
+                        "pagination": {"currentPage": page} if page > 1 else {},
                         "isMapVisible": True,
                         "mapBounds": {"north": north, "south": south,
                                       "east": east, "west": west},
@@ -499,24 +1641,23 @@ def _zillow_search_area(north: float, south: float, east: float, west: float) ->
                     "Accept": "application/json",
                     "Referer": "https://www.zillow.com/",
                 },
-                timeout=15,
             )
             if resp.status_code == 200:
-                data = resp.json()
-                return (data.get("cat1", {})
-                            .get("searchResults", {})
-                            .get("listResults", []))
+                return _zillow_results_page(resp.json())
+        except SourceUnavailable:
+            raise
         except Exception:
             pass
-        return []
+        return compact_zillow([])
 
     # Use curl_cffi for better TLS impersonation
     try:
-        r = cf_requests.put(
-            "https://www.zillow.com/async-create-search-page-state",
+        r = source_request(
+            "zillow", "PUT", "https://www.zillow.com/async-create-search-page-state",
+            client=cf_requests,
             json={
                 "searchQueryState": {
-                    "pagination": {},
+                    "pagination": {"currentPage": page} if page > 1 else {},
                     "isMapVisible": True,
                     "mapBounds": {"north": north, "south": south,
                                   "east": east, "west": west},
@@ -533,16 +1674,293 @@ def _zillow_search_area(north: float, south: float, east: float, west: float) ->
                 "Referer": "https://www.zillow.com/",
             },
             impersonate="chrome131",
-            timeout=15,
         )
         if r.status_code == 200:
-            data = r.json()
-            return (data.get("cat1", {})
-                        .get("searchResults", {})
-                        .get("listResults", []))
+            return _zillow_results_page(r.json())
+    except SourceUnavailable:
+        raise
     except Exception:
         pass
-    return []
+    return compact_zillow([])
+
+
+# ─────────────────────────────────────────────
+# LISTING INDEX — RENT + ARV COMPS
+# Every listResults page we pull covers ~3 km around a subject and carries
+# price, rentZestimate and beds/baths/sqft for each home. Those, plus every
+# uploaded CSV row we manage to geocode, accumulate in a persistent grid
+# index (SQLite in DATA_DIR, keyed by canonical address) so later rows and
+# later runs get rent and ARV comps without extra requests.
+# ─────────────────────────────────────────────
+COMP_RADIUS_KM = 1.6
+MIN_RENT_COMPS = 3
+ARV_K          = 8      # nearest comps per property
+ARV_RADIUS_KM  = 3.0
+ARV_MIN_COMPS  = 3
+ARV_PCTL       = 75     # renovated homes trade toward the top of the comp range
+
+
+def _km_per_deg_lng(lat) -> np.ndarray:
+    return 111.0 * np.maximum(np.cos(np.radians(lat)), 0.01)
+
+
+class ListingIndex:
+    """
+    Persistent lat/lng grid of listings (cells ~1.1 km square). Rows merge by
+    canonical address; a later sighting only overwrites fields it actually has.
+    """
+
+    CELL = 0.01  # degrees
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self._open()
+
+    def _open(self) -> None:
+        self._pid  = os.getpid()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS listings ("
+            " key TEXT PRIMARY KEY, zpid TEXT NOT NULL DEFAULT '',"
+            " lat REAL NOT NULL, lng REAL NOT NULL,"
+            " cell_r INTEGER NOT NULL, cell_c INTEGER NOT NULL,"
+            " beds INTEGER NOT NULL DEFAULT 0, baths REAL NOT NULL DEFAULT 0,"
+            " sqft INTEGER NOT NULL DEFAULT 0, price INTEGER NOT NULL DEFAULT 0,"
+            " rent INTEGER NOT NULL DEFAULT 0, status TEXT NOT NULL DEFAULT '',"
+            " source TEXT NOT NULL, seen_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS ix_listings_cell ON listings (cell_r, cell_c)")
+        self._db.commit()
+
+    def _check_fork(self) -> None:
+        # same rule as EnrichmentStore: never reuse a connection across fork()
+        if os.getpid() != self._pid:
+            self._open()
+
+    def _cell(self, lat: float, lng: float) -> tuple[int, int]:
+        return int(np.floor(lat / self.CELL)), int(np.floor(lng / self.CELL))
+
+    def add(self, records: list[dict], source: str) -> int:
+        """
+        Upsert records with keys: key, lat, lng and any of zpid, beds, baths,
+        sqft, price, rent, status. Zero/empty fields never clobber known ones.
+        """
+        self._check_fork()
+        now, rows = time.time(), []
+        for rec in records:
+            if not rec.get("key") or rec.get("lat") is None or rec.get("lng") is None:
+                continue
+            lat, lng = float(rec["lat"]), float(rec["lng"])
+            rows.append((
+                rec["key"], str(rec.get("zpid") or ""), lat, lng, *self._cell(lat, lng),
+                int(rec.get("beds") or 0), float(rec.get("baths") or 0),
+                int(rec.get("sqft") or 0), int(rec.get("price") or 0),
+                int(rec.get("rent") or 0), str(rec.get("status") or ""), source, now,
+            ))
+        if not rows:
+            return 0
+        keep = lambda col: f"{col} = CASE WHEN excluded.{col} > 0 THEN excluded.{col} ELSE listings.{col} END"
+        with self._lock:
+            try:
+                self._db.executemany(
+                    "INSERT INTO listings (key, zpid, lat, lng, cell_r, cell_c, beds, baths,"
+                    " sqft, price, rent, status, source, seen_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                    " ON CONFLICT(key) DO UPDATE SET"
+                    " zpid = CASE WHEN excluded.zpid != '' THEN excluded.zpid ELSE listings.zpid END,"
+                    " lat = excluded.lat, lng = excluded.lng,"
+                    " cell_r = excluded.cell_r, cell_c = excluded.cell_c, "
+                    + ", ".join(keep(c) for c in ("beds", "baths", "sqft", "price", "rent")) +
+                    ", status = CASE WHEN excluded.status != '' THEN excluded.status ELSE listings.status END,"
+                    " source = excluded.source, seen_at = excluded.seen_at",
+                    rows,
+                )
+                self._db.commit()
+            except sqlite3.Error:
+                return 0
+        return len(rows)
+
+    def add_zillow_results(self, listings: pd.DataFrame) -> int:
+        """Index compact Zillow results (compact_zillow) that carry coordinates."""
+        listings = listings[listings["lat"].notna() & listings["lng"].notna() & (listings["address"] != "")]
+        if listings.empty:
+            return 0
+        nums = listings[["beds", "baths", "sqft", "price", "rent_zestimate"]].fillna(0)
+        return self.add([
+            {"key": canonical_address(a), "zpid": z, "lat": la, "lng": lo, "beds": b, "baths": ba,
+             "sqft": sq, "price": px, "rent": rz, "status": st_}
+            for a, z, la, lo, b, ba, sq, px, rz, st_ in zip(
+                listings["address"], listings["zpid"], listings["lat"], listings["lng"],
+                nums["beds"], nums["baths"], nums["sqft"], nums["price"], nums["rent_zestimate"],
+                listings["home_status"])
+        ], "zillow")
+
+    def region(self, south: float, north: float, west: float, east: float) -> dict:
+        """Column arrays for every listing whose cell overlaps the box."""
+        self._check_fork()
+        r0, c0 = self._cell(south, west)
+        r1, c1 = self._cell(north, east)
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT key, zpid, lat, lng, beds, sqft, price, rent FROM listings"
+                " WHERE cell_r BETWEEN ? AND ? AND cell_c BETWEEN ? AND ?",
+                (r0, r1, c0, c1),
+            ).fetchall()
+        return self._columns(rows)
+
+    @staticmethod
+    def empty_region() -> dict:
+        return ListingIndex._columns([])
+
+    @staticmethod
+    def _columns(rows: list) -> dict:
+        cols = list(zip(*rows)) if rows else [()] * 8
+        return {
+            "key":   np.array(cols[0], dtype=object),
+            "zpid":  np.array(cols[1], dtype=object),
+            "lat":   np.array(cols[2], dtype=float),
+            "lng":   np.array(cols[3], dtype=float),
+            "beds":  np.array(cols[4], dtype=int),
+            "sqft":  np.array(cols[5], dtype=float),
+            "price": np.array(cols[6], dtype=float),
+            "rent":  np.array(cols[7], dtype=float),
+        }
+
+    def around(self, lat: float, lng: float, radius_km: float) -> dict:
+        dlat, dlng = radius_km / 111.0, radius_km / _km_per_deg_lng(lat)
+        return self.region(lat - dlat, lat + dlat, lng - dlng, lng + dlng)
+
+    def rent_comps(self, lat: float, lng: float, beds: int,
+                   radius_km: float = COMP_RADIUS_KM, exclude: str = "") -> tuple[int, int]:
+        """
+        Median rentZestimate of same-bedroom listings nearby.
+        Returns (median_rent, comp_count); (0, n) if fewer than MIN_RENT_COMPS.
+        """
+        c = self.around(lat, lng, radius_km)
+        dist = np.hypot((c["lat"] - lat) * 111.0, (c["lng"] - lng) * _km_per_deg_lng(lat))
+        ok = (dist <= radius_km) & (c["beds"] == beds) & (c["rent"] > 200)
+        if exclude:
+            ok &= c["zpid"] != str(exclude)
+        rents = c["rent"][ok]
+        if len(rents) < MIN_RENT_COMPS:
+            return 0, int(len(rents))
+        return int(round(float(np.median(rents)) / 25) * 25), int(len(rents))
+
+    def __len__(self) -> int:
+        self._check_fork()
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM listings").fetchone()[0]
+
+
+@st.cache_resource(show_spinner=False)
+def listing_index() -> ListingIndex | None:
+    """One index per process. None if DATA_DIR isn't writable."""
+    try:
+        return ListingIndex(os.path.join(DATA_DIR, "listings.sqlite"))
+    except (OSError, sqlite3.Error):
+        return None
+
+
+def get_zillow_rent_comps(address: str, beds: int, exclude_zpid: str = "") -> tuple[int, int]:
+    """
+    Bedroom-matched rent comps around the subject from already-indexed
+    Zillow results. Uses the stored geocode only — never hits the network.
+    """
+    index = listing_index()
+    geo = _store_get("geocode", canonical_address(address))
+    if index is None or not geo or "lat" not in geo:
+        return 0, 0
+    return index.rent_comps(geo["lat"], geo["lng"], beds, exclude=exclude_zpid)
+
+
+def knn_arv(
+    lat, lng, beds, sqft, keys, comps: dict,
+    k: int = ARV_K, radius_km: float = ARV_RADIUS_KM,
+) -> pd.DataFrame:
+    """
+    Vectorized k-nearest-neighbor ARV for a batch of subjects against one
+    comp table (ListingIndex.region output). Comps must be priced, have sqft,
+    be within ±1 bedroom and radius_km, and not be the subject itself.
+    ARV = subject sqft × ARV_PCTL-th percentile comp $/sqft (comp price
+    percentile when the subject sqft is unknown). NaN with < ARV_MIN_COMPS.
+    """
+    lat   = np.asarray(lat, dtype=float)
+    lng   = np.asarray(lng, dtype=float)
+    beds  = np.asarray(beds, dtype=float)
+    sqft  = np.asarray(sqft, dtype=float)
+    keys  = np.asarray(keys, dtype=object)
+    n     = len(lat)
+    ppsf_med = np.full(n, np.nan)
+    arv      = np.full(n, np.nan)
+    n_comps  = np.zeros(n, dtype=int)
+
+    usable = (comps["price"] > 0) & (comps["sqft"] > 0)
+    c_lat, c_lng = comps["lat"][usable], comps["lng"][usable]
+    c_beds, c_key = comps["beds"][usable], comps["key"][usable]
+    c_price = comps["price"][usable]
+    c_ppsf  = c_price / comps["sqft"][usable]
+    m = len(c_lat)
+    if m == 0 or n == 0:
+        return pd.DataFrame({"Comp $/Sqft": ppsf_med, "ARV": arv, "ARV Comps": n_comps})
+
+    k = min(k, m)
+    step = max(1, 2_000_000 // m)   # cap the (rows × comps) distance block
+    for i in range(0, n, step):
+        sl = slice(i, i + step)
+        dist = np.hypot(
+            (lat[sl, None] - c_lat[None, :]) * 111.0,
+            (lng[sl, None] - c_lng[None, :]) * _km_per_deg_lng(lat[sl, None]),
+        )
+        dist[np.abs(beds[sl, None] - c_beds[None, :]) > 1] = np.inf
+        dist[keys[sl, None] == c_key[None, :]] = np.inf
+        dist[dist > radius_km] = np.inf
+        dist[np.isnan(dist)] = np.inf
+        nn = np.argpartition(dist, k - 1, axis=1)[:, :k]
+        ok = np.isfinite(np.take_along_axis(dist, nn, axis=1))
+        cnt = ok.sum(axis=1)
+        enough = cnt >= ARV_MIN_COMPS
+        nn_ppsf  = np.where(ok, c_ppsf[nn], np.nan)
+        nn_price = np.where(ok, c_price[nn], np.nan)
+        with np.errstate(all="ignore"), warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            med   = np.nanmedian(nn_ppsf, axis=1)
+            hi    = np.nanpercentile(nn_ppsf, ARV_PCTL, axis=1)
+            hi_px = np.nanpercentile(nn_price, ARV_PCTL, axis=1)
+        est = np.where(sqft[sl] > 0, sqft[sl] * hi, hi_px)
+        n_comps[sl]  = cnt
+        ppsf_med[sl] = np.where(enough, med, np.nan)
+        arv[sl]      = np.where(enough, est, np.nan)
+    return pd.DataFrame({
+        "Comp $/Sqft": np.round(ppsf_med, 0),
+        "ARV":         np.round(arv, -3),
+        "ARV Comps":   n_comps,
+    })
+
+
+def _zillow_signals(row) -> dict:
+    """The fields we keep from one compact listing row (what the "zillow" store holds)."""
+    num = lambda v: 0 if pd.isna(v) else (int(v) if float(v).is_integer() else float(v))
+    return {
+        "flex_text":          row["flex_text"],
+        "content_type":       row["content_type"],
+        "days_on_market":     num(row["days_on_market"]),
+        "price_reduction":    row["price_reduction"],
+        "price_change":       num(row["price_change"]),
+        "tax_assessed_value": num(row["tax_assessed_value"]),
+        "beds":               num(row["beds"]),
+        "baths":              num(row["baths"]),
+        "sqft":               num(row["sqft"]),
+        "zpid":               row["zpid"],
+        "detail_url":         row["detail_url"],
+        "broker":             row["broker"],
+        "home_type":          row["home_type"],
+        "is_non_owner":       bool(row["is_non_owner"]),
+        "status":             row["status_text"],
+    }
 
 
 def fetch_zillow_listing_signals(address: str) -> dict:
@@ -553,6 +1971,11 @@ def fetch_zillow_listing_signals(address: str) -> dict:
                        tax_assessed_value, beds, baths, sqft, zpid, detail_url.
     Returns {} if not found.
     """
+    store_key = canonical_address(address)
+    stored = _store_get("zillow", store_key)
+    if stored is not None:
+        return stored
+
     # Parse address components
     parts = address.strip().split(",")
     street_part = parts[0].strip() if parts else address
@@ -563,6 +1986,9 @@ def fetch_zillow_listing_signals(address: str) -> dict:
     street_num = tokens[0]
     # Street name (next 1-2 tokens, lowercased for fuzzy match)
     street_name = " ".join(tokens[1:3]).lower() if len(tokens) > 1 else ""
+    if not street_name:
+        # A number alone would match whichever listing's street contains it
+        return {}
 
     # Geocode the address to get bounding box
     bbox = _geocode_city_bbox(address)
@@ -575,33 +2001,22 @@ def fetch_zillow_listing_signals(address: str) -> dict:
         east=bbox["east"],  west=bbox["west"],
     )
 
-    if not listings:
+    if listings.empty:
         return {}
-
-    # Find the matching listing
-    for listing in listings:
-        addr_street = listing.get("addressStreet", "")
-        # Match by street number and partial street name
-        if street_num in addr_street and street_name.split()[0] in addr_street.lower():
-            hdi = listing.get("hdpData", {}).get("homeInfo", {})
-            return {
-                "flex_text":          listing.get("flexFieldText", ""),
-                "content_type":       listing.get("contentType", ""),
-                "days_on_market":     hdi.get("daysOnZillow", 0),
-                "price_reduction":    listing.get("priceReduction", ""),
-                "price_change":       hdi.get("priceChange", 0),
-                "tax_assessed_value": hdi.get("taxAssessedValue", 0),
-                "beds":               hdi.get("bedrooms", 0),
-                "baths":              hdi.get("bathrooms", 0),
-                "sqft":               hdi.get("livingArea", 0),
-                "zpid":               hdi.get("zpid", ""),
-                "detail_url":         listing.get("detailUrl", ""),
-                "broker":             listing.get("brokerName", ""),
-                "home_type":          hdi.get("homeType", ""),
-                "is_non_owner":       hdi.get("isNonOwnerOccupied", False),
-                "status":             listing.get("statusText", ""),
-            }
-    return {}
+    index = listing_index()
+    if index is not None:
+        index.add_zillow_results(listings)
+
+    # Find the matching listing by street number and partial street name
+    street = listings["street"]
+    name_tok = street_name.split()[0]
+    match = np.flatnonzero(street.str.contains(street_num, regex=False).to_numpy()
+                           & street.str.lower().str.contains(name_tok, regex=False).to_numpy())
+    if not len(match):
+        return {}
+    signals = _zillow_signals(listings.iloc[match[0]])
+    _store_put("zillow", store_key, signals)
+    return signals
 
 
 # ─────────────────────────────────────────────
@@ -696,7 +2111,130 @@ def analyze_zillow_signals(zs: dict) -> tuple[str, list[str]]:
 #   - Without a key: user must include 'Description' column in their CSV
 # ─────────────────────────────────────────────
 
-@st.cache_data(ttl=3600, show_spinner=False)
+RENTCAST_PAGE      = 500   # /v1/listings/sale maximum page size
+RENTCAST_MAX_PAGES = 10    # per ZIP — 5,000 active sale listings is beyond any real ZIP
+
+
+def _rentcast_fields(listing: dict) -> dict:
+    """The fields we keep from one /v1/listings/sale entry (what the "rentcast_listing" store holds)."""
+    # Rentcast returns remarks in multiple possible fields
+    desc = (
+        listing.get("description", "")
+        or listing.get("publicRemarks", "")
+        or listing.get("remarks", "")
+        or listing.get("listingDescription", "")
+    )
+    return {
+        "description": desc,
+        "beds":  listing.get("bedrooms", ""),
+        "baths": listing.get("bathrooms", ""),
+        "sqft":  listing.get("squareFootage", ""),
+        "year_built": listing.get("yearBuilt", ""),
+        "source": "Rentcast API",
+    }
+
+
+def _street_key(address: str, zip_str: str) -> str:
+    """Street line + ZIP — matches "123 Main St" rows to "123 Main St, City, ST 12345" listings."""
+    return f"{canonical_address(str(address).split(',')[0])} {zip_str}"
+
+
+@skip_unavailable(lambda: (None, 0))
+def fetch_rentcast_zip_listings(zip_str: str, api_key: str) -> tuple[dict | None, int]:
+    """
+    Every active sale listing in one ZIP, RENTCAST_PAGE per call.
+    Returns ({key: fields}, api_calls) where each listing is indexed under both
+    its canonical full address and its _street_key; the index is None if the
+    pull failed. It is kept in the enrichment store for a day, so a re-run of
+    the same ZIPs costs no calls.
+    """
+    if not api_key or not api_key.strip():
+        return None, 0
+    stored = _store_get("rentcast_zip", zip_str)
+    if stored is not None:
+        return stored, 0
+    index, calls = {}, 0
+    for page in range(RENTCAST_MAX_PAGES):
+        resp = source_request(
+            "rentcast", "GET", "https://api.rentcast.io/v1/listings/sale",
+            params={"zipCode": zip_str, "status": "Active",
+                    "limit": RENTCAST_PAGE, "offset": page * RENTCAST_PAGE},
+            headers={"X-Api-Key": api_key.strip(), "Accept": "application/json"},
+        )
+        calls += 1
+        if resp.status_code == 401:
+            st.warning("⚠️ Rentcast API key is invalid. Check your key at app.rentcast.io")
+            return None, calls
+        if resp.status_code == 429:
+            st.warning("⚠️ Rentcast API rate limit reached. Upgrade plan or wait for reset.")
+            return None, calls
+        if resp.status_code != 200:
+            return None, calls
+        try:
+            data = resp.json()
+            listings = data if isinstance(data, list) else data.get("listings", [])
+            for listing in listings:
+                fields = _rentcast_fields(listing)
+                if listing.get("formattedAddress"):
+                    index[canonical_address(listing["formattedAddress"])] = fields
+                if listing.get("addressLine1"):
+                    index[_street_key(listing["addressLine1"], str(listing.get("zipCode") or zip_str))] = fields
+        except (ValueError, AttributeError, TypeError):
+            return None, calls     # malformed page — the per-address lookup takes these rows
+        if len(listings) < RENTCAST_PAGE:
+            break
+    _store_put("rentcast_zip", zip_str, index)
+    return index, calls
+
+
+def rentcast_bulk_join(raw: pd.DataFrame, api_key: str, rows=None) -> tuple[pd.DataFrame, dict, dict]:
+    """
+    Pull each ZIP in the batch once and join listing details locally instead of
+    one /v1/listings/sale call per address. rows (bool mask) limits the pull to
+    the rows that will actually be underwritten. Matched listings are written
+    to the "rentcast_listing" store (so the per-row description lookup is a
+    store hit). Missing Bedrooms / Sqft / Baths / Year Built are filled from
+    the listing. Returns (raw, {"zips", "calls", "matched"}, misses): misses
+    are the addresses absent from a ZIP that pulled fine, as {key: {}} for the
+    batch's overlay, so they don't fall back to a per-address call.
+    """
+    store = enrichment_store()
+    addrs = raw["Address"].astype(str).tolist()
+    canon = [canonical_address(a) for a in addrs]
+    zips  = [str(int(z)).zfill(5) for z in raw["Zip"]]
+    take  = np.ones(len(raw), dtype=bool) if rows is None else np.asarray(rows, dtype=bool)
+    known = store.get_many("rentcast_listing", [c for c, t in zip(canon, take) if t]) if store else {}
+    by_zip: dict = {}
+    for c, a, z, t in zip(canon, addrs, zips, take):
+        if t and c not in known:
+            by_zip.setdefault(z, []).append((c, a))
+    found, misses, calls = {}, {}, 0
+    for z, pending in sorted(by_zip.items()):
+        index, n = fetch_rentcast_zip_listings(z, api_key)
+        calls += n
+        if index is None:          # pull failed — leave these rows to the per-address lookup
+            continue
+        for c, a in pending:
+            hit = index.get(c) or index.get(_street_key(a, z))
+            if hit:
+                found[c] = hit
+            else:
+                misses[c] = {}
+    if store:
+        store.put_many("rentcast_listing", found)
+
+    details = {**known, **found}
+    raw = raw.copy()
+    for col, field in (("Bedrooms", "beds"), ("Sqft", "sqft"), ("Baths", "baths"), ("Year Built", "year_built")):
+        fill = pd.to_numeric(pd.Series([details.get(c, {}).get(field) if t else None
+                                        for c, t in zip(canon, take)], index=raw.index), errors="coerce")
+        cur  = pd.to_numeric(raw[col], errors="coerce") if col in raw.columns else pd.Series(np.nan, index=raw.index)
+        raw[col] = cur.where(cur > 0, fill).fillna(0)
+    return raw, {"zips": len({z for z, t in zip(zips, take) if t}), "calls": calls, "matched": len(found)}, misses
+
+
+@skip_unavailable(dict)
+@bounded_cache("rentcast_listing")
 def fetch_rentcast_listing(address: str, api_key: str) -> dict:
     """
     Call Rentcast's /v1/listings/sale endpoint to get active listing data.
@@ -704,37 +2242,29 @@ def fetch_rentcast_listing(address: str, api_key: str) -> dict:
     """
     if not api_key or not api_key.strip():
         return {}
+    store_key = canonical_address(address)
+    stored = _store_get("rentcast_listing", store_key)
+    if stored is not None:
+        return stored
     try:
-        resp = requests.get(
-            "https://api.rentcast.io/v1/listings/sale",
+        resp = source_request(
+            "rentcast", "GET", "https://api.rentcast.io/v1/listings/sale",
             params={"address": address, "limit": 1, "status": "Active"},
             headers={"X-Api-Key": api_key.strip(), "Accept": "application/json"},
-            timeout=12,
         )
         if resp.status_code == 200:
             data = resp.json()
             listings = data if isinstance(data, list) else data.get("listings", [])
             if listings:
-                listing = listings[0]
-                # Rentcast returns remarks in multiple possible fields
-                desc = (
-                    listing.get("description", "")
-                    or listing.get("publicRemarks", "")
-                    or listing.get("remarks", "")
-                    or listing.get("listingDescription", "")
-                )
-                return {
-                    "description": desc,
-                    "beds":  listing.get("bedrooms", ""),
-                    "baths": listing.get("bathrooms", ""),
-                    "sqft":  listing.get("squareFootage", ""),
-                    "year_built": listing.get("yearBuilt", ""),
-                    "source": "Rentcast API",
-                }
+                result = _rentcast_fields(listings[0])
+                _store_put("rentcast_listing", store_key, result)
+                return result
         elif resp.status_code == 401:
             st.warning("⚠️ Rentcast API key is invalid. Check your key at app.rentcast.io")
         elif resp.status_code == 429:
             st.warning("⚠️ Rentcast API rate limit reached. Upgrade plan or wait for reset.")
+    except SourceUnavailable:
+        raise
     except Exception:
         pass
     return {}
@@ -810,12 +2340,49 @@ def estimate_repairs(condition: str, sqft: float = 0, list_price: float = 0) ->
 # ─────────────────────────────────────────────
 # DSCR OFFER CALCULATOR
 # ─────────────────────────────────────────────
-def calculate_dscr_offer(
-    s8_rent: float,
-    tax_r: float,
-    ins_r: float,
-    vac_r: float,
-    maint_r: float,
+def mortgage_factor(interest: float, term_yrs: int) -> float:
+    """Monthly payment per $1 of loan (standard amortizing mortgage constant)."""
+    mo_rate = interest / 12
+    n       = term_yrs * 12
+    if mo_rate > 0:
+        return (mo_rate * (1 + mo_rate) ** n) / ((1 + mo_rate) ** n - 1)
+    return 1 / n
+
+
+def solve_dscr_max_price(
+    s8_rent,
+    tax_r: float,
+    ins_r: float,
+    vac_r: float,
+    maint_r: float,
+    mgmt_r: float,
+    capex_r: float,
+    utility_allowance: float,
+    interest: float,
+    term_yrs: int,
+    down_pct: float,
+    target_cf: float,
+) -> np.ndarray:
+    """
+    Vectorized form of the price solve in calculate_dscr_offer.
+    s8_rent may be any array shape; returns max price of the same shape,
+    NaN wherever the rent can't reach target_cf at any price.
+    """
+    rent     = np.asarray(s8_rent, dtype=float)
+    eff_rent = np.maximum(0, rent - utility_allowance)
+    num      = eff_rent * (1 - vac_r) - eff_rent * (maint_r + mgmt_r) - rent * capex_r - target_cf
+    coeff    = (tax_r / 12) + (ins_r / 12) + mortgage_factor(interest, term_yrs) * (1 - down_pct)
+    if coeff <= 0:
+        return np.full(rent.shape, np.nan)
+    return np.where((num > 0) & (rent > 0), num / coeff, np.nan)
+
+
+def calculate_dscr_offer(
+    s8_rent: float,
+    tax_r: float,
+    ins_r: float,
+    vac_r: float,
+    maint_r: float,
     mgmt_r: float,
     capex_r: float,
     utility_allowance: float,
@@ -851,12 +2418,7 @@ def calculate_dscr_offer(
     var_exp  = eff_rent * (maint_r + mgmt_r)     # maintenance + mgmt on effective rent
     capex_mo = s8_rent  * capex_r               # CapEx on gross rent (set-aside regardless of vacancy)
 
-    mo_rate = interest / 12
-    n       = term_yrs * 12
-    if mo_rate > 0:
-        mort_factor = (mo_rate * (1 + mo_rate) ** n) / ((1 + mo_rate) ** n - 1)
-    else:
-        mort_factor = 1 / n
+    mort_factor = mortgage_factor(interest, term_yrs)
 
     # Solve for P (max buyer price):
     # egi - var_exp - capex_mo - (tax/12)*P - (ins/12)*P - mort_factor*(1-down)*P = target_cf
@@ -871,7 +2433,7 @@ def calculate_dscr_offer(
 
     # Recalculate actuals at capped buyer price
     loan        = max_buyer_price * (1 - down_pct)
-    mort_pmt    = npf.pmt(mo_rate, n, -loan) if mo_rate > 0 else loan / n
+    mort_pmt    = loan * mort_factor
     taxes_mo    = (max_buyer_price * tax_r) / 12
     ins_mo      = (max_buyer_price * ins_r) / 12
     actual_cf   = egi - var_exp - capex_mo - taxes_mo - ins_mo - mort_pmt
@@ -942,67 +2504,2731 @@ def calculate_dscr_offer(
 
 
 # ─────────────────────────────────────────────
-# MAIN UI
+# GOAL-SEEK SOLVER
+# calculate_dscr_offer only solves for target_cf; the lender DSCR and
+# RTV checks are flagged afterwards. Every constraint below is linear in
+# price P, so each has a closed-form max price. Evaluated as arrays across
+# the whole portfolio; the smallest one binds.
 # ─────────────────────────────────────────────
-st.markdown("---")
-col_up, col_info = st.columns([2, 1])
+GOAL_SEEK_CONSTRAINTS = ["Target CF", "Min DSCR", "Min RTV", "Min CoC", "Max GRM", "List Cap"]
+
+
+def solve_offer_constraints(
+    s8_rent,
+    list_price,
+    repair_mid,
+    tax_r: float,
+    ins_r: float,
+    vac_r: float,
+    maint_r: float,
+    mgmt_r: float,
+    capex_r: float,
+    utility_allowance: float,
+    interest: float,
+    term_yrs: int,
+    down_pct: float,
+    target_cf: float,
+    closing_pct: float,
+    fee: float,
+    min_dscr: float = 1.15,
+    min_rtv_pct: float = 0.8,
+    min_coc_pct: float = 0.0,
+    max_grm: float = 0.0,
+    list_discount: float = 10000,
+) -> pd.DataFrame:
+    """
+    Max buyer price under each constraint, per property. A threshold of 0 disables
+    that constraint. With B = EGI − var expenses − CapEx, t = (tax+ins)/12 and
+    m = mortgage constant × LTV, cash flow is B − (t+m)·P, so:
+      Target CF  P ≤ (B − target_cf) / (t + m)
+      Min DSCR   P ≤ B / (t + d·m)
+      Min RTV    P ≤ rent · 100 / rtv
+      Min CoC    12(B − (t+m)P) ≥ c·(down·P + cc·(P − fee)/(1+cc) + repairs)
+      Max GRM    P ≤ 12 · rent · grm
+      List Cap   P ≤ list − list_discount (the app's $10k-below-list rule)
+    Returns a DataFrame with one max-price column per constraint plus the
+    binding constraint, goal-seek buyer price and your resulting offer.
+    """
+    rent   = np.asarray(s8_rent, dtype=float)
+    lp     = np.asarray(list_price, dtype=float)
+    repair = np.asarray(repair_mid, dtype=float)
+
+    eff_rent = np.maximum(0, rent - utility_allowance)
+    base     = eff_rent * (1 - vac_r) - eff_rent * (maint_r + mgmt_r) - rent * capex_r
+    t        = (tax_r + ins_r) / 12
+    m        = mortgage_factor(interest, term_yrs) * (1 - down_pct)
+    cc_share = closing_pct / (1 + closing_pct)
+    inf      = np.full(rent.shape, np.inf)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bounds = {
+            "Target CF": (base - target_cf) / (t + m),
+            "Min DSCR":  base / (t + min_dscr * m) if min_dscr > 0 else inf,
+            "Min RTV":   rent * 100 / min_rtv_pct if min_rtv_pct > 0 else inf,
+            "Min CoC":   inf,
+            "Max GRM":   12 * rent * max_grm if max_grm > 0 else inf,
+            "List Cap":  lp - list_discount,
+        }
+        if min_coc_pct > 0:
+            c = min_coc_pct / 100
+            bounds["Min CoC"] = (
+                (12 * base - c * (repair - cc_share * fee))
+                / (12 * (t + m) + c * (down_pct + cc_share))
+            )
+
+    stacked = np.stack([np.nan_to_num(bounds[k], nan=0.0, posinf=np.inf) for k in GOAL_SEEK_CONSTRAINTS])
+    stacked = np.maximum(stacked, 0)
+    bind_ix = np.argmin(stacked, axis=0)
+    price   = np.take_along_axis(stacked, bind_ix[None, ...], axis=0)[0]
+    offer   = np.maximum(0, (price - fee) / (1 + closing_pct))
+
+    out = {f"Max Price @ {k}": np.where(np.isinf(stacked[i]), np.nan, stacked[i]).round(0)
+           for i, k in enumerate(GOAL_SEEK_CONSTRAINTS)}
+    out["Binding Constraint"]    = np.asarray(GOAL_SEEK_CONSTRAINTS)[bind_ix]
+    out["Goal-Seek Buyer Price"] = price.round(0)
+    out["Goal-Seek Offer"]       = np.where(price > fee, offer, 0).round(0)
+    return pd.DataFrame(out)
+
+
+# ─────────────────────────────────────────────
+# HOLD-PERIOD ANALYSIS
+# Amortization, equity build-up, exit and levered IRR / NPV for every
+# property at once. Schedules are (n_properties, n_months) arrays; IRR is
+# a vectorized bisection over all rows instead of a root-find per row.
+# ─────────────────────────────────────────────
+def amortization_schedule(loan, interest: float, term_yrs: int, months: int) -> dict:
+    """
+    Monthly schedule for one or many loans. loan is scalar or 1-D array.
+    Returns dict of (n_loans, months) arrays: payment, interest, principal, balance
+    (balance is end-of-month). Months past the loan term are zero-payment.
+    """
+    loan    = np.atleast_1d(np.asarray(loan, dtype=float))[:, None]
+    mo_rate = interest / 12
+    n       = term_yrs * 12
+    pmt     = loan * mortgage_factor(interest, term_yrs)
+    k       = np.minimum(np.arange(1, months + 1), n)[None, :]
+    if mo_rate > 0:
+        growth  = (1 + mo_rate) ** k
+        balance = loan * growth - pmt * (growth - 1) / mo_rate
+    else:
+        balance = loan - pmt * k
+    balance  = np.maximum(balance, 0)
+    prev     = np.concatenate([loan, balance[:, :-1]], axis=1)
+    in_term  = np.arange(1, months + 1)[None, :] <= n
+    payment  = np.where(in_term, pmt, 0.0)
+    interest_paid = np.where(in_term, prev * mo_rate, 0.0)
+    return {
+        "payment":   payment,
+        "interest":  interest_paid,
+        "principal": payment - interest_paid,
+        "balance":   balance,
+    }
+
+
+def batch_irr(flows: np.ndarray, lo: float = -0.99, hi: float = 10.0, iters: int = 80) -> np.ndarray:
+    """
+    IRR for every row of a (n, periods) cash-flow matrix by vectorized bisection.
+    NaN where NPV doesn't change sign on [lo, hi] (no conventional IRR).
+    """
+    flows = np.asarray(flows, dtype=float)
+    t = np.arange(flows.shape[1])[None, :]
+
+    def npv(rate):
+        return (flows / (1 + rate[:, None]) ** t).sum(axis=1)
+
+    lo_v = np.full(len(flows), lo)
+    hi_v = np.full(len(flows), hi)
+    f_lo = npv(lo_v)
+    ok   = np.sign(f_lo) != np.sign(npv(hi_v))
+    for _ in range(iters):
+        mid   = (lo_v + hi_v) / 2
+        f_mid = npv(mid)
+        left  = np.sign(f_mid) == np.sign(f_lo)
+        lo_v  = np.where(left, mid, lo_v)
+        f_lo  = np.where(left, f_mid, f_lo)
+        hi_v  = np.where(left, hi_v, mid)
+    return np.where(ok, (lo_v + hi_v) / 2, np.nan)
+
+
+def hold_period_analysis(
+    price,
+    total_cash,
+    s8_rent,
+    tax_r: float,
+    ins_r: float,
+    vac_r: float,
+    maint_r: float,
+    mgmt_r: float,
+    capex_r: float,
+    utility_allowance: float,
+    interest: float,
+    term_yrs: int,
+    down_pct: float,
+    rent_growth,
+    hold_yrs: int,
+    appreciation: float,
+    selling_pct: float,
+    discount: float,
+) -> tuple[pd.DataFrame, dict, np.ndarray]:
+    """
+    Buy at price with total_cash in, collect growing rent for hold_yrs, sell.
+    Taxes and insurance grow 2%/yr as in the 5-year projection.
+    rent_growth is a scalar or one rate per property.
+    Returns (per-property metrics frame, monthly amortization schedule dict,
+    (n, hold_yrs) annual cash-flow matrix).
+    """
+    price  = np.asarray(price, dtype=float)
+    cash   = np.asarray(total_cash, dtype=float)
+    rent0  = np.asarray(s8_rent, dtype=float)
+    loan   = price * (1 - down_pct)
+    months = hold_yrs * 12
+    sched  = amortization_schedule(loan, interest, term_yrs, months)
+
+    yrs      = np.arange(hold_yrs)[None, :]
+    growth   = np.asarray(rent_growth, dtype=float)
+    rent     = rent0[:, None] * (1 + (growth[:, None] if growth.ndim else growth)) ** yrs
+    eff      = np.maximum(0, rent - utility_allowance)
+    opex_pct = (price[:, None] * (tax_r + ins_r) / 12) * 1.02 ** yrs
+    noi_mo   = eff * (1 - vac_r) - eff * (maint_r + mgmt_r) - rent * capex_r - opex_pct
+    debt_yr  = sched["payment"].reshape(len(price), hold_yrs, 12).sum(axis=2)
+    annual_cf = noi_mo * 12 - debt_yr
+
+    exit_value   = price * (1 + appreciation) ** hold_yrs
+    exit_balance = sched["balance"][:, -1]
+    sale_net     = exit_value * (1 - selling_pct) - exit_balance
+
+    flows = np.concatenate([-cash[:, None], annual_cf], axis=1)
+    flows[:, -1] += sale_net
+    valid = (price > 0) & (cash > 0)
+    irr   = np.where(valid, batch_irr(flows), np.nan)
+    disc  = (1 + discount) ** -np.arange(hold_yrs + 1)
+    npv   = np.where(valid, flows @ disc, np.nan)
+
+    metrics = pd.DataFrame({
+        "Hold Period (yrs)":       hold_yrs,
+        "Exit Value":              exit_value.round(0),
+        "Loan Balance at Exit":    exit_balance.round(0),
+        "Principal Paydown":       (loan - exit_balance).round(0),
+        "Equity at Exit":          (exit_value - exit_balance).round(0),
+        "Hold Cash Flow (total)":  annual_cf.sum(axis=1).round(0),
+        "Net Sale Proceeds":       sale_net.round(0),
+        "Levered IRR (%)":         (irr * 100).round(1),
+        "NPV @ Discount Rate":     npv.round(0),
+        "Equity Multiple":         np.where(valid, (annual_cf.sum(axis=1) + sale_net) / np.where(valid, cash, 1), np.nan).round(2),
+    })
+    return metrics, sched, annual_cf
+
+
+# ─────────────────────────────────────────────
+# DEAL FLAGS
+# Each row carries a Flag bitmask ("Flag Codes") plus a small parameter
+# payload ("_flag_params"). Quality and filters work on the integers; the
+# sentences are only rendered for the expander and the CSV export.
+# ─────────────────────────────────────────────
+class Flag(enum.IntFlag):
+    CRITICAL_DISTRESS = 1 << 0
+    REHAB_LIKELY      = 1 << 1
+    PRICE_ANOMALY     = 1 << 2
+    PRICE_SIGNAL      = 1 << 3   # Census price-vs-median notes
+    ZILLOW_SIGNAL     = 1 << 4   # Zillow insight / DOM / price-cut notes
+    DSCR_HEADROOM     = 1 << 5   # DSCR supports far more than list — verify condition
+    LOW_DSCR          = 1 << 6
+    LOW_RTV           = 1 << 7
+    RENT_RISK         = 1 << 8
+    HQS_RISK          = 1 << 9
+
+
+# Flag → (css class, renderer(params) → str | list[str])
+FLAG_RENDER = {
+    Flag.CRITICAL_DISTRESS: ("flag-critical", lambda p: "CRITICAL DISTRESS — inspect before offering"),
+    Flag.REHAB_LIKELY:      ("flag-rehab",    lambda p: "Rehab likely — " + (
+                                 f"keywords: {', '.join(p['keywords'])}" if p.get("keywords")
+                                 else "price severely below zip median")),
+    Flag.PRICE_ANOMALY:     ("flag-rehab",    lambda p: "Price anomaly — well below zip median, verify condition"),
+    Flag.PRICE_SIGNAL:      ("flag-rehab",    lambda p: p["notes"]),
+    Flag.ZILLOW_SIGNAL:     ("flag-rehab",    lambda p: p["notes"]),
+    Flag.DSCR_HEADROOM:     ("flag-inspect",  lambda p: (
+                                 f"INSPECT — DSCR supports ${p['dscr_max_price']:,.0f} "
+                                 f"(${p['headroom']:,.0f} above list) — likely needs heavy rehab, verify condition")),
+    Flag.LOW_DSCR:          ("flag-inspect",  lambda p: (
+                                 f"DSCR {p['dscr']:.2f}x — below lender minimum {p.get('min', 1.15):.2f}x for Section 8 loans")),
+    Flag.LOW_RTV:           ("flag-rehab",    lambda p: (
+                                 f"Low rent-to-value {p['rtv']:.2f}% — Section 8 investors target ≥ 0.8%")),
+    Flag.RENT_RISK:         ("flag-inspect",  lambda p: p["note"]),
+    Flag.HQS_RISK:          ("flag-inspect",  lambda p: (
+                                 f"High HQS inspection risk — Section 8 inspections fail 20–40% of the time "
+                                 f"for properties in '{p['condition']}' condition. "
+                                 f"Budget for re-inspection and remediation.")),
+}
+
+
+def render_flags(codes: int, params: dict | None) -> list[tuple[str, str]]:
+    """[(css_class, text), …] for one row, in Flag order."""
+    params = params or {}
+    out = []
+    for flag, (css, render) in FLAG_RENDER.items():
+        if codes & flag:
+            text = render(params.get(flag.name, {}))
+            out.extend((css, t) for t in (text if isinstance(text, list) else [text]))
+    return out
+
+
+def flag_text(codes, params) -> list[str]:
+    """The old " | "-joined Inspection Flags string, one per row — export only."""
+    return [" | ".join(t for _, t in render_flags(int(c), p)) for c, p in zip(codes, params)]
+
+
+def classify_quality(codes, viable, rtv, condition) -> np.ndarray:
+    """
+    Vectorized deal quality. RTV under 0.6% or a non-viable offer is No Deal;
+    critical / likely-distressed condition is Inspect First; any flag is Caution.
+    """
+    codes = np.asarray(codes, dtype=np.int64)
+    rtv   = np.asarray(rtv, dtype=float)
+    no_deal = ~np.asarray(viable, dtype=bool) | ((rtv > 0) & (rtv < 0.6))
+    inspect = (np.isin(np.asarray(condition, dtype=object), ["Critical", "Likely Distressed"])
+               | ((codes & Flag.CRITICAL_DISTRESS) != 0))
+    return np.select(
+        [no_deal, inspect, codes != 0],
+        ["No Deal", "Inspect First", "Caution"],
+        default="Green Light",
+    )
+
+
+# Results table: quality is shown as a badge (one vectorized map per page, no
+# per-cell CSS) and numbers use native column formats instead of a Styler.
+RESULTS_PAGE_ROWS = 500
+QUALITY_BADGE = {
+    "Green Light":   "🟢 Green Light",
+    "Caution":       "🟡 Caution",
+    "Inspect First": "🔴 Inspect First",
+    "No Deal":       "⚫ No Deal",
+}
+RESULT_COLUMN_CONFIG = {
+    "Quality":               st.column_config.TextColumn(width="small"),
+    "List Price":            st.column_config.NumberColumn(format="$%,d"),
+    "Section 8 Rent ($/mo)": st.column_config.NumberColumn(format="$%,d"),
+    "Your Max Offer":        st.column_config.NumberColumn(format="$%,d"),
+    "Buyer Max Purchase":    st.column_config.NumberColumn(format="$%,d"),
+    "Est Buyer CF ($/mo)":   st.column_config.NumberColumn(format="$%,d"),
+    "DSCR Ratio":            st.column_config.NumberColumn(format="%.2fx"),
+    "Rent-to-Value (%)":     st.column_config.NumberColumn(format="%.2f%%"),
+    "Cash-on-Cash (%)":      st.column_config.NumberColumn(format="%.1f%%"),
+    "GRM":                   st.column_config.NumberColumn(format="%.1f"),
+}
+
+
+# ─────────────────────────────────────────────
+# BUYER PROFILES — SCREENING RULES
+# Each buyer profile lists quality tiers as expressions over result columns
+# (buyer_profiles.json, or $S8_BUYER_PROFILES). Expressions are parsed once,
+# rewritten to element-wise numpy ops (and → &, x in [...] → isin, …) and
+# evaluated against whole columns, so every profile scores the entire result
+# frame in one pass. First matching tier wins; otherwise the profile default.
+# ─────────────────────────────────────────────
+BUYER_PROFILES_PATH = os.environ.get(
+    "S8_BUYER_PROFILES", os.path.join(os.path.dirname(os.path.abspath(__file__)), "buyer_profiles.json")
+)
+
+# Short names usable in rule expressions → result columns
+RULE_FIELDS = {
+    "price":           "List Price",
+    "offer":           "Your Max Offer",
+    "buyer_price":     "Buyer Max Purchase",
+    "rent":            "Section 8 Rent ($/mo)",
+    "dscr":            "DSCR Ratio",
+    "rtv":             "Rent-to-Value (%)",
+    "coc":             "Cash-on-Cash (%)",
+    "grm":             "GRM",
+    "cf":              "Est Buyer CF ($/mo)",
+    "beds":            "Beds",
+    "sqft":            "Sqft",
+    "repairs":         "Repair High ($)",
+    "dom":             "Days on Market",
+    "arv":             "ARV",
+    "arv_spread":      "ARV Spread",
+    "irr":             "Levered IRR (%)",
+    "equity_multiple": "Equity Multiple",
+    "condition":       "Condition",
+    "rent_confidence": "Rent Confidence",
+    "zip":             "Zip",
+    "quality":         "Quality",
+    "flags":           "Flag Codes",
+    "viable":          "_viable",
+}
+RULE_TEXT_FIELDS = {"Condition", "Rent Confidence", "Zip", "Quality", "Address"}
+
+
+class RuleError(ValueError):
+    """A buyer-profile expression that doesn't parse or uses an unknown name."""
+
+
+class _RuleCompiler(ast.NodeTransformer):
+    """Rewrite a Python-syntax rule into element-wise numpy operations."""
+
+    _ALLOWED = (
+        ast.Expression, ast.BinOp, ast.UnaryOp, ast.Compare, ast.Call, ast.Name,
+        ast.Constant, ast.List, ast.Tuple, ast.Load,
+        ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Mod, ast.BitAnd, ast.BitOr, ast.Invert, ast.USub,
+        ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE,
+    )
+    _FUNCS = {"has", "col", "isin", "isna", "abs"}
+
+    def __init__(self):
+        self.fields: set[str] = set()    # column names this rule reads
+
+    def visit_BoolOp(self, node):
+        op = ast.BitAnd() if isinstance(node.op, ast.And) else ast.BitOr()
+        values = [self.visit(v) for v in node.values]
+        out = values[0]
+        for v in values[1:]:
+            out = ast.BinOp(left=out, op=op, right=v)
+        return out
+
+    def visit_UnaryOp(self, node):
+        node.operand = self.visit(node.operand)
+        if isinstance(node.op, ast.Not):
+            # logical_not, not ~: ~ on a float column is a TypeError
+            return ast.Call(func=ast.Name(id="_not", ctx=ast.Load()), args=[node.operand], keywords=[])
+        return node
+
+    def visit_Compare(self, node):
+        left, parts = self.visit(node.left), []
+        for op, right in zip(node.ops, node.comparators):
+            if not isinstance(op, self._ALLOWED + (ast.In, ast.NotIn)):
+                raise RuleError(f"'{type(op).__name__}' is not allowed in rules")
+            right = self.visit(right)
+            if isinstance(op, (ast.In, ast.NotIn)):
+                part = ast.Call(func=ast.Name(id="isin", ctx=ast.Load()), args=[left, right], keywords=[])
+                if isinstance(op, ast.NotIn):
+                    part = ast.UnaryOp(op=ast.Invert(), operand=part)
+            else:
+                part = ast.Compare(left=left, ops=[op], comparators=[right])
+            parts.append(part)
+            left = right
+        out = parts[0]
+        for p in parts[1:]:
+            out = ast.BinOp(left=out, op=ast.BitAnd(), right=p)
+        return out
+
+    def visit_Call(self, node):
+        if not isinstance(node.func, ast.Name) or node.func.id not in self._FUNCS or node.keywords:
+            raise RuleError(f"unsupported call — use one of {sorted(self._FUNCS)}")
+        if node.func.id == "col":
+            if len(node.args) != 1 or not isinstance(node.args[0], ast.Constant):
+                raise RuleError('col() takes one quoted column name, e.g. col("Zip Vacancy Rate (%)")')
+            self.fields.add(str(node.args[0].value))
+            return ast.Subscript(value=ast.Name(id="_cols", ctx=ast.Load()),
+                                 slice=ast.Constant(str(node.args[0].value)), ctx=ast.Load())
+        if node.func.id == "has":
+            if len(node.args) != 1 or not isinstance(node.args[0], ast.Name) or node.args[0].id not in Flag.__members__:
+                raise RuleError(f"has() takes one flag name: {', '.join(Flag.__members__)}")
+            self.fields.add(RULE_FIELDS["flags"])
+        node.args = [self.visit(a) for a in node.args]
+        return node
+
+    def visit_Name(self, node):
+        if node.id in RULE_FIELDS:
+            self.fields.add(RULE_FIELDS[node.id])
+            return ast.Subscript(value=ast.Name(id="_cols", ctx=ast.Load()),
+                                 slice=ast.Constant(RULE_FIELDS[node.id]), ctx=ast.Load())
+        if node.id in Flag.__members__ or node.id in self._FUNCS:
+            return node
+        raise RuleError(f"unknown name '{node.id}' — fields: {', '.join(RULE_FIELDS)}")
+
+    def generic_visit(self, node):
+        if not isinstance(node, self._ALLOWED + (ast.Subscript,)):
+            raise RuleError(f"'{type(node).__name__}' is not allowed in rules")
+        return super().generic_visit(node)
+
+
+def compile_rule(expr: str, name: str = "rule"):
+    """Parse + rewrite one expression. Returns (code object, column names it reads)."""
+    try:
+        tree = ast.parse(expr.strip(), mode="eval")
+    except SyntaxError as e:
+        raise RuleError(f"{name}: {e.msg}") from None
+    compiler = _RuleCompiler()
+    try:
+        tree = ast.fix_missing_locations(compiler.visit(tree))
+    except RuleError as e:
+        raise RuleError(f"{name}: {e}") from None
+    return compile(tree, f"<{name}>", "eval"), compiler.fields
+
+
+@st.cache_resource(show_spinner=False)
+def load_buyer_profiles(path: str, mtime: float) -> dict:
+    """
+    Read and compile the profile file. mtime is only the cache key, so an
+    edited file recompiles on the next rerun. Returns
+    {profile: {"description", "default", "tiers": [(tier, code, fields), …]}}.
+    Raises RuleError on a malformed file or expression.
+    """
+    try:
+        with open(path) as f:
+            cfg = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise RuleError(f"can't read {path}: {e}") from None
+    profiles = {}
+    for pname, spec in (cfg.get("profiles") or {}).items():
+        tiers = []
+        for t in spec.get("tiers", []):
+            if "tier" not in t or "when" not in t:
+                raise RuleError(f"{pname}: every tier needs \"tier\" and \"when\"")
+            code, fields = compile_rule(t["when"], f"{pname} / {t['tier']}")
+            tiers.append((t["tier"], code, fields))
+        profiles[pname] = {
+            "description": spec.get("description", ""),
+            "default":     spec.get("default", "Green Light"),
+            "tiers":       tiers,
+        }
+    return profiles
+
+
+def buyer_profiles() -> dict:
+    """Profiles from BUYER_PROFILES_PATH, {} if the file doesn't exist."""
+    try:
+        mtime = os.path.getmtime(BUYER_PROFILES_PATH)
+    except OSError:
+        return {}
+    return load_buyer_profiles(BUYER_PROFILES_PATH, mtime)
+
+
+def _rule_column(results: pd.DataFrame, name: str) -> np.ndarray:
+    if name not in results.columns:
+        raise RuleError(f"column '{name}' is not in the results")
+    s = results[name]
+    if name in RULE_TEXT_FIELDS:
+        return s.astype(str).to_numpy(dtype=object)
+    if s.dtype == bool:
+        return s.to_numpy()
+    return pd.to_numeric(s, errors="coerce").to_numpy(dtype=float)
+
+
+def apply_buyer_profiles(results: pd.DataFrame, profiles: dict) -> pd.DataFrame:
+    """
+    One "Tier: <profile>" column per profile. Each referenced column is
+    converted to an array once and shared by every rule of every profile.
+    """
+    needed = {f for p in profiles.values() for _, _, fields in p["tiers"] for f in fields}
+    cols = {name: _rule_column(results, name) for name in needed}
+    flags = cols.get(RULE_FIELDS["flags"])
+    n = len(results)
+    env = {
+        "__builtins__": {},
+        "_cols": cols,
+        "isin":  lambda a, vals: np.isin(a, list(vals)),
+        "isna":  lambda a: pd.isna(a),
+        "abs":   np.abs,
+        "_not":  np.logical_not,
+        "has":   lambda f: (flags.astype(np.int64) & int(f)) != 0,
+        **Flag.__members__,
+    }
+    out = {}
+    for pname, p in profiles.items():
+        conds = []
+        for tier, code, _ in p["tiers"]:
+            try:
+                with np.errstate(invalid="ignore"):
+                    mask = eval(code, env)
+            except Exception as e:
+                raise RuleError(f"{pname} / {tier}: {type(e).__name__}: {e}") from None
+            conds.append(np.broadcast_to(np.asarray(mask, dtype=bool), (n,)))
+        out[f"Tier: {pname}"] = np.select(conds, [t for t, _, _ in p["tiers"]], default=p["default"]) \
+            if conds else np.full(n, p["default"], dtype=object)
+    return pd.DataFrame(out, index=results.index)
+
+
+# ─────────────────────────────────────────────
+# LOAN PRODUCTS
+# Buyers shop several DSCR lender products, not the sidebar's single
+# rate/term/down payment. Each product in loan_products.json (or
+# $S8_LOAN_PRODUCTS) carries its own rate, term, max LTV, lender min DSCR,
+# points and prepay schedule. The goal-seek constraints are solved for
+# every property × product as one (n, m) broadcast; the best product is the
+# one supporting the highest buyer price (ties → least cash to close).
+# ─────────────────────────────────────────────
+LOAN_PRODUCTS_PATH = os.environ.get(
+    "S8_LOAN_PRODUCTS", os.path.join(os.path.dirname(os.path.abspath(__file__)), "loan_products.json")
+)
+LOAN_PRODUCT_FIELDS = {   # field → (default, required)
+    "rate":       (None, True),    # annual %, e.g. 7.25
+    "term_years": (30,   False),
+    "ltv":        (None, True),    # max loan-to-value %, e.g. 80
+    "min_dscr":   (1.0,  False),
+    "points":     (0.0,  False),   # % of loan, paid at closing
+    "prepay":     ([],   False),   # penalty % of balance by loan year, e.g. [5, 4, 3, 2, 1]
+}
+
+
+class LoanProductError(ValueError):
+    """A loan product file that doesn't parse or has a missing / bad field."""
+
+
+@st.cache_resource(show_spinner=False)
+def load_loan_products(path: str, mtime: float) -> pd.DataFrame:
+    """
+    Read the product catalog into one row per product (index = product name).
+    mtime is only the cache key. Raises LoanProductError on a malformed file.
+    """
+    try:
+        with open(path) as f:
+            cfg = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise LoanProductError(f"can't read {path}: {e}") from None
+    catalog = (cfg.get("products") or {}) if isinstance(cfg, dict) else None
+    if not isinstance(catalog, dict):
+        raise LoanProductError(f"{path}: expected {{\"products\": {{name: {{…}}}}}}")
+    rows = {}
+    for name, spec in catalog.items():
+        if not isinstance(spec, dict):
+            raise LoanProductError(f"{name}: a product must be an object of fields")
+        row = {"description": str(spec.get("description", ""))}
+        for field, (default, required) in LOAN_PRODUCT_FIELDS.items():
+            if field not in spec and required:
+                raise LoanProductError(f"{name}: \"{field}\" is required")
+            row[field] = spec.get(field, default)
+        try:
+            row["prepay"] = tuple(float(x) for x in row["prepay"])
+            for field in ("rate", "term_years", "ltv", "min_dscr", "points"):
+                row[field] = float(row[field])
+        except (TypeError, ValueError):
+            raise LoanProductError(f"{name}: numeric fields must be numbers, prepay a list of %") from None
+        if not (0 < row["ltv"] <= 100 and row["term_years"] >= 1 and row["rate"] >= 0):
+            raise LoanProductError(f"{name}: needs 0 < ltv ≤ 100, term_years ≥ 1, rate ≥ 0")
+        rows[name] = row
+    products = pd.DataFrame.from_dict(rows, orient="index")
+    products.index.name = "product"
+    return products
+
+
+def loan_products() -> pd.DataFrame:
+    """Products from LOAN_PRODUCTS_PATH, empty if the file doesn't exist."""
+    try:
+        mtime = os.path.getmtime(LOAN_PRODUCTS_PATH)
+    except OSError:
+        return pd.DataFrame()
+    return load_loan_products(LOAN_PRODUCTS_PATH, mtime)
+
+
+def evaluate_loan_products(
+    results: pd.DataFrame,
+    products: pd.DataFrame,
+    params: dict,
+    list_discount: float = 10000,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Max buyer price for every property under every product, with the same
+    closed-form constraints as solve_offer_constraints but the product's
+    rate, term, LTV and min DSCR (the sidebar DSCR minimum is the lender's
+    here); points add to cash to close in the CoC bound. Returns
+    (per-property frame aligned to results: best product, its price, offer,
+    cash to close, prepay % at the hold-period exit, viable product count and
+    one "Max Price @ <product>" column each; per-product summary frame).
+    """
+    col  = lambda c: pd.to_numeric(results[c], errors="coerce").fillna(0).to_numpy(dtype=float)[:, None]
+    rent, lp = col("Section 8 Rent ($/mo)"), col("List Price")
+    repair   = (col("Repair Low ($)") + col("Repair High ($)")) / 2
+
+    pv   = lambda c: products[c].to_numpy(dtype=float)[None, :]
+    mo   = pv("rate") / 1200
+    n_mo = pv("term_years") * 12
+    ltv, pts, dscr = pv("ltv") / 100, pv("points") / 100, pv("min_dscr")
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        factor = np.where(mo > 0, mo * (1 + mo) ** n_mo / ((1 + mo) ** n_mo - 1), 1 / n_mo)
+    m = factor * ltv
+
+    fee, cc = params["wholesale_fee"], params["closing_costs_pct"]
+    eff_rent = np.maximum(0, rent - params["utility_allowance"])
+    base     = (eff_rent * (1 - params["vacancy_rate"])
+                - eff_rent * (params["maintenance_rate"] + params["mgmt_rate"]) - rent * params["capex_rate"])
+    t        = (params["tax_rate"] + params["insurance_rate"]) / 12
+    cc_share = cc / (1 + cc)
+    inf      = np.inf
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bounds = [
+            (base - params["target_cashflow"]) / (t + m),
+            np.where(dscr > 0, base / (t + dscr * m), inf),
+            rent * 100 / params["min_rtv_req"] if params["min_rtv_req"] > 0 else inf,
+            12 * rent * params["max_grm_req"] if params["max_grm_req"] > 0 else inf,
+            lp - list_discount,
+        ]
+        if params["min_coc_req"] > 0:
+            c = params["min_coc_req"] / 100
+            bounds.append((12 * base - c * (repair - cc_share * fee))
+                          / (12 * (t + m) + c * ((1 - ltv) + pts * ltv + cc_share)))
+    shape   = (len(results), len(products))
+    stacked = np.stack([np.broadcast_to(np.nan_to_num(b, nan=0.0, posinf=inf), shape) for b in bounds])
+    price   = np.maximum(stacked, 0).min(axis=0).round(0)                  # (n, m)
+    offer   = np.maximum(0, (price - fee) / (1 + cc)).round(0)
+    viable  = offer > 0
+    cash    = (price * ((1 - ltv) + pts * ltv) + offer * cc + repair).round(0)
+
+    key  = np.where(viable, price, -inf)
+    top  = viable & (key == key.max(axis=1, keepdims=True))
+    best = np.where(top, cash, inf).argmin(axis=1)
+    any_ok = viable.any(axis=1)
+    pick   = lambda a: np.where(any_ok, np.take_along_axis(a, best[:, None], axis=1)[:, 0], np.nan)
+
+    hold = int(params.get("hold_years", 0))
+    prepay_exit = np.array([p[hold - 1] if 0 < hold <= len(p) else 0.0 for p in products["prepay"]])
+    names = products.index.to_numpy(dtype=object)
+
+    per_property = pd.DataFrame({
+        "Best Loan Product":              np.where(any_ok, names[best], ""),
+        "Best Product Buyer Price":       pick(price),
+        "Best Product Offer":             pick(offer),
+        "Best Product Cash to Close":     pick(cash),
+        "Best Product Prepay @ Exit (%)": np.where(any_ok, prepay_exit[best], np.nan),
+        "Viable Loan Products":           viable.sum(axis=1),
+        **{f"Max Price @ {name}": price[:, j] for j, name in enumerate(names)},
+    }, index=results.index)
+
+    with np.errstate(invalid="ignore"):
+        median_price = np.nanmedian(np.where(viable, price, np.nan), axis=0) if len(results) else np.full(len(names), np.nan)
+    summary = pd.DataFrame({
+        "Product":            names,
+        "Rate (%)":           products["rate"].to_numpy(),
+        "Term (yrs)":         products["term_years"].to_numpy(),
+        "LTV (%)":            products["ltv"].to_numpy(),
+        "Min DSCR":           products["min_dscr"].to_numpy(),
+        "Points (%)":         products["points"].to_numpy(),
+        "Prepay":             ["-".join(f"{x:g}" for x in p) or "None" for p in products["prepay"]],
+        "Viable":             viable.sum(axis=0),
+        "Best For":           np.bincount(best[any_ok], minlength=len(names)),
+        "Median Buyer Price": median_price,
+    })
+    return per_property, summary
+
+
+# ─────────────────────────────────────────────
+# PORTFOLIO OPTIMIZER
+# Pick the subset of deals that maximizes total assignment fee or annual
+# cash flow, subject to the buyers' total cash (sum of Total Cash to Close),
+# a cap on deals per ZIP and DSCR / CoC floors. That's a 0/1 knapsack with
+# group caps: small candidate sets are solved exactly by branch-and-bound
+# (bounded by the fractional knapsack that ignores ZIP caps); larger ones
+# take the better of two greedy fills improved by pairwise swaps.
+# ─────────────────────────────────────────────
+OPTIMIZER_EXACT_MAX  = 40          # candidates solved exactly; above this the heuristic runs
+OPTIMIZER_NODE_LIMIT = 200_000     # B&B nodes before settling for the best found
+OPTIMIZER_SWAP_POOL  = 500         # best unselected candidates considered per swap pass
+OPTIMIZER_OBJECTIVES = {
+    "Assignment fee":   "Assignment Fee",
+    "Annual cash flow": "Annual Cash Flow",
+}
+
+
+def _greedy_pick(value, cash, zone, budget: float, cap: int, order) -> np.ndarray:
+    """Take candidates in `order` while they fit the budget and their ZIP's cap."""
+    chosen = np.zeros(len(value), dtype=bool)
+    used, per_zone = 0.0, {}
+    for i in order:
+        if used + cash[i] <= budget and (not cap or per_zone.get(zone[i], 0) < cap):
+            chosen[i] = True
+            used += cash[i]
+            per_zone[zone[i]] = per_zone.get(zone[i], 0) + 1
+    return chosen
+
+
+def _improve_swaps(chosen, value, cash, zone, budget: float, cap: int) -> np.ndarray:
+    """
+    Repeatedly apply the best single swap (drop one pick, add one unpicked
+    candidate) that raises the objective and keeps every constraint, then
+    fill any budget left over. Each pass scores all pairs as one array.
+    """
+    chosen = chosen.copy()
+    for _ in range(100):
+        sel = np.flatnonzero(chosen)
+        pool = np.flatnonzero(~chosen)
+        pool = pool[np.argsort(-value[pool], kind="stable")[:OPTIMIZER_SWAP_POOL]]
+        if not len(sel) or not len(pool):
+            break
+        slack = budget - cash[chosen].sum()
+        gain  = value[pool][None, :] - value[sel][:, None]
+        ok    = (cash[pool][None, :] - cash[sel][:, None] <= slack) & (gain > 1e-9)
+        if cap:
+            zones, counts = np.unique(zone[chosen], return_counts=True)
+            full = np.isin(zone[pool], zones[counts >= cap])
+            ok &= ~full[None, :] | (zone[pool][None, :] == zone[sel][:, None])
+        if not ok.any():
+            break
+        i, j = np.unravel_index(np.where(ok, gain, -np.inf).argmax(), gain.shape)
+        chosen[sel[i]], chosen[pool[j]] = False, True
+    rest = np.flatnonzero(~chosen)
+    rest = rest[np.argsort(-value[rest] / cash[rest], kind="stable")]
+    used, per_zone = cash[chosen].sum(), pd.Series(zone[chosen]).value_counts().to_dict()
+    for i in rest:
+        if used + cash[i] <= budget and (not cap or per_zone.get(zone[i], 0) < cap):
+            chosen[i] = True
+            used += cash[i]
+            per_zone[zone[i]] = per_zone.get(zone[i], 0) + 1
+    return chosen
+
+
+def _branch_and_bound(value, cash, zone, budget: float, cap: int, incumbent) -> tuple[np.ndarray, bool]:
+    """
+    Exact 0/1 knapsack with per-ZIP caps, starting from a feasible incumbent.
+    Returns (chosen mask, proved optimal) — False if OPTIMIZER_NODE_LIMIT hit.
+    """
+    order = np.argsort(-value / cash, kind="stable")
+    v, c, z = value[order], cash[order], zone[order]
+    cum_c = np.concatenate([[0.0], np.cumsum(c)])
+    cum_v = np.concatenate([[0.0], np.cumsum(v)])
+    n = len(v)
+
+    def bound(k: int, rem: float) -> float:
+        # Fractional fill of items k.. in ratio order, ignoring the ZIP caps
+        j = int(np.searchsorted(cum_c, cum_c[k] + rem, side="right")) - 1
+        out = cum_v[j] - cum_v[k]
+        if j < n:
+            out += v[j] * (cum_c[k] + rem - cum_c[j]) / c[j]
+        return out
+
+    best_val = float(value[incumbent].sum())
+    best = list(np.flatnonzero(incumbent[order]))
+    picked, per_zone, nodes = [], {}, 0
+
+    def dfs(k: int, rem: float, val: float) -> None:
+        nonlocal best_val, best, nodes
+        nodes += 1
+        if nodes > OPTIMIZER_NODE_LIMIT:
+            return
+        if val > best_val + 1e-9:
+            best_val, best = val, picked.copy()
+        if k == n or val + bound(k, rem) <= best_val + 1e-9:
+            return
+        if c[k] <= rem and (not cap or per_zone.get(z[k], 0) < cap):
+            picked.append(k)
+            per_zone[z[k]] = per_zone.get(z[k], 0) + 1
+            dfs(k + 1, rem - c[k], val + v[k])
+            per_zone[z[k]] -= 1
+            picked.pop()
+        dfs(k + 1, rem, val)
+
+    dfs(0, float(budget), 0.0)
+    chosen = np.zeros(n, dtype=bool)
+    chosen[order[best]] = True
+    return chosen, nodes <= OPTIMIZER_NODE_LIMIT
+
+
+def optimize_portfolio(
+    results: pd.DataFrame,
+    budget: float,
+    objective: str = "Assignment fee",
+    max_per_zip: int = 0,
+    min_dscr: float = 0.0,
+    min_coc: float = 0.0,
+    wholesale_fee: float = 0.0,
+) -> pd.DataFrame:
+    """
+    Ranked shortlist of the deals to take. Candidates are non-"No Deal" rows
+    with positive cash to close and a positive objective that meet min_dscr /
+    min_coc (0 disables a floor, as does max_per_zip = 0). Each deal earns
+    wholesale_fee as its assignment fee. attrs carry the method ("exact",
+    "exact (node limit)" or "heuristic"), candidate count, cash used and the
+    objective total.
+    """
+    col = lambda c: pd.to_numeric(results[c], errors="coerce").fillna(0).to_numpy(dtype=float)
+    cash = col("Total Cash to Close")
+    viable = results["_viable"].to_numpy(dtype=bool) if "_viable" in results else np.ones(len(results), bool)
+    values = {"Assignment Fee": np.where(viable, float(wholesale_fee), 0.0),
+              "Annual Cash Flow": col("Annual Cash Flow")}
+    target = OPTIMIZER_OBJECTIVES[objective]
+    value = values[target]
+
+    ok = (results["Quality"].to_numpy() != "No Deal") & (cash > 0) & (value > 0) & (cash <= budget)
+    if min_dscr > 0:
+        ok &= col("DSCR Ratio") >= min_dscr
+    if min_coc > 0:
+        ok &= col("Cash-on-Cash (%)") >= min_coc
+    cand = np.flatnonzero(ok)
+    v, c = value[cand], cash[cand]
+    z = results["Zip"].astype(str).str.zfill(5).to_numpy(dtype=object)[cand]
+    cap = int(max_per_zip or 0)
+
+    by_ratio = _greedy_pick(v, c, z, budget, cap, np.argsort(-v / np.maximum(c, 1), kind="stable"))
+    by_value = _greedy_pick(v, c, z, budget, cap, np.argsort(-v, kind="stable"))
+    chosen = by_ratio if v[by_ratio].sum() >= v[by_value].sum() else by_value
+    if len(cand) <= OPTIMIZER_EXACT_MAX:
+        chosen, proved = _branch_and_bound(v, c, z, budget, cap, chosen)
+        method = "exact" if proved else "exact (node limit)"
+    else:
+        chosen = _improve_swaps(chosen, v, c, z, budget, cap)
+        method = "heuristic"
+
+    picks = cand[chosen]
+    picks = picks[np.argsort(-value[picks], kind="stable")]
+    shortlist = results.iloc[picks].copy()
+    shortlist.insert(0, "Rank", np.arange(1, len(picks) + 1))
+    shortlist["Assignment Fee"] = values["Assignment Fee"][picks]
+    shortlist["Cumulative Cash"] = np.cumsum(cash[picks])
+    shortlist.attrs.update(method=method, candidates=len(cand), objective=objective,
+                           cash_used=float(cash[picks].sum()), total=float(value[picks].sum()))
+    return shortlist
+
+
+# ─────────────────────────────────────────────
+# UNDERWRITING PIPELINE
+# One property in, one result row out. Every sidebar input arrives through
+# `params` (see run_params), never module globals, so the same code runs
+# in the Streamlit thread or in a background worker process.
+# ─────────────────────────────────────────────
+def underwrite_property(
+    row: pd.Series,
+    params: dict,
+    safmr_df: pd.DataFrame,
+    fmr_index: pd.DataFrame | None = None,
+    growth_df: pd.DataFrame | None = None,
+) -> dict:
+    """
+    Enrich and underwrite one cleaned upload row (Address, Zip, Bedrooms,
+    List Price, optional Sqft / agent / Description columns).
+    Returns the result row: rent, offer stack, investor metrics and flag codes
+    (Quality is classified for the whole batch in finalize_results).
+    """
+    tax_rate          = params["tax_rate"]
+    insurance_rate    = params["insurance_rate"]
+    vacancy_rate      = params["vacancy_rate"]
+    maintenance_rate  = params["maintenance_rate"]
+    mgmt_rate         = params["mgmt_rate"]
+    capex_rate        = params["capex_rate"]
+    utility_allowance = params["utility_allowance"]
+    interest_rate     = params["interest_rate"]
+    loan_term_years   = params["loan_term_years"]
+    down_pct          = params["down_pct"]
+    target_cashflow   = params["target_cashflow"]
+    closing_costs_pct = params["closing_costs_pct"]
+    wholesale_fee     = params["wholesale_fee"]
+    use_110           = params["use_110"]
+    rent_growth_rate  = params["rent_growth_rate"]   # fallback when the ZIP has no SAFMR trend
+    inspect_threshold = params["inspect_threshold"]
+    rentcast_key      = params["rentcast_key"]
+
+    addr = str(row.get("Address", "")).strip()
+
+    zip_str = str(int(row["Zip"])).zfill(5)
+    beds    = int(row["Bedrooms"]) if row["Bedrooms"] > 0 else 3
+
+    # Pass-through fields (agent info, sqft from CSV or Zillow)
+    agent_name  = str(row.get("Agent Name",  "")).strip() if "Agent Name"  in row.index else ""
+    agent_email = str(row.get("Agent Email", "")).strip() if "Agent Email" in row.index else ""
+    agent_phone = str(row.get("Agent Phone", "")).strip() if "Agent Phone" in row.index else ""
+    csv_sqft    = float(row["Sqft"]) if "Sqft" in row.index and row["Sqft"] > 0 else 0
+    baths       = float(row["Baths"]) if "Baths" in row.index and pd.notnull(row["Baths"]) else 0
+    year_built  = int(row["Year Built"]) if "Year Built" in row.index and pd.notnull(row["Year Built"]) else 0
+
+    # 1. Section 8 rent — HUD SAFMR (primary)
+    s8_rent_safmr, rent_src_base = get_section8_rent(zip_str, beds, safmr_df, fmr_index, use_110)
+
+    # 1a. Sqft adjustment to Section 8 rent
+    sqft_note = ""
+    s8_rent   = s8_rent_safmr
+    rent_src  = rent_src_base
+    if csv_sqft > 0:
+        hud_sqft_standard = {0: 600, 1: 750, 2: 900, 3: 1100, 4: 1300}
+        standard  = hud_sqft_standard.get(min(beds, 4), 900)
+        sqft_ratio = csv_sqft / standard if standard > 0 else 1.0
+        if sqft_ratio < 0.70:
+            adj_pct  = -0.08
+            sqft_note = f"Sqft {csv_sqft:.0f} is {(1-sqft_ratio)*100:.0f}% below HUD standard ({standard} sqft) — rent adjusted -8%"
+        elif sqft_ratio < 0.85:
+            adj_pct  = -0.04
+            sqft_note = f"Sqft {csv_sqft:.0f} slightly below HUD standard ({standard} sqft) — rent adjusted -4%"
+        elif sqft_ratio > 1.40:
+            adj_pct  = 0.07
+            sqft_note = f"Sqft {csv_sqft:.0f} well above HUD standard ({standard} sqft) — rent adjusted +7%"
+        elif sqft_ratio > 1.20:
+            adj_pct  = 0.04
+            sqft_note = f"Sqft {csv_sqft:.0f} above HUD standard ({standard} sqft) — rent adjusted +4%"
+        else:
+            adj_pct  = 0.0
+        if adj_pct != 0.0:
+            s8_rent  = round(s8_rent_safmr * (1 + adj_pct))
+            rent_src = rent_src_base + f" (sqft adj {adj_pct:+.0%})"
+
+    # 1b. Zillow listing signals (free — no API key, no bot detection)
+    zillow_signals = fetch_zillow_listing_signals(addr)
+    zil_condition, zil_signal_strs = analyze_zillow_signals(zillow_signals)
+    sqft = csv_sqft if csv_sqft > 0 else (zillow_signals.get("sqft") or 0)
+
+    # 1c. Census rent by bedrooms + Rentcast AVM — validate SAFMR
+    census_data   = get_census_zip_data(zip_str)
+    census_rent   = (census_data.get("median_rent_by_beds") or {}).get(min(beds, 4), 0)
+    rentcast_rent = fetch_rentcast_rent_avm(addr, beds, int(sqft), rentcast_key)
+    zillow_comp_rent, zillow_comp_n = get_zillow_rent_comps(
+        addr, beds, exclude_zpid=zillow_signals.get("zpid", ""))
+
+    # 1d. Rent consensus — cross-reference all sources, flag reasonableness risk
+    s8_rent_final, rent_confidence, rent_note = get_rent_consensus(
+        safmr_rent=s8_rent,
+        census_rent=census_rent,
+        rentcast_rent=rentcast_rent,
+        beds=beds,
+        zillow_comp_rent=zillow_comp_rent,
+        zip_str=zip_str,
+    )
+    s8_rent = s8_rent_final  # use the validated rent for all calculations
+
+    # 2. Description — CSV first, then Rentcast API
+    has_csv_desc = (
+        "Description" in row.index
+        and pd.notnull(row.get("Description"))
+        and len(str(row.get("Description","")).strip()) > 10
+    )
+    if has_csv_desc:
+        description = str(row["Description"]).strip()
+        desc_src    = "CSV"
+    else:
+        description, desc_src = get_listing_description(addr, rentcast_key)
+        time.sleep(0.3)
+
+    # 3. Condition analysis
+    condition, kw_hits = analyze_condition(description)
+
+    list_price = float(row["List Price"])
+
+    # 4. Estimated repairs (needed before DSCR calc for CoC)
+    repair_low, repair_high, repair_tier = estimate_repairs(condition, sqft, list_price)
+    repair_mid_val = (repair_low + repair_high) / 2
+    repair_range_str = f"${repair_low:,.0f} – ${repair_high:,.0f}" if (repair_low or repair_high) else "Unknown"
+
+    # 5. DSCR offer — uses all expense inputs including CapEx and utility allowance
+    calc = calculate_dscr_offer(
+        s8_rent=s8_rent,
+        tax_r=tax_rate, ins_r=insurance_rate,
+        vac_r=vacancy_rate, maint_r=maintenance_rate, mgmt_r=mgmt_rate,
+        capex_r=capex_rate, utility_allowance=utility_allowance,
+        interest=interest_rate, term_yrs=loan_term_years,
+        down_pct=down_pct, target_cf=target_cashflow,
+        closing_pct=closing_costs_pct, fee=wholesale_fee,
+        list_price=list_price,
+        repair_mid=repair_mid_val,
+    )
+
+    # 6. Enforce minimum $10k below list for buyer price
+    if calc.get("viable"):
+        buyer_price = calc["max_buyer_price"]
+        if buyer_price > list_price - 10000:
+            calc["max_buyer_price"] = list_price - 10000
+            your_offer_gross = calc["max_buyer_price"] - wholesale_fee
+            calc["your_offer"]    = round(your_offer_gross / (1 + closing_costs_pct), 2)
+            calc["closing_costs"] = round(calc["your_offer"] * closing_costs_pct, 2)
+            calc["down_payment"]  = round(calc["max_buyer_price"] * down_pct, 2)
+            calc["loan_amount"]   = round(calc["max_buyer_price"] * (1 - down_pct), 2)
+            if calc["your_offer"] <= 0:
+                calc["viable"] = False
+
+    # 7. Census price anomaly detection
+    price_signals = get_price_anomaly_signals(list_price, beds, zip_str)
+
+    # Merge condition from all sources (description > Zillow signals > Census price anomaly)
+    if condition == "Unknown":
+        # Try Zillow listing signals first (most specific)
+        if zil_condition in ("Critical", "Needs Work"):
+            condition = zil_condition
+        elif price_signals:
+            # Fall back to Census price anomaly detection
+            if any("severely" in s or "major rehab" in s for s in price_signals):
+                condition = "Likely Distressed"
+            else:
+                condition = "Possibly Distressed"
+        elif zil_condition:
+            condition = zil_condition
+
+    # 8. Build flags — bitmask + parameters; text is rendered at display/export time
+    flags, flag_params = Flag(0), {}
+    if condition == "Critical":
+        flags |= Flag.CRITICAL_DISTRESS
+    elif condition in ("Needs Work", "Likely Distressed"):
+        flags |= Flag.REHAB_LIKELY
+        flag_params["REHAB_LIKELY"] = {"keywords": kw_hits[:3]}
+    elif condition == "Possibly Distressed":
+        flags |= Flag.PRICE_ANOMALY
+
+    if price_signals:
+        flags |= Flag.PRICE_SIGNAL
+        flag_params["PRICE_SIGNAL"] = {"notes": list(dict.fromkeys(price_signals))}
+    zil_notes = [sig for sig in dict.fromkeys(zil_signal_strs) if sig not in price_signals]
+    if zil_notes:
+        flags |= Flag.ZILLOW_SIGNAL
+        flag_params["ZILLOW_SIGNAL"] = {"notes": zil_notes}
+
+    rtv = calc.get("rtv_pct", 0)
+    if calc.get("viable"):
+        headroom = calc.get("dscr_headroom", 0)
+        if headroom >= list_price * (inspect_threshold / 100):
+            flags |= Flag.DSCR_HEADROOM
+            flag_params["DSCR_HEADROOM"] = {"dscr_max_price": calc["dscr_max_price"], "headroom": headroom}
+        # DSCR lender ratio warning
+        if calc.get("dscr_ratio", 0) > 0 and calc["dscr_ratio"] < params["min_dscr_req"]:
+            flags |= Flag.LOW_DSCR
+            flag_params["LOW_DSCR"] = {"dscr": calc["dscr_ratio"], "min": params["min_dscr_req"]}
+        # Rent-to-Value flag
+        if rtv > 0 and rtv < 0.7:
+            flags |= Flag.LOW_RTV
+            flag_params["LOW_RTV"] = {"rtv": rtv}
+
+    # Rent confidence flag
+    if rent_confidence == "Low" or (rent_confidence == "Medium" and "risk" in rent_note.lower()):
+        flags |= Flag.RENT_RISK
+        flag_params["RENT_RISK"] = {"note": rent_note}
+
+    # HQS fail risk flag
+    if condition in ("Critical", "Needs Work", "Likely Distressed"):
+        flags |= Flag.HQS_RISK
+        flag_params["HQS_RISK"] = {"condition": condition}
+
+    # Sqft note for export
+    if not sqft_note and sqft > 0:
+        sqft_note = f"{sqft:.0f} sqft"
+
+    # 5-year rent projection (for export and expander)
+    rent_growth_rate, growth_src = get_rent_growth(zip_str, beds, growth_df, rent_growth_rate)
+    proj_5yr = []
+    _r = s8_rent
+    for yr in range(1, 6):
+        _eff  = max(0, _r - utility_allowance)
+        _egi  = _eff * (1 - vacancy_rate)
+        _vexp = _eff * (maintenance_rate + mgmt_rate)
+        _capx = _r * capex_rate
+        _fixed = (calc.get("taxes_mo", 0) * (1.02 ** (yr - 1))
+                + calc.get("insurance_mo", 0) * (1.02 ** (yr - 1))
+                + calc.get("mortgage_pmt", 0))
+        _cf   = _egi - _vexp - _capx - _fixed
+        proj_5yr.append({"year": yr, "rent": round(_r), "cf": round(_cf)})
+        _r = round(_r * (1 + rent_growth_rate))
+
+    return {
+        # ── Identifiers ──
+        "Address":               addr,
+        "Zip":                   zip_str,
+        "Beds":                  beds,
+        "Sqft":                  int(sqft) if sqft else "",
+        "Baths":                 baths if baths else "",
+        "Year Built":            year_built if year_built else "",
+        "Agent Name":            agent_name,
+        "Agent Email":           agent_email,
+        "Agent Phone":           agent_phone,
+
+        # ── Section 8 Rent ──
+        "Section 8 Rent ($/mo)": s8_rent,
+        "Rent Confidence":       rent_confidence,
+        "Rent Note":             rent_note,
+        "SAFMR Rent":            s8_rent_safmr,
+        "Census Rent":           census_rent if census_rent > 0 else "",
+        "Rentcast AVM Rent":     rentcast_rent if rentcast_rent > 0 else "",
+        "Zillow Comp Rent":      zillow_comp_rent if zillow_comp_rent > 0 else "",
+        "Zillow Comp Count":     zillow_comp_n,
+        "Rent Source":           rent_src,
+        "Sqft Rent Note":        sqft_note,
+        "Utility Allowance":     utility_allowance,
+        "Effective Rent":        calc.get("eff_rent", s8_rent - utility_allowance),
+
+        # ── Wholesale Offer Stack ──
+        "List Price":            list_price,
+        "Your Max Offer":        calc.get("your_offer", 0),
+        "Buyer Max Purchase":    calc.get("max_buyer_price", 0),
+        "DSCR Max (uncapped)":   calc.get("dscr_max_price", 0),
+        "Your Wholesale Fee":    calc.get("wholesale_fee", 0),
+        "Buyer Closing Costs":   calc.get("closing_costs", 0),
+        "Buyer Down Payment":    calc.get("down_payment", 0),
+        "Buyer Loan Amount":     calc.get("loan_amount", 0),
+
+        # ── Investor Metrics ──
+        "DSCR Ratio":            calc.get("dscr_ratio", 0),
+        "Rent-to-Value (%)":     calc.get("rtv_pct", 0),
+        "GRM":                   calc.get("grm", 0),
+        "Cash-on-Cash (%)":      calc.get("coc_pct", 0),
+        "Total Cash to Close":   calc.get("total_cash_invested", 0),
+        "Annual Cash Flow":      calc.get("annual_cf", 0),
+        "Break-even Rent":       calc.get("break_even_rent", 0),
+
+        # ── Monthly Cash Flow ──
+        "Est Buyer CF ($/mo)":   calc.get("actual_cf", 0),
+        "Monthly Mortgage":      calc.get("mortgage_pmt", 0),
+        "Monthly Taxes":         calc.get("taxes_mo", 0),
+        "Monthly Insurance":     calc.get("insurance_mo", 0),
+        "Monthly CapEx":         calc.get("capex_mo", 0),
+        "Monthly Mgmt+Maint":    calc.get("var_expenses", 0),
+
+        # ── Repairs ──
+        "Est Repairs":           repair_range_str,
+        "Repair Low ($)":        repair_low,
+        "Repair High ($)":       repair_high,
+        "Repair Tier":           repair_tier,
+
+        # ── Market Context ──
+        "Zip Median Home Value": census_data.get("median_home_value", 0),
+        "Zip Vacancy Rate (%)":  census_data.get("vacancy_rate_pct", 0),
+        "Price vs Zip Median":   f"{(list_price/census_data['median_home_value']*100):.0f}%" if census_data.get("median_home_value") else "N/A",
+
+        # ── Condition ──
+        "Condition":             condition,
+        "Distress Keywords":     ", ".join(kw_hits[:6]),
+        "Flag Codes":            int(flags),
+
+        # ── Listing Data ──
+        "Listing Description":   (description[:400] if description else ""),
+        "Zillow Insight":        zillow_signals.get("flex_text", ""),
+        "Days on Market":        zillow_signals.get("days_on_market", ""),
+        "Price Reduction":       zillow_signals.get("price_reduction", ""),
+        "Tax Assessed Value":    zillow_signals.get("tax_assessed_value", ""),
+        "Desc Source":           desc_src,
+
+        # ── 5-Year Projection (JSON for display) ──
+        "Rent Growth (%/yr)":    round(rent_growth_rate * 100, 2),
+        "Rent Growth Source":    growth_src,
+        "_proj_5yr":             proj_5yr,
+        "_flag_params":          flag_params,
+        "_viable":               bool(calc.get("viable")),
+    }
+
+
+def underwrite_batch(
+    raw: pd.DataFrame,
+    params: dict,
+    safmr_df: pd.DataFrame,
+    fmr_index: pd.DataFrame | None = None,
+    on_progress=None,
+    should_cancel=None,
+    snapshot: dict | None = None,
+) -> pd.DataFrame | None:
+    """
+    Run underwrite_property over every row, then the portfolio-wide goal-seek
+    and hold-period passes. on_progress(n_done, total, address) is called per
+    row; if should_cancel() turns true the batch stops and returns None.
+    Each row gets params["row_budget_s"] of network time, clipped to what is
+    left of params["batch_sla_s"]; skipped sources land in "Missing Sources".
+    snapshot ({source: {key: value}}, from a saved run) overrides the store;
+    with params["offline"] no request is made at all. With params["watchlist"]
+    unchanged rows reuse the watchlist's stored row (see WATCHLIST). With
+    params["rentcast_bulk"] Rentcast listings are pulled once per ZIP. With
+    params["zip_rent_growth"] rent grows at each ZIP's SAFMR trend (the sidebar
+    rate while a cold start is still downloading the history).
+    """
+    reset_source_breakers()
+    growth_df = rent_growth_table() if params.get("zip_rent_growth") else None
+
+    # ── Warm the persistent enrichment store for the whole batch ──
+    cache_hits = 0
+    store = enrichment_store()
+    if store:
+        canon = [canonical_address(a) for a in raw["Address"].astype(str)]
+        zips  = [str(int(z)).zfill(5) for z in raw["Zip"]]
+        cache_hits  = store.prefetch("geocode", canon) + store.prefetch("zillow", canon)
+        cache_hits += store.prefetch("census", zips)
+        if params["rentcast_key"]:
+            cache_hits += store.prefetch("rentcast_listing", canon)
+    # A saved run's archived responses answer ahead of the store for this batch only
+    overlay = {(source, k): v for source, items in (snapshot or {}).items() for k, v in items.items()}
+
+    # ── Watchlist: previous rows for unchanged properties ──
+    watch = watchlist_store() if params.get("watchlist") else None
+    prev, keys, hashes, params_hash = {}, [], [], ""
+    reuse = [None] * len(raw)
+    if watch:
+        prev        = watch.load(params["watchlist"])
+        keys        = [canonical_address(a) for a in raw["Address"].astype(str)]
+        hashes      = property_hashes(raw)
+        params_hash = underwriting_params_hash(params)
+        for j, (k, h) in enumerate(zip(keys, hashes)):
+            old = prev.get(k)
+            if (old and old["content_hash"] == h and old["params_hash"] == params_hash
+                    and not old["row"].get("Missing Sources")):
+                reuse[j] = old["row"]
+
+    # ── Rentcast: one paged pull per ZIP instead of one call per address ──
+    bulk = {}
+    if params["rentcast_key"] and params.get("rentcast_bulk") and not params.get("offline"):
+        raw, bulk, misses = rentcast_bulk_join(raw, params["rentcast_key"], rows=[r is None for r in reuse])
+        overlay.update({("rentcast_listing", k): v for k, v in misses.items()})
+
+    batch_sla = params.get("batch_sla_s") or 0
+    batch_end = time.monotonic() + batch_sla if batch_sla else None
+    rows_out, reused = [], 0
+    for i, row in raw.iterrows():
+        if should_cancel and should_cancel():
+            return None
+        if on_progress:
+            on_progress(len(rows_out), len(raw), str(row.get("Address", "")).strip())
+        if reuse[len(rows_out)] is not None:
+            rows_out.append(reuse[len(rows_out)])
+            reused += 1
+            continue
+        with deadline_scope(params.get("row_budget_s"), batch_end, offline=params.get("offline", False),
+                            overlay=overlay, replay=bool(snapshot)) as scope:
+            out = underwrite_property(row, params, safmr_df, fmr_index, growth_df)
+        out["Missing Sources"] = ", ".join(sorted(scope.missing))
+        rows_out.append(out)
+
+    # ── Feed the uploaded rows into the listing index as comps for later runs ──
+    index = listing_index()
+    if index is not None:
+        lat, lng = _stored_coords(raw["Address"])
+        index.add([
+            {"key": canonical_address(a), "lat": la, "lng": lo, "beds": b, "sqft": sq,
+             "price": px, "status": "CSV"}
+            for a, la, lo, b, sq, px in zip(
+                raw["Address"].astype(str), lat, lng,
+                pd.to_numeric(raw["Bedrooms"], errors="coerce").fillna(0),
+                pd.to_numeric(raw.get("Sqft", pd.Series(0, index=raw.index)), errors="coerce").fillna(0),
+                pd.to_numeric(raw["List Price"], errors="coerce").fillna(0),
+            )
+            if not np.isnan(la)
+        ], "csv")
+
+    results = finalize_results(pd.DataFrame(rows_out), params)
+    if watch:
+        results.attrs["watchlist_diff"] = watchlist_diff(prev, keys, results).to_dict("records")
+        watch.save(params["watchlist"], keys, hashes, params_hash, rows_out, results)
+    results.attrs["watchlist_reused"] = reused
+    results.attrs["cache_hits"]    = cache_hits
+    results.attrs["rentcast_bulk"] = bulk
+    results.attrs["source_health"] = source_health()
+    results.attrs["partial_rows"]  = int((results["Missing Sources"] != "").sum())
+    results.attrs["sla_exceeded"]  = bool(batch_end and time.monotonic() > batch_end)
+    return results
+
+
+def _stored_coords(addresses) -> tuple[np.ndarray, np.ndarray]:
+    """lat/lng arrays from the stored geocodes (NaN where never geocoded)."""
+    canon = [canonical_address(a) for a in pd.Series(addresses).astype(str)]
+    store = enrichment_store()
+    geo = store.get_many("geocode", canon) if store else {}
+    lat = np.array([geo.get(c, {}).get("lat", np.nan) for c in canon], dtype=float)
+    lng = np.array([geo.get(c, {}).get("lng", np.nan) for c in canon], dtype=float)
+    return lat, lng
+
+
+def arv_comps(results: pd.DataFrame) -> pd.DataFrame:
+    """
+    ARV, comp $/sqft and spread for every row from one region pull of the
+    listing index. Spread = ARV − buyer price − midpoint repairs.
+    """
+    lat, lng = _stored_coords(results["Address"])
+    index = listing_index()
+    have = ~np.isnan(lat)
+    if index is not None and have.any():
+        pad_lat = ARV_RADIUS_KM / 111.0
+        pad_lng = ARV_RADIUS_KM / float(_km_per_deg_lng(np.nanmax(np.abs(lat))))
+        comps = index.region(np.nanmin(lat) - pad_lat, np.nanmax(lat) + pad_lat,
+                             np.nanmin(lng) - pad_lng, np.nanmax(lng) + pad_lng)
+    else:
+        comps = ListingIndex.empty_region()
+    out = knn_arv(
+        lat, lng, pd.to_numeric(results["Beds"], errors="coerce").fillna(0),
+        pd.to_numeric(results["Sqft"], errors="coerce").fillna(0),
+        [canonical_address(a) for a in results["Address"].astype(str)], comps,
+    )
+    repair_mid = ((results["Repair Low ($)"] + results["Repair High ($)"]) / 2).to_numpy()
+    out["ARV Spread"] = (out["ARV"] - results["Buyer Max Purchase"].to_numpy() - repair_mid).round(0)
+    return out
+
+
+def finalize_results(results: pd.DataFrame, params: dict) -> pd.DataFrame:
+    """Portfolio-wide vectorized passes over the per-row results: quality, goal-seek, ARV comps and hold period."""
+    results.insert(0, "Quality", classify_quality(
+        results["Flag Codes"], results["_viable"], results["Rent-to-Value (%)"], results["Condition"],
+    ))
+
+    # ── Goal-seek every property against all constraints in one pass ──
+    goal_seek = solve_offer_constraints(
+        results["Section 8 Rent ($/mo)"], results["List Price"],
+        (results["Repair Low ($)"] + results["Repair High ($)"]) / 2,
+        params["tax_rate"], params["insurance_rate"], params["vacancy_rate"],
+        params["maintenance_rate"], params["mgmt_rate"], params["capex_rate"],
+        params["utility_allowance"], params["interest_rate"], params["loan_term_years"],
+        params["down_pct"], params["target_cashflow"], params["closing_costs_pct"],
+        params["wholesale_fee"],
+        min_dscr=params["min_dscr_req"], min_rtv_pct=params["min_rtv_req"],
+        min_coc_pct=params["min_coc_req"], max_grm=params["max_grm_req"],
+    )
+    results = pd.concat([results, goal_seek.set_index(results.index)], axis=1)
+
+    # ── ARV / $/sqft comps — kNN against the listing index for the whole batch ──
+    results = pd.concat([results, arv_comps(results).set_index(results.index)], axis=1)
+
+    # ── Hold-period amortization, equity and IRR for every property ──
+    hold_years   = params["hold_years"]
+    appreciation = params["appreciation_rate"]
+    hold_metrics, hold_sched, hold_cf = hold_period_analysis(
+        results["Buyer Max Purchase"], results["Total Cash to Close"], results["Section 8 Rent ($/mo)"],
+        params["tax_rate"], params["insurance_rate"], params["vacancy_rate"],
+        params["maintenance_rate"], params["mgmt_rate"], params["capex_rate"],
+        params["utility_allowance"], params["interest_rate"], params["loan_term_years"],
+        params["down_pct"], results.get("Rent Growth (%/yr)", params["rent_growth_rate"] * 100) / 100, hold_years, appreciation,
+        params["selling_cost_pct"], params["discount_rate"],
+    )
+    results = pd.concat([results, hold_metrics.set_index(results.index)], axis=1)
+    yr_end = np.arange(1, hold_years + 1) * 12 - 1
+    value  = results["Buyer Max Purchase"].to_numpy()[:, None] * (1 + appreciation) ** np.arange(1, hold_years + 1)
+    bal    = hold_sched["balance"][:, yr_end]
+    results["_hold"] = [
+        [{"year": y + 1, "cf": round(cf[y]), "balance": round(b[y]), "equity": round(v[y] - b[y])}
+         for y in range(hold_years)]
+        for cf, b, v in zip(hold_cf, bal, value)
+    ]
+    return results
+
+
+# ─────────────────────────────────────────────
+# WATCHLIST
+# A named watchlist remembers, per property, a content hash of the upload
+# row (address, price, beds, sqft, description) and the row it produced.
+# On re-upload, rows whose hash and underwriting parameters are unchanged
+# reuse the stored row and skip enrichment entirely; the batch-wide passes
+# still run over everything. The run carries a diff against the last upload.
+# ─────────────────────────────────────────────
+WATCH_CONTENT_COLS = ("Address", "List Price", "Bedrooms", "Sqft", "Description")
+# params that change how a row is fetched, not what it computes to
+WATCH_VOLATILE_PARAMS = ("watchlist", "offline", "row_budget_s", "batch_sla_s", "rentcast_bulk", "shards")
+
+
+def property_hashes(raw: pd.DataFrame) -> list[str]:
+    """Content hash per upload row over WATCH_CONTENT_COLS (missing columns hash as empty)."""
+    cols = []
+    for c in WATCH_CONTENT_COLS:
+        if c not in raw.columns:
+            cols.append([""] * len(raw))
+        elif c == "Address":
+            cols.append([canonical_address(a) for a in raw[c].astype(str)])
+        elif c == "Description":
+            cols.append(raw[c].fillna("").astype(str).str.strip().tolist())
+        else:
+            cols.append(pd.to_numeric(raw[c], errors="coerce").fillna(0).round(0).astype(int).astype(str).tolist())
+    return [hashlib.sha1("\x1f".join(vals).encode()).hexdigest()[:20] for vals in zip(*cols)]
+
+
+def underwriting_params_hash(params: dict) -> str:
+    stable = {k: v for k, v in params.items() if k not in WATCH_VOLATILE_PARAMS}
+    return hashlib.sha1(repr(sorted(stable.items())).encode()).hexdigest()[:16]
+
+
+class Watchlist:
+    """SQLite-backed watchlist rows: (watchlist, address key) → hash, row, last outcome."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self._open()
+
+    def _open(self) -> None:
+        self._pid  = os.getpid()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS watch ("
+            " watchlist TEXT NOT NULL, key TEXT NOT NULL, content_hash TEXT NOT NULL,"
+            " params_hash TEXT NOT NULL, row BLOB NOT NULL, quality TEXT NOT NULL,"
+            " list_price REAL NOT NULL, dscr_max REAL NOT NULL, updated_at REAL NOT NULL,"
+            " PRIMARY KEY (watchlist, key))"
+        )
+        self._db.commit()
+
+    def _check_fork(self) -> None:
+        if os.getpid() != self._pid:
+            self._open()
+
+    def load(self, watchlist: str) -> dict:
+        """{key: {content_hash, params_hash, row, quality, list_price, dscr_max}}."""
+        self._check_fork()
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT key, content_hash, params_hash, row, quality, list_price, dscr_max"
+                " FROM watch WHERE watchlist = ?", (watchlist,),
+            ).fetchall()
+        out = {}
+        for key, ch, ph, blob, q, lp, dm in rows:
+            try:
+                out[key] = {"content_hash": ch, "params_hash": ph, "row": pickle.loads(blob),
+                            "quality": q, "list_price": lp, "dscr_max": dm}
+            except Exception:
+                pass
+        return out
+
+    def save(self, watchlist: str, keys, hashes, params_hash: str, rows, results: pd.DataFrame) -> None:
+        """Replace the watchlist with this upload's rows and outcomes."""
+        self._check_fork()
+        now = time.time()
+        data = [
+            (watchlist, k, h, params_hash, pickle.dumps(r, protocol=pickle.HIGHEST_PROTOCOL),
+             str(q), float(lp or 0), float(dm or 0), now)
+            for k, h, r, q, lp, dm in zip(
+                keys, hashes, rows, results["Quality"], results["List Price"], results["DSCR Max (uncapped)"])
+        ]
+        with self._lock:
+            try:
+                self._db.execute("DELETE FROM watch WHERE watchlist = ?", (watchlist,))
+                self._db.executemany("INSERT OR REPLACE INTO watch VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", data)
+                self._db.commit()
+            except sqlite3.Error:
+                self._db.rollback()
+
+    def names(self) -> list[str]:
+        self._check_fork()
+        with self._lock:
+            return [r[0] for r in self._db.execute("SELECT DISTINCT watchlist FROM watch ORDER BY watchlist")]
+
+
+@st.cache_resource(show_spinner=False)
+def watchlist_store() -> Watchlist | None:
+    try:
+        return Watchlist(os.path.join(DATA_DIR, "watchlist.sqlite"))
+    except (OSError, sqlite3.Error):
+        return None
+
+
+def watchlist_diff(prev: dict, keys: list[str], results: pd.DataFrame) -> pd.DataFrame:
+    """
+    Changes since the previous upload: new Green Lights, drops to No Deal,
+    price cuts that brought list price under the DSCR max, and removals.
+    """
+    quality   = results["Quality"].to_numpy()
+    price     = pd.to_numeric(results["List Price"], errors="coerce").fillna(0).to_numpy()
+    dscr_max  = pd.to_numeric(results["DSCR Max (uncapped)"], errors="coerce").fillna(0).to_numpy()
+    p_quality = np.array([prev[k]["quality"] if k in prev else "" for k in keys], dtype=object)
+    p_price   = np.array([prev[k]["list_price"] if k in prev else np.nan for k in keys], dtype=float)
+    p_dscr    = np.array([prev[k]["dscr_max"] if k in prev else np.nan for k in keys], dtype=float)
+    seen      = p_quality != ""
+
+    new_green = (quality == "Green Light") & (p_quality != "Green Light")
+    to_nodeal = seen & (quality == "No Deal") & (p_quality != "No Deal")
+    crossed   = seen & (price < p_price) & (p_price > p_dscr) & (price <= dscr_max) & (dscr_max > 0)
+    change = np.select(
+        [crossed, new_green & ~seen, new_green, to_nodeal],
+        ["Price cut under DSCR max", "New listing — Green Light", "Now Green Light", "Dropped to No Deal"],
+        default="",
+    )
+    diff = pd.DataFrame({
+        "Change":              change,
+        "Address":             results["Address"].to_numpy(),
+        "Previous Quality":    p_quality,
+        "Quality":             quality,
+        "Previous List Price": p_price,
+        "List Price":          price,
+        "DSCR Max (uncapped)": dscr_max,
+    })[change != ""]
+    gone = sorted(set(prev) - set(keys))
+    if gone:
+        diff = pd.concat([diff, pd.DataFrame({
+            "Change":              "Removed from list",
+            "Address":             [prev[k]["row"].get("Address", k) for k in gone],
+            "Previous Quality":    [prev[k]["quality"] for k in gone],
+            "Quality":             "",
+            "Previous List Price": [prev[k]["list_price"] for k in gone],
+            "List Price":          np.nan,
+            "DSCR Max (uncapped)": np.nan,
+        })], ignore_index=True)
+    return diff.reset_index(drop=True)
+
+
+# ─────────────────────────────────────────────
+# BACKGROUND JOB QUEUE
+# Analyses run in a small pool of forked worker processes fed by a local
+# queue, so a 1,000-row list never blocks (or gets restarted by) the
+# Streamlit session that submitted it. Job status, cancel flags and
+# results live in DATA_DIR/jobs, so any session can poll or reopen them.
+# ─────────────────────────────────────────────
+JOB_DIR       = os.path.join(DATA_DIR, "jobs")
+JOB_WORKERS   = int(os.environ.get("S8_JOB_WORKERS", "2"))
+JOB_RETENTION = 86400 * 7
+
+
+def _job_path(job_id: str, ext: str) -> str:
+    return os.path.join(JOB_DIR, f"{job_id}.{ext}")
+
+
+def read_job_status(job_id: str) -> dict:
+    try:
+        with open(_job_path(job_id, "json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_job_status(job_id: str, /, **fields) -> None:
+    status = read_job_status(job_id)
+    status.update(fields)
+    tmp = _job_path(job_id, f"json.{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(status, f)
+    os.replace(tmp, _job_path(job_id, "json"))
+
+
+def list_jobs(limit: int = 20) -> list[dict]:
+    """Most recent jobs first. Prunes files older than JOB_RETENTION."""
+    try:
+        names = os.listdir(JOB_DIR)
+    except OSError:
+        return []
+    jobs, cutoff = [], time.time() - JOB_RETENTION
+    for name in names:
+        path = os.path.join(JOB_DIR, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                continue
+        except OSError:
+            continue
+        if name.endswith(".json"):
+            status = read_job_status(name[:-5])
+            if status:
+                jobs.append(status)
+    return sorted(jobs, key=lambda j: j.get("submitted_at", 0), reverse=True)[:limit]
+
+
+def load_job_result(job_id: str) -> pd.DataFrame | None:
+    """Finished jobs are saved runs — see SAVED RUNS."""
+    run = load_run(job_id)
+    return run[0] if run else None
+
+
+def cancel_job(job_id: str) -> None:
+    """Flag a job for cancellation; a worker checks the flag before every row."""
+    try:
+        open(_job_path(job_id, "cancel"), "w").close()
+    except OSError:
+        return
+    if read_job_status(job_id).get("status") == "queued":
+        _write_job_status(job_id, status="cancelled", finished_at=time.time())
+
+
+def _run_job(job_id: str, raw: pd.DataFrame, params: dict, snapshot: dict | None = None) -> None:
+    cancel_flag = _job_path(job_id, "cancel")
+    if os.path.exists(cancel_flag):
+        _write_job_status(job_id, status="cancelled", finished_at=time.time())
+        return
+    _write_job_status(job_id, status="running", started_at=time.time(), pid=os.getpid())
+
+    last_write = [0.0]
+
+    def on_progress(n_done, total, addr):
+        now = time.time()
+        if now - last_write[0] >= 0.5:   # throttle status writes
+            last_write[0] = now
+            _write_job_status(job_id, done=n_done, total=total, current=addr[:55])
+
+    try:
+        safmr_df, fmr_index = load_safmr(), load_county_fmr_index()
+        if params.get("shards", 1) > 1 and not params.get("watchlist"):
+            results = run_sharded(
+                job_id, raw, params, snapshot,
+                on_progress=on_progress,
+                should_cancel=lambda: os.path.exists(cancel_flag),
+            )
+        else:
+            results = underwrite_batch(
+                raw, params, safmr_df, fmr_index,
+                on_progress=on_progress,
+                should_cancel=lambda: os.path.exists(cancel_flag),
+                snapshot=snapshot,
+            )
+        if results is None:
+            _write_job_status(job_id, status="cancelled", finished_at=time.time())
+            return
+        stats = dict(finished_at=time.time(),
+                     cache_hits=results.attrs.get("cache_hits", 0),
+                     source_health=results.attrs.get("source_health", {}),
+                     partial_rows=results.attrs.get("partial_rows", 0),
+                     sla_exceeded=results.attrs.get("sla_exceeded", False),
+                     watchlist_reused=results.attrs.get("watchlist_reused", 0),
+                     rentcast_bulk=results.attrs.get("rentcast_bulk", {}),
+                     shards=results.attrs.get("shards", 1))
+        export_fetch_cache_metrics()
+        save_run(job_id, results, raw, params, {**read_job_status(job_id), **stats}, safmr_df, fmr_index)
+        _write_job_status(job_id, status="done", done=len(raw), **stats)
+    except Exception as e:
+        _write_job_status(job_id, status="failed", error=str(e), finished_at=time.time())
+
+
+_JOB_TASKS = None   # the pool's task queue, as seen from inside a worker
+
+
+def _job_worker(tasks) -> None:
+    global _JOB_TASKS
+    _JOB_TASKS = tasks
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        if task[0] == SHARD_TASK:
+            work_shards(*task[1:])
+        else:
+            _run_job(*task)
+
+
+class JobQueue:
+    """
+    Local worker pool. On platforms with fork(), workers are separate processes
+    (inheriting the loaded SAFMR / caches); elsewhere they fall back to threads.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS):
+        os.makedirs(JOB_DIR, exist_ok=True)
+        self.workers = max(1, workers)
+        if "fork" in multiprocessing.get_all_start_methods():
+            self._ctx   = multiprocessing.get_context("fork")
+            self._tasks = self._ctx.Queue()
+        else:
+            self._ctx   = None
+            self._tasks = queue.Queue()
+        self._pool = []
+        self._ensure_workers()
+
+    def _ensure_workers(self) -> None:
+        """(Re)start dead workers so one crashed job doesn't shrink the pool."""
+        self._pool = [w for w in self._pool if w.is_alive()]
+        while len(self._pool) < self.workers:
+            if self._ctx:
+                w = self._ctx.Process(target=_job_worker, args=(self._tasks,), daemon=True)
+            else:
+                w = threading.Thread(target=_job_worker, args=(self._tasks,), daemon=True)
+            w.start()
+            self._pool.append(w)
+
+    def submit(self, raw: pd.DataFrame, params: dict, label: str = "", snapshot: dict | None = None) -> str:
+        job_id = uuid.uuid4().hex[:12]
+        _write_job_status(job_id, job_id=job_id, status="queued", label=label,
+                          done=0, total=len(raw), submitted_at=time.time(),
+                          offline=bool(params.get("offline")),
+                          params={k: v for k, v in params.items() if k != "rentcast_key"})
+        self._ensure_workers()
+        self._tasks.put((job_id, raw, params, snapshot))
+        return job_id
+
+
+@st.cache_resource(show_spinner=False)
+def job_queue() -> JobQueue:
+    """
+    One worker pool per server process, shared by every session. Waits for the
+    reference preload first: forking while that thread holds a cache lock would
+    deadlock the workers, and forking after it means they inherit the loaded tables.
+    """
+    reference_preload().wait()
+    return JobQueue()
+
+
+@st.fragment(run_every=1.5)
+def render_job_progress(job_id: str) -> None:
+    """Polls the job's status file; triggers a full rerun once it leaves the queue."""
+    job = read_job_status(job_id)
+    if job.get("status") not in ("queued", "running"):
+        st.rerun()
+    total, done = job.get("total", 0) or 1, job.get("done", 0)
+    if job.get("status") == "queued":
+        st.progress(0, text=f"Queued — waiting for a free worker ({job.get('label', '')})")
+    else:
+        st.progress(min(100, int(done / total * 100)),
+                    text=f"({done}/{total}) {job.get('current', '')}…")
+    if st.button("Cancel analysis", key=f"cancel_{job_id}"):
+        cancel_job(job_id)
+        st.rerun()
+
+
+# ─────────────────────────────────────────────
+# SHARDED BATCHES
+# A job with params["shards"] > 1 is split by ZIP (whole ZIPs per shard, so
+# each worker's geocode / Zillow / Census caches stay local) into
+# DATA_DIR/shards/<job_id>/<k>.pkl. Any process that can see DATA_DIR —
+# the coordinating job worker, idle workers in this pool, or
+# `S8_SHARD_WORKER=1 python app.py` on another machine sharing the volume —
+# claims a shard by renaming it to <k>.run.<token> (a fresh token per
+# attempt), renews that lease from a background thread while it works and,
+# only while it still holds the lease, writes <k>.out (or <k>.err.<token>).
+# The coordinator re-queues failed or stale attempts up to SHARD_RETRIES
+# times; finished shards are never redone. Outputs are merged back in input
+# order with combined stats. The Rentcast key is never written to the shared
+# volume: local workers get it through the in-memory task queue, workers on
+# other machines use their own $S8_RENTCAST_KEY.
+# ─────────────────────────────────────────────
+SHARD_DIR     = os.path.join(DATA_DIR, "shards")
+SHARD_TASK    = "__shards__"
+SHARD_LEASE_S = 120    # a claimed shard with no heartbeat for this long is re-queued
+SHARD_BEAT_S  = 15     # lease renewal interval of a running shard
+SHARD_RETRIES = 2
+SHARD_RENTCAST_KEY = os.environ.get("S8_RENTCAST_KEY", "")   # remote shard workers' own key
+
+
+def _shard_path(job_id: str, k: int, ext: str) -> str:
+    return os.path.join(SHARD_DIR, job_id, f"{k:04d}.{ext}")
+
+
+def _write_pickle(path: str, obj) -> None:
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def split_by_zip(raw: pd.DataFrame, n: int) -> list[np.ndarray]:
+    """
+    Row positions for up to n shards. Whole ZIPs only, biggest ZIP first onto
+    the lightest shard — the same input always gives the same shards.
+    """
+    zips   = raw["Zip"].astype(str).to_numpy()
+    counts = pd.Series(zips).value_counts()
+    loads, members = [0] * n, [[] for _ in range(n)]
+    for z, c in sorted(counts.items(), key=lambda kv: (-kv[1], kv[0])):
+        k = min(range(n), key=lambda i: (loads[i], i))
+        members[k].append(z)
+        loads[k] += c
+    return [np.flatnonzero(np.isin(zips, m)) for m in members if m]
+
+
+def run_shard(job_id: str, k: int, token: str, on_beat=None, rentcast_key: str = "") -> None:
+    """
+    Underwrite one claimed shard and write its output (or error). A thread
+    renews the lease for the whole run — enrichment, the Rentcast bulk pull
+    and finalize alike. If the lease is lost (the coordinator re-queued this
+    attempt) the batch is cancelled and nothing is written.
+    """
+    claim = _shard_path(job_id, k, f"run.{token}")
+    lost, stop = threading.Event(), threading.Event()
+
+    def renew() -> bool:
+        try:
+            os.utime(claim)
+            return True
+        except OSError:
+            lost.set()
+            return False
+
+    def lease() -> None:
+        while not stop.wait(SHARD_BEAT_S) and renew():
+            pass
+
+    renew()   # the rename kept the submit-time mtime
+    threading.Thread(target=lease, name=f"shard-lease-{k}", daemon=True).start()
+    try:
+        with open(claim, "rb") as f:
+            task = pickle.load(f)
+        cancel_flag = _job_path(job_id, "cancel")
+        last = [0.0]
+
+        def beat(n_done, total, addr):
+            if time.time() - last[0] >= 2:
+                last[0] = time.time()
+                with open(_shard_path(job_id, k, "hb"), "w") as f:
+                    json.dump({"done": n_done, "by": f"{platform.node()}:{os.getpid()}"}, f)
+                if on_beat:
+                    on_beat()
+
+        results = underwrite_batch(
+            task["raw"], {**task["params"], "rentcast_key": rentcast_key or SHARD_RENTCAST_KEY},
+            load_safmr(), load_county_fmr_index(),
+            on_progress=beat, should_cancel=lambda: lost.is_set() or os.path.exists(cancel_flag),
+            snapshot=task["snapshot"],
+        )
+        if results is None or not renew():   # cancelled or lease lost — the coordinator decides
+            return
+        results.index = task["positions"]
+        _write_pickle(_shard_path(job_id, k, "out"), results)
+        try:
+            os.remove(claim)
+        except OSError:
+            pass
+    except Exception as e:
+        if renew():
+            try:
+                with open(_shard_path(job_id, k, f"err.{token}"), "w") as f:
+                    f.write(f"{platform.node()}:{os.getpid()}: {e}")
+            except OSError:
+                pass
+    finally:
+        stop.set()
+
+
+def work_one_shard(job_id: str, on_beat=None, rentcast_key: str = "") -> bool:
+    """Claim and run the next pending shard of a job. False if none was left."""
+    try:
+        names = sorted(os.listdir(os.path.join(SHARD_DIR, job_id)))
+    except OSError:
+        return False
+    for name in names:
+        if not name.endswith(".pkl"):
+            continue
+        k, token = int(name.split(".")[0]), uuid.uuid4().hex[:8]
+        try:
+            # exactly one claimer wins
+            os.rename(_shard_path(job_id, k, "pkl"), _shard_path(job_id, k, f"run.{token}"))
+        except OSError:
+            continue
+        run_shard(job_id, k, token, on_beat, rentcast_key)
+        return True
+    return False
+
+
+def work_shards(job_id: str, rentcast_key: str = "") -> None:
+    while work_one_shard(job_id, rentcast_key=rentcast_key):
+        pass
+
+
+def _merge_health(healths: list[dict]) -> dict:
+    """Breaker summaries from every shard: counts summed, worst state, slowest latency."""
+    rank = {"closed": 0, "half-open": 1, "open": 2}
+    out = {}
+    for health in healths:
+        for src, h in health.items():
+            if src not in out:
+                out[src] = dict(h)
+                continue
+            m = out[src]
+            for c in ("calls", "failures", "trips", "skipped"):
+                m[c] = m.get(c, 0) + h.get(c, 0)
+            if rank.get(h.get("state"), 0) > rank.get(m.get("state"), 0):
+                m["state"] = h["state"]
+            for c, pick in (("p50_s", max), ("p95_s", max), ("timeout_s", min)):
+                m[c] = pick((v for v in (m.get(c), h.get(c)) if v is not None), default=None)
+    return out
+
+
+def merge_shards(parts: list[pd.DataFrame]) -> pd.DataFrame:
+    """Shard outputs → one frame in input order with combined stats."""
+    results = pd.concat(parts).sort_index(kind="stable").reset_index(drop=True)
+    attrs = [p.attrs for p in parts]
+    bulk = [a["rentcast_bulk"] for a in attrs if a.get("rentcast_bulk")]
+    results.attrs = {
+        "cache_hits":       sum(a.get("cache_hits", 0) for a in attrs),
+        "partial_rows":     sum(a.get("partial_rows", 0) for a in attrs),
+        "sla_exceeded":     any(a.get("sla_exceeded") for a in attrs),
+        "watchlist_reused": 0,
+        "rentcast_bulk":    {k: sum(b.get(k, 0) for b in bulk) for k in ("zips", "calls", "matched")} if bulk else {},
+        "source_health":    _merge_health([a.get("source_health", {}) for a in attrs]),
+        "shards":           len(parts),
+    }
+    return results
+
+
+def run_sharded(job_id: str, raw: pd.DataFrame, params: dict, snapshot: dict | None = None,
+                on_progress=None, should_cancel=None) -> pd.DataFrame | None:
+    """
+    Coordinator: write the shards, enlist idle local workers, work shards
+    itself, re-queue failures, then merge. None if cancelled; raises if a
+    shard fails more than SHARD_RETRIES times.
+    """
+    parts = split_by_zip(raw, int(params["shards"]))
+    os.makedirs(os.path.join(SHARD_DIR, job_id), exist_ok=True)
+    shard_params = {p: v for p, v in params.items() if p != "rentcast_key"}
+    for k, pos in enumerate(parts):
+        _write_pickle(_shard_path(job_id, k, "pkl"),
+                      {"raw": raw.iloc[pos].reset_index(drop=True), "positions": pos,
+                       "params": shard_params, "snapshot": snapshot})
+    if _JOB_TASKS is not None:
+        for _ in range(min(len(parts), JOB_WORKERS) - 1):
+            _JOB_TASKS.put((SHARD_TASK, job_id, params["rentcast_key"]))
+
+    attempts = [0] * len(parts)
+
+    def progress():
+        done = 0
+        for k, pos in enumerate(parts):
+            if os.path.exists(_shard_path(job_id, k, "out")):
+                done += len(pos)
+                continue
+            try:
+                with open(_shard_path(job_id, k, "hb")) as f:
+                    done += json.load(f).get("done", 0)
+            except (OSError, ValueError):
+                pass
+        if on_progress:
+            on_progress(done, len(raw), f"{len(parts)} shards")
 
-with col_up:
-    uploaded = st.file_uploader("Upload Property CSV / Excel", type=["csv", "xlsx"])
+    try:
+        while True:
+            if should_cancel and should_cancel():
+                return None
+            ran = work_one_shard(job_id, on_beat=progress, rentcast_key=params["rentcast_key"])
+            try:
+                names = os.listdir(os.path.join(SHARD_DIR, job_id))
+            except OSError:
+                names = []
+            claims = {int(n.split(".")[0]): n.split(".", 2)[2] for n in names if ".run." in n}
+            pending = 0
+            for k in range(len(parts)):
+                if os.path.exists(_shard_path(job_id, k, "out")):
+                    continue
+                pending += 1
+                token = claims.get(k)
+                if token is None:
+                    continue   # still queued
+                run, err = _shard_path(job_id, k, f"run.{token}"), _shard_path(job_id, k, f"err.{token}")
+                failed = os.path.exists(err)
+                try:
+                    stale = not failed and time.time() - os.path.getmtime(run) > SHARD_LEASE_S
+                except OSError:
+                    stale = False   # just finished or re-claimed
+                if not (failed or stale):
+                    continue
+                reason = "worker stopped heartbeating"
+                if failed:
+                    try:
+                        with open(err) as f:
+                            reason = f.read()
+                    except OSError:
+                        pass
+                try:
+                    os.rename(run, _shard_path(job_id, k, "pkl"))
+                except OSError:
+                    continue   # the owner finished or gave up in the meantime
+                attempts[k] += 1
+                if attempts[k] > SHARD_RETRIES:
+                    raise RuntimeError(f"shard {k} failed {attempts[k]} times — last: {reason}")
+                for path in (err, _shard_path(job_id, k, "hb")):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+            progress()
+            if not pending:
+                break
+            if not ran:
+                time.sleep(0.5)
+        outs = []
+        for k in range(len(parts)):
+            with open(_shard_path(job_id, k, "out"), "rb") as f:
+                outs.append(pickle.load(f))
+        return merge_shards(outs)
+    finally:
+        shutil.rmtree(os.path.join(SHARD_DIR, job_id), ignore_errors=True)
+
+
+def shard_worker_loop(poll_s: float = 2.0) -> None:
+    """Headless worker for other machines: run pending shards of any job, forever."""
+    reference_preload().wait()
+    while True:
+        try:
+            jobs = sorted(os.listdir(SHARD_DIR))
+        except OSError:
+            jobs = []
+        for job_id in jobs:
+            work_shards(job_id)
+        time.sleep(poll_s)
+
+
+# ─────────────────────────────────────────────
+# SAVED RUNS
+# Every finished job is written to DATA_DIR/runs/<job_id>.s8run: one file
+# with a JSON header (params, data vintages, source hashes, job stats) and
+# 64-byte aligned column segments — numeric columns raw, text as UTF-8 blob
+# + offsets, anything else pickled. Reopening memory-maps the file, so
+# numeric columns are views, not copies. The run's enrichment responses are
+# archived too, so it can be re-underwritten under new parameters offline.
+# ─────────────────────────────────────────────
+RUN_DIR   = os.path.join(DATA_DIR, "runs")
+RUN_KEEP  = 50
+RUN_MAGIC = b"S8RUN\x00\x00\x01"
+RUN_ALIGN = 64
+
+# Keep in step with SAFMR_URL / COUNTY_FMR_URL / the Census ACS endpoints
+DATA_VINTAGES = {
+    "safmr":      "HUD FY2026 Small Area FMR",
+    "county_fmr": "HUD FY2026 FMR",
+    "acs":        "Census ACS 5-year 2022",
+    "rent_growth": f"HUD Small Area FMR FY{min(SAFMR_HISTORY)}–FY{max(SAFMR_HISTORY)}",
+}
+SNAPSHOT_SOURCES = ("geocode", "zillow", "census", "rentcast_avm", "rentcast_listing")
+
+
+def _run_path(run_id: str) -> str:
+    return os.path.join(RUN_DIR, f"{run_id}.s8run")
+
+
+def _frame_hash(df: pd.DataFrame | None) -> str:
+    if df is None or df.empty:
+        return ""
+    try:
+        return hashlib.sha1(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes()).hexdigest()[:16]
+    except TypeError:   # unhashable cells (lists / dicts)
+        return hashlib.sha1(pickle.dumps(df)).hexdigest()[:16]
+
+
+def _encode_frame(df: pd.DataFrame) -> tuple[list[dict], list[bytes]]:
+    """Column specs + raw segments for one frame."""
+    specs, segs = [], []
+    for name in df.columns:
+        s = df[name]
+        if s.dtype.kind in "biuf":
+            arr = np.ascontiguousarray(s.to_numpy())
+            specs.append({"name": name, "kind": "num", "dtype": arr.dtype.str, "segs": [len(segs)]})
+            segs.append(arr.tobytes())
+        elif len(s) and s.map(type).eq(str).all():
+            enc = [v.encode("utf-8") for v in s]
+            off = np.zeros(len(enc) + 1, dtype=np.int64)
+            np.cumsum([len(b) for b in enc], out=off[1:])
+            specs.append({"name": name, "kind": "str", "segs": [len(segs), len(segs) + 1]})
+            segs += [off.tobytes(), b"".join(enc)]
+        else:
+            specs.append({"name": name, "kind": "pickle", "segs": [len(segs)]})
+            segs.append(pickle.dumps(s.tolist(), protocol=pickle.HIGHEST_PROTOCOL))
+    return specs, segs
+
+
+def write_run_archive(path: str, frames: dict[str, pd.DataFrame], meta: dict, blobs: dict | None = None) -> None:
+    """Atomically write frames + pickled blobs + meta to one archive file."""
+    layout, segs = {"frames": {}, "blobs": {}}, []
+    for fname, df in frames.items():
+        specs, fsegs = _encode_frame(df)
+        for spec in specs:
+            spec["segs"] = [i + len(segs) for i in spec["segs"]]
+        layout["frames"][fname] = {"rows": len(df), "columns": specs}
+        segs += fsegs
+    for bname, obj in (blobs or {}).items():
+        layout["blobs"][bname] = len(segs)
+        segs.append(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+
+    pad = lambda n: (-n) % RUN_ALIGN
+    offsets, pos = [], 0
+    for seg in segs:
+        offsets.append([pos, len(seg)])
+        pos += len(seg) + pad(len(seg))
+    header = json.dumps({"meta": meta, "layout": layout, "segments": offsets}, default=str).encode()
+    data_start = 16 + len(header) + pad(16 + len(header))
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(RUN_MAGIC + len(header).to_bytes(8, "little") + header)
+        f.write(b"\0" * (data_start - 16 - len(header)))
+        for seg in segs:
+            f.write(seg)
+            f.write(b"\0" * pad(len(seg)))
+    os.replace(tmp, path)
+
+
+def read_run_header(path: str) -> dict | None:
+    """Header only (meta + layout) — cheap enough to list every saved run."""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(16)
+            if len(head) < 16 or head[:8] != RUN_MAGIC:
+                return None
+            return json.loads(f.read(int.from_bytes(head[8:], "little")))
+    except (OSError, ValueError):
+        return None
+
+
+def read_run_archive(path: str) -> tuple[dict, dict, dict] | None:
+    """(frames, blobs, meta) with numeric columns as read-only views of a memory map."""
+    header = read_run_header(path)
+    if header is None:
+        return None
+    buf = np.memmap(path, dtype=np.uint8, mode="r")
+    hlen = 16 + int.from_bytes(bytes(buf[8:16]), "little")
+    data_start = hlen + (-hlen) % RUN_ALIGN
+    segs = header["segments"]
+
+    def seg(i):
+        off, n = segs[i]
+        return buf[data_start + off: data_start + off + n]
+
+    frames = {}
+    for fname, spec in header["layout"]["frames"].items():
+        cols = {}
+        for c in spec["columns"]:
+            if c["kind"] == "num":
+                cols[c["name"]] = seg(c["segs"][0]).view(np.dtype(c["dtype"]))
+            elif c["kind"] == "str":
+                off  = seg(c["segs"][0]).view(np.int64)
+                blob = bytes(seg(c["segs"][1]))
+                cols[c["name"]] = np.array(
+                    [blob[off[i]:off[i + 1]].decode("utf-8") for i in range(spec["rows"])], dtype=object)
+            else:
+                cols[c["name"]] = pickle.loads(bytes(seg(c["segs"][0])))
+        frames[fname] = pd.DataFrame(cols, index=pd.RangeIndex(spec["rows"]), copy=False) \
+            if cols else pd.DataFrame(index=pd.RangeIndex(spec["rows"]))
+    blobs = {b: pickle.loads(bytes(seg(i))) for b, i in header["layout"]["blobs"].items()}
+    return frames, blobs, header["meta"]
+
+
+def enrichment_snapshot(results: pd.DataFrame) -> dict:
+    """{source: {key: value}} of every stored enrichment response the run used."""
+    store = enrichment_store()
+    if store is None or results.empty:
+        return {}
+    canon = [canonical_address(a) for a in results["Address"].astype(str)]
+    beds  = pd.to_numeric(results["Beds"], errors="coerce").fillna(0).astype(int)
+    sqft  = pd.to_numeric(results["Sqft"], errors="coerce").fillna(0).astype(int)
+    keys = {
+        "geocode":          canon,
+        "zillow":           canon,
+        "rentcast_listing": canon,
+        "census":           results["Zip"].astype(str).tolist(),
+        "rentcast_avm":     [f"{c}|{b}|{s}" for c, b, s in zip(canon, beds, sqft)],
+    }
+    return {src: store.get_many(src, keys[src]) for src in SNAPSHOT_SOURCES}
+
+
+def save_run(run_id: str, results: pd.DataFrame, raw: pd.DataFrame, params: dict, job: dict,
+             safmr_df: pd.DataFrame | None = None, fmr_index: pd.DataFrame | None = None) -> None:
+    """Archive a finished job. Prunes to the RUN_KEEP most recent runs."""
+    meta = {
+        "run_id":     run_id,
+        "label":      job.get("label", ""),
+        "created_at": time.time(),
+        "rows":       len(results),
+        "quality":    results["Quality"].value_counts().to_dict() if "Quality" in results else {},
+        "params":     {k: v for k, v in params.items() if k != "rentcast_key"},
+        "vintages":   DATA_VINTAGES,
+        "hashes": {
+            "input":      _frame_hash(raw),
+            "safmr":      _frame_hash(safmr_df),
+            "county_fmr": _frame_hash(fmr_index),
+            "code":       hashlib.sha1(open(__file__, "rb").read()).hexdigest()[:16],
+        },
+        "job": {k: job.get(k) for k in ("label", "started_at", "finished_at", "cache_hits",
+                                         "source_health", "partial_rows", "sla_exceeded", "offline",
+                                         "watchlist_reused", "rentcast_bulk", "shards")},
+    }
+    write_run_archive(
+        _run_path(run_id), {"results": results, "raw": raw}, meta,
+        blobs={"attrs": dict(results.attrs), "snapshot": enrichment_snapshot(results)},
+    )
+    runs = sorted((os.path.join(RUN_DIR, n) for n in os.listdir(RUN_DIR) if n.endswith(".s8run")),
+                  key=os.path.getmtime, reverse=True)
+    for old in runs[RUN_KEEP:]:
+        try:
+            os.remove(old)
+        except OSError:
+            pass
+
+
+def list_runs(limit: int = 20) -> list[dict]:
+    """Saved run metas, newest first."""
+    try:
+        names = [n for n in os.listdir(RUN_DIR) if n.endswith(".s8run")]
+    except OSError:
+        return []
+    metas = []
+    for n in names:
+        header = read_run_header(os.path.join(RUN_DIR, n))
+        if header:
+            metas.append(header["meta"])
+    return sorted(metas, key=lambda m: m.get("created_at", 0), reverse=True)[:limit]
+
+
+def load_run(run_id: str) -> tuple[pd.DataFrame, pd.DataFrame, dict, dict] | None:
+    """(results, raw, meta, blobs) for a saved run, or None if it's gone."""
+    archive = read_run_archive(_run_path(run_id))
+    if archive is None:
+        return None
+    frames, blobs, meta = archive
+    results = frames["results"]
+    results.attrs.update(blobs.get("attrs", {}))
+    return results, frames["raw"], meta, blobs
+
+
+# ─────────────────────────────────────────────
+# REFERENCE DATA PRELOAD
+# SAFMR, county FMR and the ACS ZCTA table download on a daemon thread
+# started by the first script run after server boot, so the multi-MB
+# fetches overlap with the user picking a file instead of blocking render.
+# ─────────────────────────────────────────────
+class ReferencePreload:
+    def __init__(self):
+        self.timings: dict[str, float] = {}
+        self._thread = threading.Thread(target=self._run, name="reference-preload", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        for name, load in (("safmr", load_safmr),
+                           ("county_fmr", load_county_fmr_index),
+                           ("acs_zcta", load_census_zcta_table)):
+            t0 = time.perf_counter()
+            try:
+                load()
+            except Exception:
+                pass
+            self.timings[name] = round(time.perf_counter() - t0, 2)
+
+    def done(self) -> bool:
+        return not self._thread.is_alive()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        self._thread.join(timeout)
+        return self.done()
+
+
+@st.cache_resource(show_spinner=False)
+def reference_preload() -> ReferencePreload:
+    """Started once per server process; later reruns just check on it."""
+    return ReferencePreload()
+
+
+reference_preload()
+
+# Headless shard worker for another machine mounting the same DATA_DIR:
+#   S8_SHARD_WORKER=1 python app.py
+if os.environ.get("S8_SHARD_WORKER"):
+    shard_worker_loop()
+    sys.exit(0)
+
+
+def memory_report() -> tuple[pd.DataFrame, dict]:
+    """
+    Per reference table: rows, load time, shared (memory-mapped) and private MB.
+    Plus this session's own footprint — its session_state, with frames measured
+    deeply — and the process peak RSS, for the diagnostics panel.
+    """
+    mb = lambda n: round(n / 2**20, 1)
+    timings = reference_preload().timings
+    rows = []
+    for name, load in (("safmr", load_safmr), ("county_fmr", load_county_fmr_index),
+                       ("acs_zcta", load_census_zcta_table)):
+        df = load()
+        shared, private = frame_memory(df)
+        rows.append({"Table": name, "Rows": len(df), "Load (s)": timings.get(name),
+                     "Shared MB": mb(shared), "Private MB": mb(private)})
+    session = 0
+    for v in st.session_state.to_dict().values():
+        session += sum(frame_memory(v)) if isinstance(v, pd.DataFrame) else sys.getsizeof(v)
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+    except ImportError:
+        peak = 0
+    return pd.DataFrame(rows), {"session_mb": mb(session), "process_peak_mb": mb(peak)}
+
+
+# ─────────────────────────────────────────────
+# AREA SWEEP
+# Tile a city, ZIP list or bounding box into Zillow-sized search boxes, pull
+# every listResults page and turn the listings into the same frame an upload
+# produces. Each listing's geocode and Zillow signals go straight into the
+# enrichment store, so the per-row pipeline makes no Nominatim or Zillow
+# calls for swept properties.
+# ─────────────────────────────────────────────
+SWEEP_TILE_DEG  = 0.06   # the box fetch_zillow_listing_signals searches per address
+SWEEP_MAX_TILES = 400
+ZILLOW_MAX_PAGES = 20    # Zillow stops paging a search box after this many result pages
+SWEEP_MAX_SPLITS = 3     # a tile too dense to page through is quartered at most this many times
+
+
+def geocode_area(query: str) -> dict | None:
+    """
+    City name or 5-digit ZIP → {"north","south","east","west"} from Nominatim's
+    bounding box for the place. Stored alongside address geocodes.
+    """
+    q = query.strip()
+    store_key = "area:" + q.lower()
+    stored = _store_get("geocode", store_key)
+    if stored is not None:
+        return stored
+    where = {"postalcode": q, "country": "us"} if re.fullmatch(r"\d{5}", q) else {"q": q}
+    try:
+        r = source_request(
+            "nominatim", "GET", "https://nominatim.openstreetmap.org/search",
+            params={**where, "format": "json", "limit": 1},
+            headers={"User-Agent": "Section8Calc/1.0 (wholesale underwriter)"},
+        )
+        if r.status_code == 200 and r.json():
+            south, north, west, east = (float(v) for v in r.json()[0]["boundingbox"])
+            bbox = {"north": north, "south": south, "east": east, "west": west}
+            _store_put("geocode", store_key, bbox)
+            return bbox
+    except Exception:
+        pass
+    return None
+
+
+def sweep_tiles(bbox: dict, tile: float = SWEEP_TILE_DEG) -> list[dict]:
+    """Split a bounding box into a grid of roughly tile × tile degree search boxes."""
+    n_lat = max(1, int(np.ceil((bbox["north"] - bbox["south"]) / tile)))
+    n_lng = max(1, int(np.ceil((bbox["east"] - bbox["west"]) / tile)))
+    lat_edges = np.round(np.linspace(bbox["south"], bbox["north"], n_lat + 1), 5)
+    lng_edges = np.round(np.linspace(bbox["west"],  bbox["east"],  n_lng + 1), 5)
+    return [
+        {"south": float(lat_edges[i]), "north": float(lat_edges[i + 1]),
+         "west":  float(lng_edges[j]), "east":  float(lng_edges[j + 1])}
+        for i in range(n_lat) for j in range(n_lng)
+    ]
+
+
+def _quarter_tile(t: dict) -> list[dict]:
+    mid_lat = round((t["north"] + t["south"]) / 2, 5)
+    mid_lng = round((t["east"] + t["west"]) / 2, 5)
+    return [{"south": s, "north": n, "west": w, "east": e}
+            for s, n in ((t["south"], mid_lat), (mid_lat, t["north"]))
+            for w, e in ((t["west"], mid_lng), (mid_lng, t["east"]))]
+
+
+def sweep_listings(tiles: list[dict], on_progress=None) -> pd.DataFrame:
+    """
+    Compact results for every tile, deduped by zpid (tiles overlap at the edges).
+    Each tile is paged through to its last results page; a tile with more pages
+    than Zillow serves is quartered instead (up to SWEEP_MAX_SPLITS times).
+    attrs["truncated_tiles"] counts tiles still too dense after that.
+    """
+    frames, truncated, done = [], 0, 0
+    todo = deque((t, 0) for t in tiles)
+    while todo:
+        t, splits = todo.popleft()
+        if on_progress:
+            on_progress(done, done + len(todo) + 1)
+        done += 1
+        box = {k: t[k] for k in ("north", "south", "east", "west")}
+        first = _zillow_search_area(**box)
+        pages = first.attrs.get("total_pages", 1)
+        if pages > ZILLOW_MAX_PAGES and splits < SWEEP_MAX_SPLITS:
+            todo.extend((q, splits + 1) for q in _quarter_tile(t))
+            continue
+        truncated += pages > ZILLOW_MAX_PAGES
+        frames.append(first)
+        frames.extend(_zillow_search_area(**box, page=p) for p in range(2, min(pages, ZILLOW_MAX_PAGES) + 1))
+    listings = pd.concat(frames, ignore_index=True) if frames else compact_zillow([])
+    listings = listings[listings["zpid"] != ""]
+    listings = listings.drop_duplicates("zpid", keep="last").reset_index(drop=True)
+    listings.attrs = {"truncated_tiles": truncated}
+    return listings
+
+
+def listings_to_frame(listings: pd.DataFrame, zips: set | None = None) -> pd.DataFrame:
+    """
+    Compact for-sale results → upload-shaped frame (Address, Zip, Bedrooms, Sqft,
+    List Price). Also seeds the geocode/zillow store entries and the listing
+    index for every listing kept. zips restricts to those ZIP codes.
+    """
+    status = listings["home_status"].str.upper()
+    keep = (~status.str.contains("RENT") & ~status.str.contains("SOLD")
+            & (listings["zipcode"] != "") & (listings["address"] != ""))
+    if zips:
+        keep &= listings["zipcode"].isin(zips)
+    kept = listings[keep]
+
+    geo, sig = {}, {}
+    for row in kept.to_dict("records"):
+        key = canonical_address(row["address"])
+        sig[key] = _zillow_signals(row)
+        lat, lng = row["lat"], row["lng"]
+        if not (np.isnan(lat) or np.isnan(lng)):
+            # same box _geocode_city_bbox builds, so later lookups match
+            geo[key] = {"north": lat + 0.03, "south": lat - 0.03,
+                        "east":  lng + 0.03, "west":  lng - 0.03, "lat": lat, "lng": lng}
+
+    store = enrichment_store()
+    if store:
+        store.put_many("geocode", geo)
+        store.put_many("zillow", sig)
+    index = listing_index()
+    if index is not None:
+        index.add_zillow_results(listings)
+    return pd.DataFrame({
+        "Address":    kept["address"].to_numpy(),
+        "Zip":        kept["zipcode"].to_numpy(),
+        "Bedrooms":   kept["beds"].fillna(0).to_numpy(),
+        "Sqft":       kept["sqft"].fillna(0).to_numpy(),
+        "List Price": kept["price"].fillna(0).to_numpy(),
+    })
+
+
+# ─────────────────────────────────────────────
+# MARKET SCREENER
+# Every SAFMR zip × 0–4BR through the DSCR solve in one array pass,
+# joined to ACS median home value. No uploads, no per-address network calls.
+# ─────────────────────────────────────────────
+@st.cache_data(show_spinner=False, max_entries=32)
+def screen_market(
+    tax_r: float, ins_r: float, vac_r: float, maint_r: float, mgmt_r: float,
+    capex_r: float, utility_allowance: float, interest: float, term_yrs: int,
+    down_pct: float, target_cf: float, use_110: bool,
+) -> pd.DataFrame:
+    """
+    Returns one row per viable zip × bedroom count with the DSCR max price and
+    its headroom over the zip's ACS median home value. Cached per parameter set.
+    """
+    safmr = load_safmr()
+    if safmr.empty:
+        return pd.DataFrame()
+    safmr = safmr.drop_duplicates("zip")
+    prefix = "ps110" if use_110 and "ps110_0br" in safmr.columns else "fmr"
+    rent_cols = [f"{prefix}_{b}br" for b in range(5)]
+    rents = safmr[rent_cols].apply(pd.to_numeric, errors="coerce").fillna(0).to_numpy()   # (n_zip, 5)
+
+    max_price = solve_dscr_max_price(
+        rents, tax_r, ins_r, vac_r, maint_r, mgmt_r, capex_r,
+        utility_allowance, interest, term_yrs, down_pct, target_cf,
+    )
+
+    census = load_census_zcta_table()
+    zips   = safmr["zip"].to_numpy()
+    if census.empty:
+        median_val = np.zeros(len(zips))
+    else:
+        median_val = census["median_home_value"].reindex(zips).fillna(0).to_numpy(dtype=float)
+
+    area_col = next((c for c in safmr.columns if "AREA NAME" in c.upper()), None)
+    n_zip, n_beds = rents.shape
+    out = pd.DataFrame({
+        "Zip":                   np.repeat(zips, n_beds),
+        "Metro Area":            np.repeat(safmr[area_col].to_numpy(), n_beds) if area_col else "",
+        "Beds":                  np.tile(np.arange(n_beds), n_zip),
+        "Section 8 Rent ($/mo)": rents.ravel(),
+        "DSCR Max Price":        max_price.ravel(),
+        "Zip Median Home Value": np.repeat(median_val, n_beds),
+    })
+    out = out[out["DSCR Max Price"].notna()]
+    med = out["Zip Median Home Value"].to_numpy()
+    has_med = med > 0
+    out["Headroom vs Median ($)"] = np.where(has_med, out["DSCR Max Price"] - med, np.nan)
+    out["Headroom vs Median (%)"] = np.where(
+        has_med, (out["DSCR Max Price"].to_numpy() / np.where(has_med, med, 1) - 1) * 100, np.nan
+    )
+    out["Rent-to-Median (%)"] = np.where(
+        has_med, out["Section 8 Rent ($/mo)"].to_numpy() / np.where(has_med, med, 1) * 100, np.nan
+    )
+    out["DSCR Max Price"] = out["DSCR Max Price"].round(0)
+    return out.sort_values("Headroom vs Median (%)", ascending=False, na_position="last").reset_index(drop=True)
+
+
+if app_mode == "Market Screener":
+    st.markdown('<div class="section-label">Market Screener</div>', unsafe_allow_html=True)
     st.caption(
-        "**Required:** `Address` (or `Street` + `City` + `State`) · `Zip` · `Bedrooms` · `List Price`  |  "
-        "**Optional:** `Sqft` · `Agent Name` · `Agent Email` · `Description`"
+        "DSCR max buyer price for every HUD SAFMR zip × 0–4 BR at your sidebar assumptions, "
+        "ranked by how far it sits above the zip's Census median home value."
     )
+    with st.spinner("Solving every SAFMR zip × bedroom count…"):
+        screen = screen_market(
+            tax_rate, insurance_rate, vacancy_rate, maintenance_rate, mgmt_rate,
+            capex_rate, utility_allowance, interest_rate, loan_term_years,
+            down_pct, target_cashflow, use_110,
+        )
+    if screen.empty:
+        st.warning("⚠️ HUD SAFMR data unavailable — screener needs the SAFMR table.")
+        st.stop()
+
+    sc1, sc2, sc3 = st.columns(3)
+    beds_pick = sc1.multiselect("Bedrooms", [0, 1, 2, 3, 4], default=[2, 3, 4])
+    area_q    = sc2.text_input("Metro area contains", "")
+    min_med   = sc3.number_input("Min zip median value ($)", value=50000, step=10000, min_value=0,
+                                 help="Drops zips with tiny or missing ACS home values that distort the ranking.")
+    view = screen[screen["Beds"].isin(beds_pick) & (screen["Zip Median Home Value"] >= min_med)]
+    if area_q.strip():
+        view = view[view["Metro Area"].astype(str).str.contains(area_q.strip(), case=False, regex=False)]
 
-with col_info:
-    st.info(
-        "**How it works**\n"
-        "1. Pulls HUD FY2026 **Small Area FMR** — real zip-level rents\n"
-        "2. Gets listing description via **Rentcast API** or your CSV column\n"
-        "3. DSCR math → max buyer price (≤ list − $10k) → your net offer\n"
-        "4. Flags distressed listings & inspection-needed deals\n"
-        "5. Export all deals or good-only filtered CSV"
+    st.metric("Viable zip × bed combos", f"{len(view):,}", help=f"{len(screen):,} before filters")
+    st.dataframe(
+        view.head(5000),
+        width="stretch",
+        height=540,
+        hide_index=True,
+        column_config={
+            "Section 8 Rent ($/mo)":  st.column_config.NumberColumn(format="$%,d"),
+            "DSCR Max Price":         st.column_config.NumberColumn(format="$%,d"),
+            "Zip Median Home Value":  st.column_config.NumberColumn(format="$%,d"),
+            "Headroom vs Median ($)": st.column_config.NumberColumn(format="$%,d"),
+            "Headroom vs Median (%)": st.column_config.NumberColumn(format="%.1f%%"),
+            "Rent-to-Median (%)":     st.column_config.NumberColumn(format="%.2f%%"),
+        },
     )
-    st.info(
-        "**Property Condition Detection — 4 layers:**\n\n"
-        "1. ✅ **Free auto:** Zillow listing signals (agent insight, days on market, "
-        "price reductions) via Zillow's public search API — no key needed\n\n"
-        "2. ✅ **Free always:** Census ACS median home value + vacancy rate by ZIP "
-        "— flags properties priced far below zip median as likely distressed\n\n"
-        "3. ✅ **Free if you export from MLS/PropStream:** Add a `Description` column "
-        "to your CSV — app reads it directly for keyword analysis\n\n"
-        "4. 🔑 **Rentcast API** (optional, 50 free calls/mo) — auto-fetches listing "
-        "description by address without needing a CSV column",
-        icon="ℹ️"
+    st.download_button("Download Screener Results", view.to_csv(index=False).encode("utf-8"),
+                       "section8_market_screener.csv", "text/csv")
+    st.stop()
+
+
+# ─────────────────────────────────────────────
+# MAIN UI
+# ─────────────────────────────────────────────
+st.markdown("---")
+uploaded, watch_on, watch_name = None, False, ""
+if app_mode == "Area Sweep":
+    st.markdown('<div class="section-label">Area Sweep</div>', unsafe_allow_html=True)
+    st.caption(
+        f"Tiles the area into ~{SWEEP_TILE_DEG * 111:.0f} km Zillow search boxes, pages through every "
+        "for-sale result (quartering boxes too dense for Zillow to page through) and runs the full SAFMR + DSCR pipeline on all of them. Swept listings also feed "
+        "the rent and ARV comp index."
     )
+    sw1, sw2 = st.columns([1, 3])
+    sweep_by = sw1.radio("Search by", ["City", "ZIP list", "Bounding box"])
+    with sw2:
+        if sweep_by == "City":
+            sweep_q = st.text_input("City", placeholder="Indianapolis, IN")
+        elif sweep_by == "ZIP list":
+            sweep_q = st.text_input("ZIP codes", placeholder="46205, 46218, 46222",
+                                    help="Comma or space separated. Listings outside these ZIPs are dropped.")
+        else:
+            bb1, bb2, bb3, bb4 = st.columns(4)
+            bb_north = bb1.number_input("North", value=39.80, format="%.4f")
+            bb_south = bb2.number_input("South", value=39.74, format="%.4f")
+            bb_east  = bb3.number_input("East",  value=-86.10, format="%.4f")
+            bb_west  = bb4.number_input("West",  value=-86.18, format="%.4f")
+        max_tiles = st.number_input("Max search tiles", value=60, min_value=1, max_value=SWEEP_MAX_TILES,
+                                    help="One Zillow request per tile. Large cities are truncated to this many.")
+
+    if st.button("Run sweep", type="primary"):
+        tiles, sweep_zips, bad = [], None, []
+        if sweep_by == "City" and sweep_q.strip():
+            bbox = geocode_area(sweep_q)
+            if bbox:
+                tiles = sweep_tiles(bbox)
+            else:
+                bad.append(sweep_q.strip())
+            sweep_label = f"sweep · {sweep_q.strip()}"
+        elif sweep_by == "ZIP list":
+            sweep_zips = set(re.findall(r"\b\d{5}\b", sweep_q))
+            for z in sorted(sweep_zips):
+                bbox = geocode_area(z)
+                if bbox:
+                    tiles += sweep_tiles(bbox)
+                else:
+                    bad.append(z)
+            sweep_label = f"sweep · {len(sweep_zips)} ZIPs"
+        elif sweep_by == "Bounding box":
+            if bb_north > bb_south and bb_east > bb_west:
+                tiles = sweep_tiles({"north": bb_north, "south": bb_south, "east": bb_east, "west": bb_west})
+            sweep_label = f"sweep · bbox {bb_south:.3f},{bb_west:.3f} → {bb_north:.3f},{bb_east:.3f}"
+        if bad:
+            st.warning(f"⚠️ Could not locate: {', '.join(bad)}")
+        if len(tiles) > max_tiles:
+            st.warning(f"⚠️ Area needs {len(tiles)} search tiles — only the first {max_tiles} were searched.")
+            tiles = tiles[:max_tiles]
+        if tiles:
+            sweep_prog = st.progress(0.0)
+            listings = sweep_listings(
+                tiles, on_progress=lambda i, n: sweep_prog.progress(i / n, text=f"Searching tile {i + 1} of {n}…")
+            )
+            sweep_prog.empty()
+            if listings.attrs.get("truncated_tiles"):
+                st.warning(f"⚠️ {listings.attrs['truncated_tiles']} search boxes still had more results than "
+                           f"Zillow returns after splitting — some listings there were not pulled.")
+            frame = listings_to_frame(listings, sweep_zips)
+            if frame.empty:
+                st.warning("No for-sale listings found in that area.")
+            else:
+                st.session_state["sweep_raw"]   = frame
+                st.session_state["sweep_label"] = f"{sweep_label} · {len(frame)} listings"
+        elif not bad:
+            st.warning("Enter a city, at least one ZIP, or a valid bounding box.")
+else:
+    col_up, col_info = st.columns([2, 1])
 
-# Sample CSV — shows split address format with agent info and sqft
-sample = pd.DataFrame({
-    "Street":      ["3820 Guilford Ave", "456 Oak Ave"],
-    "City":        ["Indianapolis", "Indianapolis"],
-    "State":       ["IN", "IN"],
-    "Zip":         [46205, 46218],
-    "Bedrooms":    [3, 4],
-    "Sqft":        [1250, 1600],
-    "List Price":  [95000, 120000],
-    "Agent Name":  ["Jane Smith", "Bob Johnson"],
-    "Agent Email": ["jane@realty.com", "bob@realty.com"],
-    "Agent Phone": ["317-555-0101", "317-555-0202"],
-    "Description": ["", ""],
-})
-st.download_button("⬇️ Download Sample CSV", sample.to_csv(index=False).encode(),
-                   "sample_properties.csv", "text/csv")
-
-# ── Load SAFMR once ──
-with st.spinner("Loading HUD SAFMR rent data (one-time, cached 7 days)…"):
-    safmr_df = load_safmr()
+    with col_up:
+        uploaded = st.file_uploader("Upload Property CSV / Excel", type=["csv", "xlsx"])
+        st.caption(
+            "**Required:** `Address` (or `Street` + `City` + `State`) · `Zip` · `Bedrooms` · `List Price`  |  "
+            "**Optional:** `Sqft` · `Agent Name` · `Agent Email` · `Description`"
+        )
+        watch_on = st.checkbox(
+            "Watchlist mode",
+            help="Remember this list. On the next upload only new or changed rows (address, price, "
+                 "beds, sqft, description) are re-enriched, and you get a diff against the last upload.",
+        )
+        if watch_on:
+            watch_name = st.text_input(
+                "Watchlist name", value=os.path.splitext(uploaded.name)[0] if uploaded else "",
+            )
 
-if not safmr_df.empty:
-    st.success(f"✅ HUD SAFMR loaded — {len(safmr_df):,} zip codes with zip-level Section 8 rents")
+    with col_info:
+        st.info(
+            "**How it works**\n"
+            "1. Pulls HUD FY2026 **Small Area FMR** — real zip-level rents\n"
+            "2. Gets listing description via **Rentcast API** or your CSV column\n"
+            "3. DSCR math → max buyer price (≤ list − $10k) → your net offer\n"
+            "4. Flags distressed listings & inspection-needed deals\n"
+            "5. Export all deals or good-only filtered CSV"
+        )
+        st.info(
+            "**Property Condition Detection — 4 layers:**\n\n"
+            "1. ✅ **Free auto:** Zillow listing signals (agent insight, days on market, "
+            "price reductions) via Zillow's public search API — no key needed\n\n"
+            "2. ✅ **Free always:** Census ACS median home value + vacancy rate by ZIP "
+            "— flags properties priced far below zip median as likely distressed\n\n"
+            "3. ✅ **Free if you export from MLS/PropStream:** Add a `Description` column "
+            "to your CSV — app reads it directly for keyword analysis\n\n"
+            "4. 🔑 **Rentcast API** (optional, 50 free calls/mo) — auto-fetches listing "
+            "description by address without needing a CSV column",
+            icon="ℹ️"
+        )
+
+    # Sample CSV — shows split address format with agent info and sqft
+    sample = pd.DataFrame({
+        "Street":      ["3820 Guilford Ave", "456 Oak Ave"],
+        "City":        ["Indianapolis", "Indianapolis"],
+        "State":       ["IN", "IN"],
+        "Zip":         [46205, 46218],
+        "Bedrooms":    [3, 4],
+        "Sqft":        [1250, 1600],
+        "List Price":  [95000, 120000],
+        "Agent Name":  ["Jane Smith", "Bob Johnson"],
+        "Agent Email": ["jane@realty.com", "bob@realty.com"],
+        "Agent Phone": ["317-555-0101", "317-555-0202"],
+        "Description": ["", ""],
+    })
+    st.download_button("⬇️ Download Sample CSV", sample.to_csv(index=False).encode(),
+                       "sample_properties.csv", "text/csv")
+
+# ── HUD reference data — loaded by the background preload, never blocks render ──
+if reference_preload().done():
+    safmr_df = load_safmr()
+    county_fmr_index = load_county_fmr_index()
+    if not safmr_df.empty:
+        st.success(f"✅ HUD SAFMR loaded — {len(safmr_df):,} zip codes with zip-level Section 8 rents")
+    else:
+        st.warning("⚠️ Could not load HUD SAFMR. Using national estimates.")
+    if county_fmr_index.empty:
+        st.caption("County FMR fallback unavailable — zips outside SAFMR areas use national estimates.")
+    with st.expander("Memory & caches"):
+        mem_tables, mem = memory_report()
+        st.dataframe(mem_tables, width="stretch", hide_index=True)
+        st.caption(f"Shared MB are memory-mapped pages, held once for every session and worker on this node. "
+                   f"This session: {mem['session_mb']:,.1f} MB · process peak RSS: {mem['process_peak_mb']:,.0f} MB")
+        export_fetch_cache_metrics()
+        cache_table = read_fetch_cache_metrics()
+        if not cache_table.empty:
+            st.dataframe(cache_table, width="stretch", hide_index=True,
+                         column_config={"Hit Rate": st.column_config.NumberColumn(format="%.1f%%")})
+            st.caption(f"Fetch caches per process (job workers report after each job) · "
+                       f"exported as JSON under {METRICS_DIR}")
 else:
-    st.warning("⚠️ Could not load HUD SAFMR. Using national estimates.")
+    st.caption("⏳ Loading HUD SAFMR + Census reference data in the background (cached 7 days) — "
+               "upload whenever you're ready.")
+
+# ── Background jobs (every session on this server) ──
+recent_jobs = list_jobs()
+if recent_jobs:
+    n_active = sum(j.get("status") in ("queued", "running") for j in recent_jobs)
+    with st.expander(f"Background jobs — {n_active} active, {len(recent_jobs)} recent"):
+        for j in recent_jobs:
+            jc1, jc2 = st.columns([5, 1])
+            jc1.caption(
+                f"`{j['job_id']}` · {j.get('label', '')} · **{j.get('status')}** · "
+                f"{j.get('done', 0)}/{j.get('total', 0)} rows · "
+                f"submitted {time.strftime('%b %d %H:%M', time.localtime(j.get('submitted_at', 0)))}"
+            )
+            if j.get("status") == "done" and jc2.button("Open", key=f"open_{j['job_id']}"):
+                st.session_state["active_job"] = j["job_id"]
+                st.session_state["open_run"]   = None
+
+# ── Saved runs — reopen instantly, or re-underwrite offline under today's sidebar ──
+saved_runs = list_runs()
+if saved_runs:
+    with st.expander(f"Saved runs — {len(saved_runs)} most recent"):
+        for m in saved_runs:
+            rc1, rc2, rc3 = st.columns([5, 1, 1])
+            rc1.caption(
+                f"`{m['run_id']}` · {m.get('label', '')} · {m.get('rows', 0)} rows · "
+                f"🟢 {m.get('quality', {}).get('Green Light', 0)} · "
+                f"saved {time.strftime('%b %d %H:%M', time.localtime(m.get('created_at', 0)))} · "
+                f"{m.get('vintages', {}).get('safmr', '')}"
+            )
+            if rc2.button("Open", key=f"run_open_{m['run_id']}"):
+                st.session_state["open_run"]   = m["run_id"]
+                st.session_state["active_job"] = None
+            if rc3.button("Re-run offline", key=f"run_redo_{m['run_id']}",
+                          help="Re-underwrite these properties under the current sidebar settings "
+                               "using only the run's archived data — no network requests."):
+                run = load_run(m["run_id"])
+                if run:
+                    _, run_raw, _, run_blobs = run
+                    st.session_state["open_run"]   = None
+                    st.session_state["active_job"] = job_queue().submit(
+                        run_raw, {**run_params, "offline": True},
+                        label=f"{m.get('label', '')} · offline re-run",
+                        snapshot=run_blobs.get("snapshot"),
+                    )
 
-# ── Process uploaded file ──
+# ── Process uploaded file (or the last area sweep) ──
+raw = None
 if uploaded:
     raw = pd.read_csv(uploaded) if uploaded.name.endswith(".csv") else pd.read_excel(uploaded)
     raw.columns = [c.strip() for c in raw.columns]
@@ -1059,7 +5285,13 @@ if uploaded:
     if missing_req:
         st.error(f"Missing columns: {', '.join(missing_req)}")
         st.stop()
+    raw_label, raw_bytes = uploaded.name, uploaded.getvalue()
+elif app_mode == "Area Sweep" and st.session_state.get("sweep_raw") is not None:
+    raw = st.session_state["sweep_raw"].copy()
+    raw_label = st.session_state["sweep_label"]
+    raw_bytes = raw.to_csv(index=False).encode()
 
+if raw is not None:
     for col in ["List Price","Bedrooms","Zip"]:
         raw[col] = raw[col].astype(str).str.replace(r"[$,]","",regex=True)
         raw[col] = pd.to_numeric(raw[col], errors="coerce").fillna(0)
@@ -1081,307 +5313,109 @@ if uploaded:
 
     st.success(f"Loaded **{len(raw)}** properties. Running analysis…")
 
-    # ── Enrichment loop ──
-    progress = st.progress(0, text="Starting…")
-    rows_out = []
-
-    for i, row in raw.iterrows():
-        n_done = i + 1
-        addr = str(row.get("Address", "")).strip()
-        progress.progress(int(n_done / len(raw) * 100),
-                          text=f"({n_done}/{len(raw)}) {addr[:55]}…")
-
-        zip_str = str(int(row["Zip"])).zfill(5)
-        beds    = int(row["Bedrooms"]) if row["Bedrooms"] > 0 else 3
-
-        # Pass-through fields (agent info, sqft from CSV or Zillow)
-        agent_name  = str(row.get("Agent Name",  "")).strip() if "Agent Name"  in raw.columns else ""
-        agent_email = str(row.get("Agent Email", "")).strip() if "Agent Email" in raw.columns else ""
-        agent_phone = str(row.get("Agent Phone", "")).strip() if "Agent Phone" in raw.columns else ""
-        csv_sqft    = float(row["Sqft"]) if "Sqft" in raw.columns and row["Sqft"] > 0 else 0
-
-        # 1. Section 8 rent — HUD SAFMR (primary)
-        s8_rent_safmr, rent_src_base = get_section8_rent(zip_str, beds, safmr_df)
-
-        # 1a. Sqft adjustment to Section 8 rent
-        sqft_note = ""
-        s8_rent   = s8_rent_safmr
-        rent_src  = rent_src_base
-        if csv_sqft > 0:
-            hud_sqft_standard = {0: 600, 1: 750, 2: 900, 3: 1100, 4: 1300}
-            standard  = hud_sqft_standard.get(min(beds, 4), 900)
-            sqft_ratio = csv_sqft / standard if standard > 0 else 1.0
-            if sqft_ratio < 0.70:
-                adj_pct  = -0.08
-                sqft_note = f"Sqft {csv_sqft:.0f} is {(1-sqft_ratio)*100:.0f}% below HUD standard ({standard} sqft) — rent adjusted -8%"
-            elif sqft_ratio < 0.85:
-                adj_pct  = -0.04
-                sqft_note = f"Sqft {csv_sqft:.0f} slightly below HUD standard ({standard} sqft) — rent adjusted -4%"
-            elif sqft_ratio > 1.40:
-                adj_pct  = 0.07
-                sqft_note = f"Sqft {csv_sqft:.0f} well above HUD standard ({standard} sqft) — rent adjusted +7%"
-            elif sqft_ratio > 1.20:
-                adj_pct  = 0.04
-                sqft_note = f"Sqft {csv_sqft:.0f} above HUD standard ({standard} sqft) — rent adjusted +4%"
-            else:
-                adj_pct  = 0.0
-            if adj_pct != 0.0:
-                s8_rent  = round(s8_rent_safmr * (1 + adj_pct))
-                rent_src = rent_src_base + f" (sqft adj {adj_pct:+.0%})"
-
-        # 1b. Zillow listing signals (free — no API key, no bot detection)
-        zillow_signals = fetch_zillow_listing_signals(addr)
-        zil_condition, zil_signal_strs = analyze_zillow_signals(zillow_signals)
-        sqft = csv_sqft if csv_sqft > 0 else (zillow_signals.get("sqft") or 0)
-
-        # 1c. Census rent by bedrooms + Rentcast AVM — validate SAFMR
-        census_data   = get_census_zip_data(zip_str)
-        census_rent   = (census_data.get("median_rent_by_beds") or {}).get(min(beds, 4), 0)
-        rentcast_rent = fetch_rentcast_rent_avm(addr, beds, int(sqft), rentcast_key)
-
-        # 1d. Rent consensus — cross-reference all sources, flag reasonableness risk
-        s8_rent_final, rent_confidence, rent_note = get_rent_consensus(
-            safmr_rent=s8_rent,
-            census_rent=census_rent,
-            rentcast_rent=rentcast_rent,
-            beds=beds,
-            zip_str=zip_str,
-        )
-        s8_rent = s8_rent_final  # use the validated rent for all calculations
+    # ── Submit to the background job queue ──
+    # Keyed on file (or sweep) contents + parameters: reruns from unrelated widgets reuse
+    # the running job instead of starting over, and a parameter change
+    # cancels this session's stale job before submitting a new one.
+    job_params = {**run_params, "watchlist": watch_name.strip()} if watch_on and watch_name.strip() else run_params
+    job_key = hashlib.sha1(raw_bytes + repr(sorted(job_params.items())).encode()).hexdigest()
+    if st.session_state.get("job_key") != job_key:
+        stale = st.session_state.get("active_job")
+        if stale:
+            cancel_job(stale)
+        st.session_state["job_key"]    = job_key
+        st.session_state["open_run"]   = None
+        st.session_state["active_job"] = job_queue().submit(raw, job_params, label=raw_label)
+
+# ── Poll the active job; results render once it finishes ──
+results = None
+active_job = st.session_state.get("active_job")
+open_run   = st.session_state.get("open_run")
+if active_job:
+    job = read_job_status(active_job)
+    if job.get("status") in ("queued", "running"):
+        render_job_progress(active_job)
+        st.stop()
+    if job.get("status") == "done":
+        results = load_job_result(active_job)
+    elif job.get("status") == "failed":
+        st.error(f"Analysis failed: {job.get('error', 'unknown error')}")
+    elif job.get("status") == "cancelled":
+        st.info("Analysis cancelled.")
+elif open_run:
+    run = load_run(open_run)
+    if run:
+        results, _, run_meta, _ = run
+        job, active_job = {**run_meta["job"], "params": run_meta["params"]}, open_run
+    else:
+        st.warning(f"Saved run {open_run} is no longer available.")
 
-        # 2. Description — CSV first, then Rentcast API
-        has_csv_desc = (
-            "Description" in raw.columns
-            and pd.notnull(row.get("Description"))
-            and len(str(row.get("Description","")).strip()) > 10
+if results is not None:
+    st.markdown('<div class="section-label">Analysis Complete</div>', unsafe_allow_html=True)
+    # The parameters these results were underwritten with — exports and
+    # portfolio passes use them, not whatever the sidebar says now.
+    result_params = {**run_params, **(job.get("params") or {})}
+    st.caption(
+        f"Job {active_job} · {job.get('label', '')} · {len(results)} properties · "
+        f"{job.get('finished_at', 0) - job.get('started_at', 0):.0f}s"
+        + (f" · ♻️ {job['cache_hits']:,} enrichment responses reused from the persistent cache"
+           if job.get("cache_hits") else "")
+        + (f" · 👁 {job['watchlist_reused']:,} unchanged watchlist rows reused"
+           if job.get("watchlist_reused") else "")
+        + (f" · 🧩 merged from {job['shards']} ZIP shards" if (job.get("shards") or 1) > 1 else "")
+        + (f" · 🔑 Rentcast bulk: {job['rentcast_bulk']['matched']:,} listings matched from "
+           f"{job['rentcast_bulk']['zips']:,} ZIPs in {job['rentcast_bulk']['calls']:,} API calls"
+           if job.get("rentcast_bulk") else "")
+    )
+    if job.get("partial_rows"):
+        st.info(
+            f"ℹ️ {job['partial_rows']} of {len(results)} properties were underwritten with partial data "
+            + ("(offline re-run — only the saved run's archived data was used)" if job.get("offline")
+               else "(batch SLA reached — later rows used SAFMR + cached data only)" if job.get("sla_exceeded")
+               else "(a source missed the per-property deadline)")
+            + ". See the `Missing Sources` column."
         )
-        if has_csv_desc:
-            description = str(row["Description"]).strip()
-            desc_src    = "CSV"
+    diff_records = results.attrs.get("watchlist_diff")
+    if diff_records is not None:
+        st.markdown('<div class="section-label">Watchlist Changes</div>', unsafe_allow_html=True)
+        wdiff = pd.DataFrame(diff_records)
+        if wdiff.empty:
+            st.caption("No quality changes since the last upload of this watchlist.")
         else:
-            description, desc_src = get_listing_description(addr, rentcast_key)
-            time.sleep(0.3)
-
-        # 3. Condition analysis
-        condition, kw_hits = analyze_condition(description)
-
-        list_price = float(row["List Price"])
-
-        # 4. Estimated repairs (needed before DSCR calc for CoC)
-        repair_low, repair_high, repair_tier = estimate_repairs(condition, sqft, list_price)
-        repair_mid_val = (repair_low + repair_high) / 2
-        repair_range_str = f"${repair_low:,.0f} – ${repair_high:,.0f}" if (repair_low or repair_high) else "Unknown"
-
-        # 5. DSCR offer — uses all expense inputs including CapEx and utility allowance
-        calc = calculate_dscr_offer(
-            s8_rent=s8_rent,
-            tax_r=tax_rate, ins_r=insurance_rate,
-            vac_r=vacancy_rate, maint_r=maintenance_rate, mgmt_r=mgmt_rate,
-            capex_r=capex_rate, utility_allowance=utility_allowance,
-            interest=interest_rate, term_yrs=loan_term_years,
-            down_pct=down_pct, target_cf=target_cashflow,
-            closing_pct=closing_costs_pct, fee=wholesale_fee,
-            list_price=list_price,
-            repair_mid=repair_mid_val,
-        )
-
-        # 6. Enforce minimum $10k below list for buyer price
-        if calc.get("viable"):
-            buyer_price = calc["max_buyer_price"]
-            if buyer_price > list_price - 10000:
-                calc["max_buyer_price"] = list_price - 10000
-                your_offer_gross = calc["max_buyer_price"] - wholesale_fee
-                calc["your_offer"]    = round(your_offer_gross / (1 + closing_costs_pct), 2)
-                calc["closing_costs"] = round(calc["your_offer"] * closing_costs_pct, 2)
-                calc["down_payment"]  = round(calc["max_buyer_price"] * down_pct, 2)
-                calc["loan_amount"]   = round(calc["max_buyer_price"] * (1 - down_pct), 2)
-                if calc["your_offer"] <= 0:
-                    calc["viable"] = False
-
-        # 7. Census price anomaly detection
-        price_signals = get_price_anomaly_signals(list_price, beds, zip_str)
-
-        # Merge condition from all sources (description > Zillow signals > Census price anomaly)
-        if condition == "Unknown":
-            # Try Zillow listing signals first (most specific)
-            if zil_condition in ("Critical", "Needs Work"):
-                condition = zil_condition
-            elif price_signals:
-                # Fall back to Census price anomaly detection
-                if any("severely" in s or "major rehab" in s for s in price_signals):
-                    condition = "Likely Distressed"
-                else:
-                    condition = "Possibly Distressed"
-            elif zil_condition:
-                condition = zil_condition
-
-        # 8. Build flags
-        flags = []
-        if condition == "Critical":
-            flags.append("CRITICAL DISTRESS — inspect before offering")
-        elif condition in ("Needs Work", "Likely Distressed"):
-            reason = f"keywords: {', '.join(kw_hits[:3])}" if kw_hits else "price severely below zip median"
-            flags.append(f"Rehab likely — {reason}")
-        elif condition == "Possibly Distressed":
-            flags.append("Price anomaly — well below zip median, verify condition")
-
-        for sig in price_signals:
-            if sig not in " | ".join(flags):
-                flags.append(sig)
-        for sig in zil_signal_strs:
-            if sig not in " | ".join(flags):
-                flags.append(sig)
-
-        if calc.get("viable"):
-            headroom = calc.get("dscr_headroom", 0)
-            if headroom >= list_price * (inspect_threshold / 100):
-                flags.append(
-                    f"INSPECT — DSCR supports ${calc['dscr_max_price']:,.0f} "
-                    f"(${headroom:,.0f} above list) — likely needs heavy rehab, verify condition"
-                )
-            # DSCR lender ratio warning
-            if calc.get("dscr_ratio", 0) > 0 and calc["dscr_ratio"] < 1.15:
-                flags.append(
-                    f"DSCR {calc['dscr_ratio']:.2f}x — below lender minimum 1.15x for Section 8 loans"
-                )
-            # Rent-to-Value flag
-            rtv = calc.get("rtv_pct", 0)
-            if rtv > 0 and rtv < 0.7:
-                flags.append(
-                    f"Low rent-to-value {rtv:.2f}% — Section 8 investors target ≥ 0.8%"
-                )
-
-        # Rent confidence flag
-        if rent_confidence == "Low":
-            flags.append(rent_note)
-        elif rent_confidence == "Medium" and "risk" in rent_note.lower():
-            flags.append(rent_note)
-
-        # HQS fail risk flag
-        if condition in ("Critical", "Needs Work", "Likely Distressed"):
-            flags.append(
-                f"High HQS inspection risk — Section 8 inspections fail 20–40% of the time "
-                f"for properties in '{condition}' condition. Budget for re-inspection and remediation."
+            change_types = ["New listing — Green Light", "Now Green Light", "Price cut under DSCR max",
+                            "Dropped to No Deal", "Removed from list"]
+            counts = wdiff["Change"].value_counts()
+            for wc, name in zip(st.columns(len(change_types)), change_types):
+                wc.metric(name, int(counts.get(name, 0)))
+            st.dataframe(
+                wdiff, width="stretch", hide_index=True,
+                column_config={
+                    "Previous List Price": st.column_config.NumberColumn(format="$%,d"),
+                    "List Price":          st.column_config.NumberColumn(format="$%,d"),
+                    "DSCR Max (uncapped)": st.column_config.NumberColumn(format="$%,d"),
+                },
             )
-
-        flag_str = " | ".join(flags)
-
-        # Deal quality — RTV < 0.6% forces No Deal
-        rtv = calc.get("rtv_pct", 0)
-        if not calc.get("viable") or rtv > 0 and rtv < 0.6:
-            quality = "No Deal"
-        elif condition in ("Critical", "Likely Distressed") or "CRITICAL" in flag_str:
-            quality = "Inspect First"
-        elif flags:
-            quality = "Caution"
-        else:
-            quality = "Green Light"
-
-        # Sqft note for export
-        if not sqft_note and sqft > 0:
-            sqft_note = f"{sqft:.0f} sqft"
-
-        # 5-year rent projection (for export and expander)
-        proj_5yr = []
-        _r = s8_rent
-        for yr in range(1, 6):
-            _eff  = max(0, _r - utility_allowance)
-            _egi  = _eff * (1 - vacancy_rate)
-            _vexp = _eff * (maintenance_rate + mgmt_rate)
-            _capx = _r * capex_rate
-            _fixed = (calc.get("taxes_mo", 0) * (1.02 ** (yr - 1))
-                    + calc.get("insurance_mo", 0) * (1.02 ** (yr - 1))
-                    + calc.get("mortgage_pmt", 0))
-            _cf   = _egi - _vexp - _capx - _fixed
-            proj_5yr.append({"year": yr, "rent": round(_r), "cf": round(_cf)})
-            _r = round(_r * (1 + rent_growth_rate))
-
-        rows_out.append({
-            # ── Identifiers ──
-            "Quality":               quality,
-            "Address":               addr,
-            "Zip":                   zip_str,
-            "Beds":                  beds,
-            "Sqft":                  int(sqft) if sqft else "",
-            "Agent Name":            agent_name,
-            "Agent Email":           agent_email,
-            "Agent Phone":           agent_phone,
-
-            # ── Section 8 Rent ──
-            "Section 8 Rent ($/mo)": s8_rent,
-            "Rent Confidence":       rent_confidence,
-            "Rent Note":             rent_note,
-            "SAFMR Rent":            s8_rent_safmr,
-            "Census Rent":           census_rent if census_rent > 0 else "",
-            "Rentcast AVM Rent":     rentcast_rent if rentcast_rent > 0 else "",
-            "Rent Source":           rent_src,
-            "Sqft Rent Note":        sqft_note,
-            "Utility Allowance":     utility_allowance,
-            "Effective Rent":        calc.get("eff_rent", s8_rent - utility_allowance),
-
-            # ── Wholesale Offer Stack ──
-            "List Price":            list_price,
-            "Your Max Offer":        calc.get("your_offer", 0),
-            "Buyer Max Purchase":    calc.get("max_buyer_price", 0),
-            "DSCR Max (uncapped)":   calc.get("dscr_max_price", 0),
-            "Your Wholesale Fee":    calc.get("wholesale_fee", 0),
-            "Buyer Closing Costs":   calc.get("closing_costs", 0),
-            "Buyer Down Payment":    calc.get("down_payment", 0),
-            "Buyer Loan Amount":     calc.get("loan_amount", 0),
-
-            # ── Investor Metrics ──
-            "DSCR Ratio":            calc.get("dscr_ratio", 0),
-            "Rent-to-Value (%)":     calc.get("rtv_pct", 0),
-            "GRM":                   calc.get("grm", 0),
-            "Cash-on-Cash (%)":      calc.get("coc_pct", 0),
-            "Total Cash to Close":   calc.get("total_cash_invested", 0),
-            "Annual Cash Flow":      calc.get("annual_cf", 0),
-            "Break-even Rent":       calc.get("break_even_rent", 0),
-
-            # ── Monthly Cash Flow ──
-            "Est Buyer CF ($/mo)":   calc.get("actual_cf", 0),
-            "Monthly Mortgage":      calc.get("mortgage_pmt", 0),
-            "Monthly Taxes":         calc.get("taxes_mo", 0),
-            "Monthly Insurance":     calc.get("insurance_mo", 0),
-            "Monthly CapEx":         calc.get("capex_mo", 0),
-            "Monthly Mgmt+Maint":    calc.get("var_expenses", 0),
-
-            # ── Repairs ──
-            "Est Repairs":           repair_range_str,
-            "Repair Low ($)":        repair_low,
-            "Repair High ($)":       repair_high,
-            "Repair Tier":           repair_tier,
-
-            # ── Market Context ──
-            "Zip Median Home Value": census_data.get("median_home_value", 0),
-            "Zip Vacancy Rate (%)":  census_data.get("vacancy_rate_pct", 0),
-            "Price vs Zip Median":   f"{(list_price/census_data['median_home_value']*100):.0f}%" if census_data.get("median_home_value") else "N/A",
-
-            # ── Condition ──
-            "Condition":             condition,
-            "Distress Keywords":     ", ".join(kw_hits[:6]),
-            "Inspection Flags":      flag_str,
-
-            # ── Listing Data ──
-            "Listing Description":   (description[:400] if description else ""),
-            "Zillow Insight":        zillow_signals.get("flex_text", ""),
-            "Days on Market":        zillow_signals.get("days_on_market", ""),
-            "Price Reduction":       zillow_signals.get("price_reduction", ""),
-            "Tax Assessed Value":    zillow_signals.get("tax_assessed_value", ""),
-            "Desc Source":           desc_src,
-
-            # ── 5-Year Projection (JSON for display) ──
-            "_proj_5yr":             proj_5yr,
-        })
-
-    progress.progress(100, text="Analysis complete")
-    results = pd.DataFrame(rows_out)
+            st.download_button("Download Watchlist Changes", wdiff.to_csv(index=False).encode("utf-8"),
+                               "section8_watchlist_changes.csv", "text/csv")
+
+    health = job.get("source_health") or {}
+    tripped = {src: h for src, h in health.items() if h.get("trips")}
+    if tripped:
+        st.warning(
+            "⚠️ Circuit breaker tripped — "
+            + "; ".join(f"**{src}** ({h['failures']} failures, {h['skipped']} rows skipped)"
+                        for src, h in tripped.items())
+            + ". Affected rows were underwritten without that source."
+        )
+    if health:
+        with st.expander("Data source health"):
+            st.dataframe(pd.DataFrame(health).T, width="stretch")
 
     # ── Summary scorecards ──
     quality_order = {"Green Light": 0, "Caution": 1, "Inspect First": 2, "No Deal": 3}
     results_sorted = results.copy()
     results_sorted["_sort"] = results_sorted["Quality"].map(quality_order)
-    results_sorted = results_sorted.sort_values("_sort").drop(columns=["_sort","_proj_5yr"], errors="ignore")
+    results_sorted = results_sorted.sort_values("_sort").drop(columns=["_sort","_proj_5yr","_hold"], errors="ignore")
 
     green   = results[results["Quality"] == "Green Light"]
     caution = results[results["Quality"] == "Caution"]
@@ -1411,31 +5445,133 @@ if uploaded:
     ]
     display_cols = [c for c in display_cols if c in results_sorted.columns]
 
-    def color_row(row):
-        q = row.get("Quality", "")
-        if q == "Green Light":   return ["background-color:#0d3320; color:#34d073; font-weight:500"] * len(row)
-        if q == "Caution":       return ["background-color:#2d2000; color:#f5a623; font-weight:500"] * len(row)
-        if q == "Inspect First": return ["background-color:#2d0d0d; color:#ff6b6b; font-weight:500"] * len(row)
-        return                          ["background-color:#111111; color:#555555"] * len(row)
-
-    fmt = {
-        "List Price":             "${:,.0f}",
-        "Section 8 Rent ($/mo)":  "${:,.0f}",
-        "Your Max Offer":         "${:,.0f}",
-        "Buyer Max Purchase":     "${:,.0f}",
-        "Est Buyer CF ($/mo)":    "${:,.0f}",
-        "DSCR Ratio":             "{:.2f}x",
-        "Rent-to-Value (%)":      "{:.2f}%",
-        "Cash-on-Cash (%)":       "{:.1f}%",
-        "GRM":                    "{:.1f}",
-    }
-    st.dataframe(
-        results_sorted[display_cols].style
-            .apply(color_row, axis=1)
-            .format({k: v for k, v in fmt.items() if k in display_cols}),
-        use_container_width=True,
-        height=540,
+    # Flag filter is a bitwise AND on the integer codes
+    flag_pick = st.multiselect(
+        "Only show deals flagged", [f.name for f in Flag],
+        format_func=lambda n: n.replace("_", " ").title(),
     )
+    table = results_sorted
+    if flag_pick:
+        want = 0
+        for name in flag_pick:
+            want |= Flag[name]
+        table = results_sorted[(results_sorted["Flag Codes"].to_numpy() & want) != 0]
+
+    # Sorting happens here, on the full table, so paging shows the true top rows
+    sc1, sc2 = st.columns([3, 1])
+    sort_by    = sc1.selectbox("Sort by", display_cols)
+    descending = sc2.toggle("Descending", value=sort_by not in ("Quality", "Address"))
+    if sort_by == "Quality":
+        sort_key = lambda s: s.map(quality_order)
+    elif sort_by == "Address":
+        sort_key = None
+    else:
+        sort_key = lambda s: pd.to_numeric(s, errors="coerce")
+    table = table.sort_values(sort_by, ascending=not descending, key=sort_key, kind="stable", na_position="last")
+
+    def render_results(frame: pd.DataFrame, key: str) -> None:
+        """
+        Natively formatted table (no Styler). Past RESULTS_PAGE_ROWS only the
+        selected page is sliced out and sent, so size doesn't slow rendering.
+        """
+        pages = max(1, -(-len(frame) // RESULTS_PAGE_ROWS))
+        page = 1
+        if pages > 1:
+            page = st.number_input(f"Page (of {pages:,} · {RESULTS_PAGE_ROWS:,} rows each)",
+                                   min_value=1, max_value=pages, value=1, key=f"{key}_page")
+        window = frame.iloc[(page - 1) * RESULTS_PAGE_ROWS: page * RESULTS_PAGE_ROWS][display_cols].copy()
+        window["Quality"] = window["Quality"].map(QUALITY_BADGE).fillna(window["Quality"])
+        st.dataframe(window, width="stretch", height=540, hide_index=True,
+                     column_config=RESULT_COLUMN_CONFIG)
+
+    render_results(table, "results")
+
+    # ── Buyer profiles — every profile's tiers in one vectorized pass ──
+    try:
+        profiles = buyer_profiles()
+        tiers = apply_buyer_profiles(results_sorted, profiles) if profiles else None
+    except RuleError as e:
+        st.error(f"Buyer profiles ({BUYER_PROFILES_PATH}) — {e}")
+        tiers = None
+    if tiers is not None and not tiers.empty:
+        st.markdown('<div class="section-label">Buyer Profiles</div>', unsafe_allow_html=True)
+        tier_counts = (
+            tiers.apply(lambda c: c.value_counts()).T.fillna(0).astype(int)
+                 .reindex(columns=list(quality_order), fill_value=0)
+        )
+        tier_counts.index = [i.removeprefix("Tier: ") for i in tier_counts.index]
+        st.dataframe(tier_counts, width="stretch")
+        bp = st.selectbox(
+            "Green Light list for", list(profiles),
+            format_func=lambda n: f"{n} — {profiles[n]['description']}" if profiles[n]["description"] else n,
+        )
+        buyer_gl = results_sorted[tiers[f"Tier: {bp}"] == "Green Light"]
+        render_results(buyer_gl, "buyer_gl")
+        st.download_button(
+            f"Download {bp} Green Light ({len(buyer_gl)} deals)",
+            buyer_gl[[c for c in buyer_gl.columns if not c.startswith("_")]].to_csv(index=False).encode("utf-8"),
+            f"section8_{re.sub(r'[^a-z0-9]+', '_', bp.lower()).strip('_')}_green_light.csv", "text/csv",
+        )
+        results_sorted = pd.concat([results_sorted, tiers], axis=1)
+
+    # ── Loan products — every property against every product in one broadcast ──
+    try:
+        products = loan_products()
+        loans = evaluate_loan_products(results_sorted, products, result_params) if not products.empty else None
+    except LoanProductError as e:
+        st.error(f"Loan products ({LOAN_PRODUCTS_PATH}) — {e}")
+        loans = None
+    if loans is not None:
+        per_property, summary = loans
+        st.markdown('<div class="section-label">Loan Products</div>', unsafe_allow_html=True)
+        st.dataframe(summary, width="stretch", hide_index=True, column_config={
+            "Median Buyer Price": st.column_config.NumberColumn(format="$%,d"),
+            "Viable":             st.column_config.NumberColumn(help="Properties with a positive offer under this product"),
+            "Best For":           st.column_config.NumberColumn(help="Properties where this product supports the highest buyer price"),
+        })
+        best_cols = ["Address", "List Price", "Buyer Max Purchase", "Best Loan Product", "Best Product Buyer Price",
+                     "Best Product Cash to Close", "Viable Loan Products"]
+        with st.expander("Best product per property"):
+            st.dataframe(
+                pd.concat([results_sorted, per_property], axis=1)[best_cols],
+                width="stretch", hide_index=True, column_config={
+                    c: st.column_config.NumberColumn(format="$%,d") for c in best_cols[1:] if c.endswith(("Price", "Purchase", "Close"))
+                },
+            )
+        results_sorted = pd.concat([results_sorted, per_property], axis=1)
+
+    # ── Portfolio optimizer — best subset for the buyers' cash ──
+    st.markdown('<div class="section-label">Portfolio Optimizer</div>', unsafe_allow_html=True)
+    oc1, oc2, oc3, oc4, oc5 = st.columns(5)
+    opt_budget = oc1.number_input("Buyer cash available ($)", value=250000, step=25000, min_value=0,
+                                  help="Budget against the sum of Total Cash to Close of the picked deals")
+    opt_objective = oc2.selectbox("Maximize", list(OPTIMIZER_OBJECTIVES))
+    opt_per_zip = oc3.number_input("Max deals per ZIP", value=0, step=1, min_value=0, help="0 = no limit")
+    opt_dscr = oc4.number_input("Min DSCR", value=float(result_params["min_dscr_req"]), step=0.05,
+                               min_value=0.0, key="opt_dscr")
+    opt_coc = oc5.number_input("Min CoC (%)", value=float(result_params["min_coc_req"]), step=1.0, key="opt_coc")
+    shortlist = optimize_portfolio(results_sorted, opt_budget, opt_objective, opt_per_zip,
+                                   opt_dscr, opt_coc, result_params["wholesale_fee"])
+    om1, om2, om3, om4 = st.columns(4)
+    om1.metric("Deals Picked", f"{len(shortlist)} of {shortlist.attrs['candidates']}")
+    om2.metric("Cash Used", f"${shortlist.attrs['cash_used']:,.0f}")
+    om3.metric(f"Total {opt_objective}", f"${shortlist.attrs['total']:,.0f}")
+    om4.metric("Solver", shortlist.attrs["method"].capitalize(),
+               help=f"Exact branch-and-bound up to {OPTIMIZER_EXACT_MAX} candidates, "
+                    f"greedy + swap improvement above")
+    if len(shortlist):
+        opt_cols = ["Rank", "Address", "Zip", "Quality", "Total Cash to Close", "Cumulative Cash",
+                    "Assignment Fee", "Annual Cash Flow", "DSCR Ratio", "Cash-on-Cash (%)"]
+        st.dataframe(shortlist[opt_cols], width="stretch", hide_index=True, column_config={
+            **RESULT_COLUMN_CONFIG,
+            **{c: st.column_config.NumberColumn(format="$%,d")
+               for c in ("Total Cash to Close", "Cumulative Cash", "Assignment Fee", "Annual Cash Flow")},
+        })
+        st.download_button(
+            f"Download ranked shortlist ({len(shortlist)} deals)",
+            shortlist[[c for c in shortlist.columns if not c.startswith("_")]].to_csv(index=False).encode("utf-8"),
+            "section8_optimized_shortlist.csv", "text/csv",
+        )
 
     # ── Deal detail expanders ──
     viable_for_exp = [r for _, r in results.iterrows() if r["Quality"] != "No Deal"]
@@ -1467,7 +5603,7 @@ if uploaded:
                     f'<span class="{conf_css}">{conf} Confidence</span></div>',
                     unsafe_allow_html=True
                 )
-                ra, rb, rc, rd = st.columns(4)
+                ra, rb, rc, rd, rz = st.columns(5)
                 ra.metric("S8 Rent Used",      f"${r['Section 8 Rent ($/mo)']:,.0f}/mo",
                           help="Final rent used in all calculations after sqft + consensus adjustments")
                 rb.metric("HUD SAFMR",         f"${r.get('SAFMR Rent', 0):,.0f}/mo",
@@ -1476,6 +5612,9 @@ if uploaded:
                           help="ACS 5-yr median rent for this bedroom size in this ZIP — free market validation")
                 rd.metric("Rentcast AVM",       f"${r['Rentcast AVM Rent']:,.0f}/mo" if r.get("Rentcast AVM Rent") else "No key",
                           help="Rentcast market rent estimate — most accurate when API key provided")
+                rz.metric("Zillow Comps",      f"${r['Zillow Comp Rent']:,.0f}/mo" if r.get("Zillow Comp Rent") else "N/A",
+                          help=f"Median Zestimate rent of {r.get('Zillow Comp Count', 0)} same-bedroom "
+                               f"listings within {COMP_RADIUS_KM} km, from Zillow results already pulled")
                 if r.get("Rent Note"):
                     note_css = "flag-critical" if conf == "Low" else "flag-inspect" if conf == "Medium" else "flag-ok"
                     st.markdown(f'<div class="{note_css}">{r["Rent Note"]}</div>', unsafe_allow_html=True)
@@ -1486,9 +5625,10 @@ if uploaded:
                 st.markdown('<div class="section-label">Investor Metrics</div>', unsafe_allow_html=True)
                 im1, im2, im3, im4, im5 = st.columns(5)
                 dscr = r.get("DSCR Ratio", 0)
-                dscr_delta = "✓ Lender OK" if dscr >= 1.15 else "⚠ Below 1.15 min"
+                min_dscr = result_params["min_dscr_req"]
+                dscr_delta = "✓ Lender OK" if dscr >= min_dscr else f"⚠ Below {min_dscr:.2f} min"
                 im1.metric("DSCR Ratio",        f"{dscr:.2f}x",      delta=dscr_delta,
-                           help="NOI / Debt Service. Section 8 lenders require ≥ 1.15x")
+                           help=f"NOI / Debt Service. This run's lender minimum is {min_dscr:.2f}x")
                 rtv = r.get("Rent-to-Value (%)", 0)
                 rtv_delta = "✓ Strong" if rtv >= 1.0 else "✓ OK" if rtv >= 0.8 else "⚠ Low"
                 im2.metric("Rent-to-Value",     f"{rtv:.2f}%",       delta=rtv_delta,
@@ -1513,10 +5653,30 @@ if uploaded:
                 p3.metric("Your Max Offer",        f"${r['Your Max Offer']:,.0f}",
                           help="Your wholesale contract price to seller = Buyer price − fee − closing")
                 p4.metric("Your Wholesale Fee",    f"${r['Your Wholesale Fee']:,.0f}")
-                pp1, pp2, pp3, _ = st.columns(4)
+                pp1, pp2, pp3, pp4 = st.columns(4)
                 pp1.metric("Down Payment",         f"${r['Buyer Down Payment']:,.0f}")
                 pp2.metric("Loan Amount",          f"${r['Buyer Loan Amount']:,.0f}")
                 pp3.metric("Closing Costs",        f"${r['Buyer Closing Costs']:,.0f}")
+                arv = r.get("ARV")
+                pp4.metric("ARV (comps)",          f"${arv:,.0f}" if pd.notnull(arv) else "N/A",
+                           delta=f"spread ${r['ARV Spread']:,.0f}" if pd.notnull(arv) else None,
+                           help=f"{r.get('ARV Comps', 0)} nearest comps within {ARV_RADIUS_KM:.0f} km (±1 bed) · "
+                                f"sqft × {ARV_PCTL}th pct comp $/sqft · median ${r.get('Comp $/Sqft', 0) or 0:,.0f}/sqft. "
+                                f"Spread = ARV − buyer price − midpoint repairs")
+
+                # ── Goal-seek ──
+                st.markdown('<div class="section-label">Goal-Seek — Max Price by Constraint</div>',
+                            unsafe_allow_html=True)
+                gcols = st.columns(len(GOAL_SEEK_CONSTRAINTS))
+                for gc, name in zip(gcols, GOAL_SEEK_CONSTRAINTS):
+                    val = r.get(f"Max Price @ {name}")
+                    gc.metric(name, f"${val:,.0f}" if pd.notnull(val) else "Off",
+                              delta="binding" if r.get("Binding Constraint") == name else None,
+                              delta_color="off")
+                st.caption(
+                    f"Binding: **{r.get('Binding Constraint', '—')}** → buyer price "
+                    f"${r.get('Goal-Seek Buyer Price', 0):,.0f} · your offer ${r.get('Goal-Seek Offer', 0):,.0f}"
+                )
 
                 # ── Monthly cash flow ──
                 st.markdown('<div class="section-label">Monthly Cash Flow</div>', unsafe_allow_html=True)
@@ -1545,22 +5705,26 @@ if uploaded:
                 proj = r.get("_proj_5yr") or []  # might be in original results obj
                 if not proj:
                     # Recompute if needed (when from results_sorted which dropped _proj_5yr)
+                    # with the run's expense assumptions, not the live sidebar
+                    rp = result_params
                     _r2 = r.get("Section 8 Rent ($/mo)", 0)
                     proj = []
                     for yr in range(1, 6):
-                        _eff = max(0, _r2 - utility_allowance)
-                        _egi = _eff * (1 - vacancy_rate)
-                        _vexp = _eff * (maintenance_rate + mgmt_rate)
-                        _capx = _r2 * capex_rate
+                        _eff = max(0, _r2 - rp["utility_allowance"])
+                        _egi = _eff * (1 - rp["vacancy_rate"])
+                        _vexp = _eff * (rp["maintenance_rate"] + rp["mgmt_rate"])
+                        _capx = _r2 * rp["capex_rate"]
                         _fixed = (r.get("Monthly Taxes",0) * (1.02**(yr-1))
                                 + r.get("Monthly Insurance",0) * (1.02**(yr-1))
                                 + r.get("Monthly Mortgage",0))
                         _cf = _egi - _vexp - _capx - _fixed
                         proj.append({"year": yr, "rent": round(_r2), "cf": round(_cf)})
-                        _r2 = round(_r2 * (1 + rent_growth_rate))
+                        _r2 = round(_r2 * (1 + r.get("Rent Growth (%/yr)", rp["rent_growth_rate"] * 100) / 100))
 
                 if proj:
                     st.markdown('<div class="section-label">5-Year Projection</div>', unsafe_allow_html=True)
+                    if "Rent Growth (%/yr)" in r:
+                        st.caption(f"Rent growth {r['Rent Growth (%/yr)']:+.2f}%/yr · {r.get('Rent Growth Source', '')}")
                     pcols = st.columns(5)
                     for i, p in enumerate(proj):
                         cf_sign = "+" if p["cf"] >= 0 else ""
@@ -1570,6 +5734,25 @@ if uploaded:
                             delta=f"{cf_sign}${p['cf']:,} CF",
                         )
 
+                # ── Hold-period equity & IRR ──
+                hold = r.get("_hold") or []
+                if hold and r.get("Buyer Max Purchase", 0) > 0:
+                    st.markdown(f'<div class="section-label">{len(hold)}-Year Hold — Equity & Return</div>',
+                                unsafe_allow_html=True)
+                    h1, h2, h3, h4 = st.columns(4)
+                    irr_v = r.get("Levered IRR (%)")
+                    h1.metric("Levered IRR", f"{irr_v:.1f}%" if pd.notnull(irr_v) else "N/A")
+                    h2.metric("NPV", f"${r.get('NPV @ Discount Rate', 0):,.0f}",
+                              help=f"At {result_params['discount_rate']:.1%} discount rate, net of all cash to close")
+                    h3.metric("Equity at Exit", f"${r.get('Equity at Exit', 0):,.0f}",
+                              help="Appreciated value − remaining loan balance, before selling costs")
+                    h4.metric("Principal Paydown", f"${r.get('Principal Paydown', 0):,.0f}")
+                    st.dataframe(
+                        pd.DataFrame(hold).rename(columns={
+                            "year": "Year", "cf": "Cash Flow", "balance": "Loan Balance", "equity": "Equity"}),
+                        hide_index=True, width="stretch",
+                    )
+
                 # ── Repairs + property ──
                 st.markdown('<div class="section-label">Property & Repairs</div>', unsafe_allow_html=True)
                 rp1, rp2, rp3 = st.columns(3)
@@ -1594,15 +5777,9 @@ if uploaded:
                 zc3.metric("Zip Vacancy Rate", f"{r['Zip Vacancy Rate (%)']:.1f}%")
 
                 # ── Flags ──
-                if r.get("Inspection Flags"):
+                if r.get("Flag Codes"):
                     st.markdown('<div class="section-label">Flags</div>', unsafe_allow_html=True)
-                    for flag in r["Inspection Flags"].split(" | "):
-                        if not flag.strip(): continue
-                        fl = flag.lower()
-                        css = "flag-critical" if "critical" in fl else \
-                              "flag-inspect"  if any(x in fl for x in ["inspect","dscr","lender","hqs","risk"]) else \
-                              "flag-rehab"    if any(x in fl for x in ["rehab","repair","work","distress"]) else \
-                              "flag-rehab"
+                    for css, flag in render_flags(int(r["Flag Codes"]), r.get("_flag_params")):
                         st.markdown(f'<div class="{css}">{flag}</div>', unsafe_allow_html=True)
 
                 # ── Zillow + listing data ──
@@ -1624,23 +5801,55 @@ if uploaded:
                 if r.get("Listing Description"):
                     st.caption(f"Description: {r['Listing Description'][:400]}")
                 st.caption(f"Rent: {r['Rent Source']}  ·  Description: {r['Desc Source']}")
+                if r.get("Missing Sources"):
+                    st.caption(f"⏱ Partial data — skipped: {r['Missing Sources']}")
 
     # ── Exports ──
     st.markdown('<div class="section-label">Export</div>', unsafe_allow_html=True)
-    export_cols = [c for c in results_sorted.columns if not c.startswith("_")]
+    export_df = results_sorted[[c for c in results_sorted.columns if not c.startswith("_")]].copy()
+    export_df.insert(export_df.columns.get_loc("Flag Codes"), "Inspection Flags",
+                     flag_text(results_sorted["Flag Codes"], results_sorted["_flag_params"]))
     ec1, ec2 = st.columns(2)
     with ec1:
-        csv_all = results_sorted[export_cols].to_csv(index=False).encode("utf-8")
+        csv_all = export_df.to_csv(index=False).encode("utf-8")
         st.download_button("Download All Properties", csv_all,
                            "section8_all_offers.csv", "text/csv",
-                           use_container_width=True)
+                           width="stretch")
     with ec2:
-        good = results_sorted[results_sorted["Quality"].isin(["Green Light","Caution"])]
-        csv_good = good[export_cols].to_csv(index=False).encode("utf-8")
+        good = export_df[export_df["Quality"].isin(["Green Light","Caution"])]
+        csv_good = good.to_csv(index=False).encode("utf-8")
         st.download_button(
             f"Download Green Light + Caution ({len(good)} deals)",
             csv_good, "section8_good_offers.csv", "text/csv",
-            use_container_width=True, type="primary",
+            width="stretch", type="primary",
+        )
+    # The property × month schedule is n × hold × 12 rows — only built when asked for,
+    # and kept for this job so later reruns don't rebuild it.
+    amort_key = f"amort_csv_{active_job}"
+    amort_years = result_params["hold_years"]
+    if amort_key not in st.session_state:
+        if st.button(f"Prepare Amortization Schedules ({len(results):,} × {amort_years * 12} months)",
+                     width="stretch"):
+            hold_sched = amortization_schedule(
+                results["Buyer Max Purchase"].to_numpy() * (1 - result_params["down_pct"]),
+                result_params["interest_rate"], result_params["loan_term_years"], amort_years * 12,
+            )
+            _n, _m = hold_sched["balance"].shape
+            amort_long = pd.DataFrame({
+                "Address":   np.repeat(results["Address"].to_numpy(), _m),
+                "Month":     np.tile(np.arange(1, _m + 1), _n),
+                "Payment":   hold_sched["payment"].ravel().round(2),
+                "Interest":  hold_sched["interest"].ravel().round(2),
+                "Principal": hold_sched["principal"].ravel().round(2),
+                "Balance":   hold_sched["balance"].ravel().round(2),
+            })
+            st.session_state[amort_key] = amort_long.to_csv(index=False).encode("utf-8")
+    if amort_key in st.session_state:
+        st.download_button(
+            f"Download Amortization Schedules ({amort_years}-yr hold)",
+            st.session_state[amort_key],
+            "section8_amortization.csv", "text/csv",
+            width="stretch",
         )
 
 else:
@@ -1649,8 +5858,8 @@ else:
         "Upload a CSV or Excel file with your property list to begin.\n\n"
         "**Required:** `Address` (or `Street` + `City` + `State`) · `Zip` · `Bedrooms` · `List Price`\n\n"
         "**Optional:** `Sqft` · `Agent Name` · `Agent Email` · `Agent Phone` · `Description`\n\n"
-        "**Rent is validated against 3 sources:** HUD SAFMR · Census ACS median rent · "
-        "Rentcast AVM (if API key provided). Low-confidence rent gets a reasonableness flag.\n\n"
+        "**Rent is validated against 4 sources:** HUD SAFMR · Census ACS median rent · "
+        "Rentcast AVM (if API key provided) · nearby Zillow rent comps. Low-confidence rent gets a reasonableness flag.\n\n"
         "**Export includes:** S8 Rent · Rent Confidence · DSCR Ratio · Cash-on-Cash · "
-        "Rent-to-Value · GRM · Break-even Rent · Est. Repairs · All agent pass-through fields."
+        "Rent-to-Value · GRM · Break-even Rent · Est. Repairs · ARV + spread · All agent pass-through fields."
     )
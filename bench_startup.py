@@ -0,0 +1,87 @@
+"""
+Startup benchmark for app.py.
+
+Measures, each in a fresh interpreter so nothing is warm:
+  1. import time of every top-level module app.py imports (python -X importtime)
+  2. time to first render — one full script run through Streamlit's AppTest,
+     with no upload, which is what a user waits for before the page is usable
+
+Usage:
+    python bench_startup.py            # 3 runs, prints medians
+    python bench_startup.py --runs 5
+"""
+import argparse
+import ast
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP  = os.path.join(HERE, "app.py")
+
+FIRST_RENDER = f"""
+import time
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({APP!r}, default_timeout=120)
+at.run()
+assert not at.exception, at.exception
+print(time.perf_counter() - t0)
+"""
+
+
+def top_level_imports(path: str) -> list[str]:
+    """Module-level imports in app.py (lazy imports inside functions are excluded)."""
+    tree = ast.parse(open(path).read())
+    mods = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            mods += [a.name for a in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            mods.append(node.module)
+    return list(dict.fromkeys(mods))
+
+
+def import_times(mods: list[str]) -> dict[str, float]:
+    """Cumulative import time (ms) per module from -X importtime."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "; ".join(f"import {m}" for m in mods)],
+        capture_output=True, text=True,
+    )
+    out = {}
+    for line in proc.stderr.splitlines():
+        m = re.match(r"import time:\s+\d+ \|\s+(\d+) \|\s*(\S+)$", line)
+        if m and m.group(2) in mods:
+            out[m.group(2)] = int(m.group(1)) / 1000
+    return out
+
+
+def first_render_seconds() -> float:
+    env = dict(os.environ, S8_DATA_DIR=os.environ.get("S8_DATA_DIR", os.path.join(HERE, ".bench_data")))
+    proc = subprocess.run([sys.executable, "-c", FIRST_RENDER], capture_output=True, text=True, env=env)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr[-2000:])
+    return float(proc.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--runs", type=int, default=3)
+    args = ap.parse_args()
+
+    mods = top_level_imports(APP)
+    runs = [import_times(mods) for _ in range(args.runs)]
+    print(f"Import time, median of {args.runs} cold runs (ms):")
+    for m in sorted(mods, key=lambda m: -statistics.median(r.get(m, 0) for r in runs)):
+        print(f"  {m:<24} {statistics.median(r.get(m, 0) for r in runs):8.1f}")
+    print(f"  {'total':<24} {statistics.median(sum(r.values()) for r in runs):8.1f}")
+
+    renders = [first_render_seconds() for _ in range(args.runs)]
+    print(f"\nTime to first render (AppTest, no upload): "
+          f"median {statistics.median(renders):.2f}s  (runs: {', '.join(f'{r:.2f}' for r in renders)})")
+
+
+if __name__ == "__main__":
+    main()